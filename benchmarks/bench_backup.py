@@ -0,0 +1,265 @@
+# benchmarks/bench_backup.py
+"""
+Benchmark backup, restore, retention and verify against a synthetic world.
+
+Each operation runs in a fresh child process, which reports its own peak RSS (VmHWM).
+Results are written as JSON and can be compared against a stored baseline:
+
+    python benchmarks/bench_backup.py --preset small --runs 3 --output results.json
+    python benchmarks/bench_backup.py --preset small --baseline results.json
+"""
+import argparse
+import hashlib
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+from benchmarks.world_generator import PRESETS, WorldSpec, describe_world, generate_world, mutate_world
+
+OPERATIONS = ('backup', 'verify', 'restore', 'retention')
+INSTANCE = 'default'
+
+
+def write_config(work_dir: str):
+    """Config for the benchmark: one instance, no throttling, retention measured as its own step."""
+    with open(os.path.join(work_dir, 'config.ini'), 'w') as config_file:
+        config_file.write(
+            "[SERVER]\n"
+            f"ServerRootLocation = {os.path.join(work_dir, 'server')}\n"
+            "WorldName = world\n"
+            f"BackupDir = {os.path.join(work_dir, 'backups')}\n"
+            "MaxWorldBackups = 1000\n"
+            "BackupIoClass = none\n"
+            "BackupNice = 0\n"
+        )
+
+
+def tree_digest(path: str) -> dict:
+    """Map relative path -> sha256 of every file below path."""
+    digests = {}
+    for root, _, names in os.walk(path):
+        for name in names:
+            full_path = os.path.join(root, name)
+            digest = hashlib.sha256()
+            with open(full_path, 'rb') as tree_file:
+                for block in iter(lambda: tree_file.read(1024 * 1024), b''):
+                    digest.update(block)
+            digests[os.path.relpath(full_path, path)] = digest.hexdigest()
+    return digests
+
+
+def newest_backup(work_dir: str) -> str:
+    backup_dir = os.path.join(work_dir, 'backups')
+    return os.path.join(backup_dir, sorted(os.listdir(backup_dir))[-1])
+
+
+def run_child_operation(operation: str, work_dir: str) -> dict:
+    """Perform one operation in this (child) process and return its measurements."""
+    world_path = os.path.join(work_dir, 'server', 'world')
+    start = time.perf_counter()
+    if operation == 'backup':
+        from scripts.backup import create_minecraft_backup
+        ok = create_minecraft_backup(INSTANCE, base_dir=work_dir)
+        processed = describe_world(newest_backup(work_dir))['bytes']
+    elif operation == 'restore':
+        from manager import load_latest_backup
+        # No server runs in the work directory, and it has no scripts/ to stop one with
+        ok = load_latest_backup(False, INSTANCE, base_dir=work_dir, stop_server=False)
+        processed = describe_world(world_path)['bytes']
+    elif operation == 'retention':
+        from scripts.backup import remove_old_backups
+        from utils.logger import Logger
+        from utils.throttle import ThrottleSettings
+        backup_dir = os.path.join(work_dir, 'backups')
+        # Remove the single oldest backup
+        backups = sorted(os.listdir(backup_dir))
+        processed = describe_world(os.path.join(backup_dir, backups[0]))['bytes']
+        start = time.perf_counter()
+        remove_old_backups(backup_dir, len(backups) - 1, ThrottleSettings(io_class='none', niceness=0),
+                           Logger(os.path.join(work_dir, 'ManagerLog.txt')))
+        ok = len(os.listdir(backup_dir)) == len(backups) - 1
+    elif operation == 'verify':
+        world, backup = tree_digest(world_path), tree_digest(newest_backup(work_dir))
+        ok = world == backup
+        processed = 2 * describe_world(world_path)['bytes']
+    else:
+        raise ValueError(f"Unknown operation '{operation}'")
+    return {'ok': bool(ok), 'seconds': time.perf_counter() - start, 'bytes': processed,
+            'peak_rss_mib': peak_rss_mib()}
+
+
+def peak_rss_mib() -> float:
+    """
+    Peak resident set size of this process in MiB.
+    VmHWM is reset by exec, unlike ru_maxrss, which would include the parent's memory copied by fork.
+    """
+    with open('/proc/self/status') as status_file:
+        for line in status_file:
+            if line.startswith('VmHWM:'):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def measure(operation: str, work_dir: str) -> dict:
+    """Run an operation in a child process and return its measurements."""
+    process = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', operation, work_dir],
+                             stdout=subprocess.PIPE, cwd=BASE_DIR, text=True)
+    if process.returncode != 0:
+        raise RuntimeError(f"Benchmark operation '{operation}' exited with {process.returncode}")
+    result = json.loads(process.stdout.strip().splitlines()[-1])
+    if not result['ok']:
+        raise RuntimeError(f"Benchmark operation '{operation}' reported failure (see {work_dir}/ManagerLog.txt)")
+    return result
+
+
+def summarize(samples: list) -> dict:
+    seconds = [sample['seconds'] for sample in samples]
+    median = statistics.median(seconds)
+    mib = statistics.median(sample['bytes'] for sample in samples) / 1024 / 1024
+    return {
+        'runs': [round(value, 4) for value in seconds],
+        'median_s': round(median, 4),
+        'min_s': round(min(seconds), 4),
+        'mib': round(mib, 2),
+        'mib_per_s': round(mib / median, 2) if median > 0 else None,
+        'peak_rss_mib': round(max(sample['peak_rss_mib'] for sample in samples), 1),
+    }
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+
+def run_benchmark(spec: WorldSpec, runs: int, mutate_fraction: float, work_dir: str) -> dict:
+    world_path = os.path.join(work_dir, 'server', 'world')
+    write_config(work_dir)
+    generated = time.perf_counter()
+    world = generate_world(world_path, spec)
+    print(f"Generated world: {world['files']} files, {world['bytes'] / 1024 / 1024:.1f} MiB "
+          f"in {time.perf_counter() - generated:.1f}s")
+
+    samples = {operation: [] for operation in OPERATIONS}
+    last_backup = 0.0
+    for run in range(runs):
+        if run:
+            mutated = mutate_world(world_path, mutate_fraction, seed=run)
+            print(f"Run {run + 1}: rewrote {mutated} chunks ({mutate_fraction:.0%})")
+        for operation in OPERATIONS:
+            if operation == 'backup':
+                # Backup names have one-second resolution
+                time.sleep(max(0.0, last_backup + 1.05 - time.monotonic()))
+                last_backup = time.monotonic()
+            elif operation == 'retention':
+                # Give retention an older backup to delete
+                shutil.copytree(newest_backup(work_dir), newest_backup(work_dir) + '_copy')
+            result = measure(operation, work_dir)
+            samples[operation].append(result)
+            print(f"  {operation:<9} {result['seconds']:8.3f}s  {result['bytes'] / 1024 / 1024:8.1f} MiB  "
+                  f"peak RSS {result['peak_rss_mib']:.1f} MiB")
+
+    return {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'revision': git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'world': dict(spec.to_dict(), files=world['files'], bytes=world['bytes']),
+            'runs': runs,
+            'mutate_fraction': mutate_fraction,
+        },
+        'results': {operation: summarize(values) for operation, values in samples.items()},
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """
+    Compare median times with a baseline.
+
+    :return: Descriptions of operations that are more than `tolerance` slower
+    """
+    regressions = []
+    print(f"\nCompared with baseline {baseline['meta'].get('revision') or ''} ({baseline['meta'].get('timestamp')}):")
+    if baseline['meta'].get('world') != results['meta']['world']:
+        print("  Warning: the baseline was measured on a different world")
+    for operation, current in results['results'].items():
+        previous = baseline['results'].get(operation)
+        if not previous or not previous['median_s']:
+            continue
+        ratio = current['median_s'] / previous['median_s']
+        rss_change = current['peak_rss_mib'] - previous['peak_rss_mib']
+        line = (f"  {operation:<9} {previous['median_s']:8.3f}s -> {current['median_s']:8.3f}s "
+                f"({ratio - 1:+.1%}), peak RSS {rss_change:+.1f} MiB")
+        if ratio > 1 + tolerance:
+            line += "  REGRESSION"
+            regressions.append(f"{operation} {ratio - 1:+.1%}")
+        print(line)
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark world backup, restore, retention and verify")
+    parser.add_argument('--preset', default='small', choices=sorted(PRESETS))
+    parser.add_argument('--regions', type=int, help="Override the number of region files")
+    parser.add_argument('--chunks-per-region', type=int, help="Override the chunks per region (max 1024)")
+    parser.add_argument('--players', type=int, help="Override the number of playerdata files")
+    parser.add_argument('--small-files', type=int, help="Override the number of small JSON files")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--mutate', type=float, default=0.1, help="Fraction of chunks rewritten between runs")
+    parser.add_argument('--output', help="Write the results as JSON to this file")
+    parser.add_argument('--baseline', help="Compare with the results JSON of an earlier run")
+    parser.add_argument('--tolerance', type=float, default=0.15, help="Allowed slowdown before failing (0.15 = 15%%)")
+    parser.add_argument('--work-dir', help="Directory for the world and backups (default: a temporary directory)")
+    parser.add_argument('--keep', action='store_true', help="Keep the work directory")
+    options = parser.parse_args(argv)
+
+    spec = WorldSpec.from_preset(options.preset, options.seed)
+    for name in ('regions', 'chunks_per_region', 'players', 'small_files'):
+        if getattr(options, name) is not None:
+            setattr(spec, name, getattr(options, name))
+
+    work_dir = options.work_dir or tempfile.mkdtemp(prefix='msm-bench-')
+    os.makedirs(work_dir, exist_ok=True)
+    try:
+        results = run_benchmark(spec, options.runs, options.mutate, work_dir)
+    finally:
+        if options.keep:
+            print(f"Work directory kept at {work_dir}")
+        else:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    print()
+    for operation, summary in results['results'].items():
+        print(f"{operation:<9} median {summary['median_s']:.3f}s  {summary['mib_per_s'] or 0:.1f} MiB/s  "
+              f"peak RSS {summary['peak_rss_mib']:.1f} MiB")
+    if options.output:
+        with open(options.output, 'w') as output_file:
+            json.dump(results, output_file, indent=2)
+        print(f"Results written to {options.output}")
+    if options.baseline:
+        with open(options.baseline) as baseline_file:
+            regressions = compare(results, json.load(baseline_file), options.tolerance)
+        if regressions:
+            print(f"Slower than baseline by more than {options.tolerance:.0%}: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] == '--child':
+        print(json.dumps(run_child_operation(sys.argv[2], sys.argv[3])))
+        sys.exit(0)
+    sys.exit(main())
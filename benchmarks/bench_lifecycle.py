@@ -0,0 +1,201 @@
+# benchmarks/bench_lifecycle.py
+"""
+End-to-end latency of the server lifecycle commands (sa, s, ra, qa) without a real server,
+plus the cold start of a one-shot `python manager.py s <message>`.
+
+benchmarks/lifecycle/fakebin is put first on PATH: a fake `screen` that feeds a FIFO to the
+session's stdin, a fake `java` that writes a vanilla-style logs/latest.log, honours `stop`
+after a save delay and can speak RCON, and fakes for `gnome-terminal` and `playit`.
+The manager and its scripts are copied into a temporary directory with their own
+config.ini, so a real config and server are never touched.
+
+    python benchmarks/bench_lifecycle.py --iterations 10 --output lifecycle.json
+"""
+import argparse
+import contextlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FAKEBIN_DIR = os.path.join('benchmarks', 'lifecycle', 'fakebin')
+sys.path.append(BASE_DIR)
+from utils.lag_monitor import percentile
+
+COMMANDS = ('sa', 's', 'ra', 'qa')
+
+
+def prepare_work_dir(work_dir: str, rcon: bool, rcon_port: int) -> str:
+    """
+    Copy the manager into work_dir/manager and create a server root next to it.
+
+    :return: Path of the copied manager
+    """
+    code_dir = os.path.join(work_dir, 'manager')
+    shutil.copytree(BASE_DIR, code_dir, ignore=shutil.ignore_patterns(
+        '.git', '__pycache__', 'config.ini', '*.jsonl', '*.json', 'ManagerLog.txt', 'WorldIndex_*', 'run',
+        'manifests'))
+    server_root = os.path.join(work_dir, 'server')
+    os.makedirs(os.path.join(server_root, 'world'))
+    with open(os.path.join(server_root, 'server.properties'), 'w') as properties_file:
+        properties_file.write(f"level-name=world\nserver-port=25565\nenable-rcon={'true' if rcon else 'false'}\n"
+                              f"rcon.port={rcon_port}\nrcon.password=benchmark\n")
+    with open(os.path.join(server_root, 'eula.txt'), 'w') as eula_file:
+        eula_file.write("eula=true\n")
+    with open(os.path.join(code_dir, 'config.ini'), 'w') as config_file:
+        config_file.write(
+            "[SERVER]\n"
+            f"ServerRootLocation = {server_root}\n"
+            "IsAutoBackupEnabled = False\n"
+            "IsMilestoneBackupEnabled = False\n"
+            f"RconEnabled = {rcon}\n"
+            "StartupWaitSeconds = 30\n"
+        )
+    open(os.path.join(code_dir, 'ManagerLog.txt'), 'a').close()
+    os.makedirs(os.path.join(work_dir, 'screen'))
+    if os.geteuid() == 0:
+        # Scripts run as a non-privileged user when the manager runs as root
+        for root, directories, files in os.walk(work_dir):
+            for name in directories:
+                os.chmod(os.path.join(root, name), 0o777)
+            for name in files:
+                path = os.path.join(root, name)
+                os.chmod(path, os.stat(path).st_mode | 0o666)
+        os.chmod(work_dir, 0o777)
+    return code_dir
+
+
+def wait_for_log_line(path: str, text: str, timeout: float = 10.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with open(path, errors='replace') as log_file:
+                if text in log_file.read():
+                    return True
+        except OSError:
+            pass
+        time.sleep(0.01)
+    return False
+
+
+def drive(iterations: int) -> dict:
+    """
+    Run in the copied manager directory: time each command through handle_command().
+
+    :return: command -> list of seconds, plus 's delivery' (time until the message is in latest.log)
+    """
+    from manager import MinecraftServerManager
+
+    manager = MinecraftServerManager()
+    log_path = manager.config_manager.get_instance().log_path
+    samples = {command: [] for command in COMMANDS}
+    samples['s delivery'] = []
+    samples['cli s'] = []
+    failures = []
+
+    def timed(command: str, key: str, iteration: int):
+        # A failed command is reported instead of timed, so it cannot pass as a fast sample
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(sys.stderr):
+            succeeded = manager.handle_command(command)
+        if succeeded:
+            samples[key].append(time.perf_counter() - start)
+        else:
+            failures.append(f"{key} {iteration} failed")
+
+    for iteration in range(iterations):
+        timed('sa', 'sa', iteration)
+        message = f"lifecycle benchmark {iteration} {time.time_ns()}"
+        start = time.perf_counter()
+        timed(f's {message}', 's', iteration)
+        if wait_for_log_line(log_path, f"[Server] {message}"):
+            samples['s delivery'].append(time.perf_counter() - start)
+        else:
+            failures.append(f"message {iteration} not delivered")
+        # One-shot CLI: a fresh interpreter, so this includes imports and config parsing
+        start = time.perf_counter()
+        cli = subprocess.run([sys.executable, 'manager.py', 's', f'{message} cli'], capture_output=True)
+        if cli.returncode == 0:
+            samples['cli s'].append(time.perf_counter() - start)
+        else:
+            failures.append(f"one-shot s {iteration} exited with {cli.returncode}")
+        timed('ra', 'ra', iteration)
+        timed('qa', 'qa', iteration)
+        print(f"iteration {iteration + 1}: " + ", ".join(f"{key} {values[-1]:.3f}s"
+                                                         for key, values in samples.items() if values),
+              file=sys.stderr)
+    return {'samples': samples, 'failures': failures}
+
+
+def summarize(values: list) -> dict:
+    if not values:
+        return {}
+    return {'count': len(values), 'p50_s': round(percentile(values, 0.50), 4),
+            'p90_s': round(percentile(values, 0.90), 4), 'p99_s': round(percentile(values, 0.99), 4),
+            'max_s': round(max(values), 4)}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Measure sa/s/ra/qa latency against fake screen and java")
+    parser.add_argument('--iterations', type=int, default=5)
+    parser.add_argument('--startup', type=float, default=1.0, help="Seconds the fake server takes to start")
+    parser.add_argument('--save-delay', type=float, default=0.5, help="Seconds the fake server saves on stop")
+    parser.add_argument('--rcon', action='store_true', help="Enable RCON on the fake server and the manager")
+    parser.add_argument('--rcon-port', type=int, default=25575)
+    parser.add_argument('--output', help="Write the results as JSON to this file")
+    parser.add_argument('--keep', action='store_true', help="Keep the work directory")
+    options = parser.parse_args(argv)
+
+    work_dir = tempfile.mkdtemp(prefix='msm-lifecycle-')
+    try:
+        code_dir = prepare_work_dir(work_dir, options.rcon, options.rcon_port)
+        environment = dict(os.environ,
+                           PATH=os.pathsep.join([os.path.join(code_dir, FAKEBIN_DIR), os.path.dirname(sys.executable),
+                                                 os.environ.get('PATH', '')]),
+                           FAKE_SCREEN_DIR=os.path.join(work_dir, 'screen'),
+                           FAKE_MC_STARTUP_SECONDS=str(options.startup),
+                           FAKE_MC_SAVE_DELAY=str(options.save_delay))
+        process = subprocess.run([sys.executable, os.path.join(code_dir, 'benchmarks', 'bench_lifecycle.py'),
+                                  '--driver', str(options.iterations)],
+                                 cwd=code_dir, env=environment, stdout=subprocess.PIPE, text=True)
+        if process.returncode != 0:
+            print(f"Driver exited with {process.returncode}; see {work_dir} (kept)")
+            options.keep = True
+            return 1
+        driven = json.loads(process.stdout.strip().splitlines()[-1])
+    finally:
+        # Leave no fake server behind
+        subprocess.run(['pkill', '-f', os.path.join(work_dir, 'manager', FAKEBIN_DIR)], capture_output=True)
+        if options.keep:
+            print(f"Work directory kept at {work_dir}")
+        else:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    results = {
+        'meta': {'iterations': options.iterations, 'startup_s': options.startup,
+                 'save_delay_s': options.save_delay, 'rcon': options.rcon},
+        'results': {key: summarize(values) for key, values in driven['samples'].items()},
+        'failures': driven['failures'],
+    }
+    print(f"{'command':<11}{'p50':>9}{'p90':>9}{'p99':>9}{'max':>9}")
+    for key, summary in results['results'].items():
+        if summary:
+            print(f"{key:<11}" + ''.join(f"{summary[name]:8.3f}s" for name in ('p50_s', 'p90_s', 'p99_s', 'max_s')))
+    for failure in driven['failures']:
+        print(f"Failure: {failure}")
+    if options.output:
+        with open(options.output, 'w') as output_file:
+            json.dump(results, output_file, indent=2)
+        print(f"Results written to {options.output}")
+    return 1 if driven['failures'] else 0
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == '--driver':
+        print(json.dumps(drive(int(sys.argv[2]))))
+        sys.exit(0)
+    sys.exit(main())
@@ -0,0 +1,210 @@
+# benchmarks/world_generator.py
+import json
+import os
+import random
+import sys
+import time
+import uuid
+from typing import Dict, List, Tuple
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils import anvil, nbt
+
+DATA_VERSION = 3955  # 1.21.1
+SECTIONS_PER_CHUNK = 24
+# Sections from the bottom (y = -64) that contain terrain; the rest are air
+SOLID_SECTIONS = 8
+
+# name -> (regions, chunks per region, players, small files)
+PRESETS = {
+    'tiny': (1, 64, 2, 50),
+    'small': (4, 256, 8, 500),
+    'medium': (16, 512, 32, 2000),
+    'large': (64, 1024, 128, 10000),
+}
+
+
+class WorldSpec:
+    """Shape of a synthetic world."""
+
+    def __init__(self, regions: int = 4, chunks_per_region: int = 256, players: int = 8,
+                 small_files: int = 500, seed: int = 0):
+        self.regions = regions
+        self.chunks_per_region = min(chunks_per_region, anvil.CHUNKS_PER_REGION)
+        self.players = players
+        self.small_files = small_files
+        self.seed = seed
+
+    @classmethod
+    def from_preset(cls, name: str, seed: int = 0) -> 'WorldSpec':
+        if name not in PRESETS:
+            raise ValueError(f"Unknown preset '{name}' (use one of {', '.join(PRESETS)})")
+        return cls(*PRESETS[name], seed=seed)
+
+    def to_dict(self) -> dict:
+        return {'regions': self.regions, 'chunks_per_region': self.chunks_per_region,
+                'players': self.players, 'small_files': self.small_files, 'seed': self.seed}
+
+
+def region_coordinates(count: int) -> List[Tuple[int, int]]:
+    """Region coordinates of a roughly square area centred on the origin."""
+    side = max(1, int(count ** 0.5 + 0.999))
+    coordinates = [(x - side // 2, z - side // 2) for z in range(side) for x in range(side)]
+    return coordinates[:count]
+
+
+def _section(rng: random.Random, y: int, solid: bool) -> dict:
+    if not solid:
+        return {'Y': nbt.Byte(y), 'block_states': {'palette': [{'Name': 'minecraft:air'}]},
+                'biomes': {'palette': ['minecraft:plains']}}
+    palette = ['minecraft:stone', 'minecraft:deepslate', 'minecraft:dirt', 'minecraft:andesite',
+               'minecraft:gravel', 'minecraft:coal_ore', 'minecraft:iron_ore', 'minecraft:water']
+    # 4 bits per block: 16 indexes per long, 4096 blocks per section. Runs of plain stone (index 0)
+    # with noisy words in between compress about as well as real terrain.
+    words = [rng.getrandbits(64) - (1 << 63) if rng.random() < 0.3 else 0 for _ in range(256)]
+    return {
+        'Y': nbt.Byte(y),
+        'block_states': {'palette': nbt.List([{'Name': name} for name in palette]),
+                         'data': nbt.LongArray(words)},
+        'biomes': {'palette': ['minecraft:plains']},
+        'BlockLight': nbt.ByteArray(bytes(2048)),
+        'SkyLight': nbt.ByteArray(rng.randbytes(256) + bytes(1792)),
+    }
+
+
+def generate_chunk(rng: random.Random, x: int, z: int, game_time: int) -> bytes:
+    """Return the uncompressed NBT of a plausible full-status chunk."""
+    chunk = {
+        'DataVersion': nbt.Int(DATA_VERSION),
+        'xPos': nbt.Int(x),
+        'zPos': nbt.Int(z),
+        'yPos': nbt.Int(-4),
+        'Status': 'minecraft:full',
+        'LastUpdate': nbt.Long(game_time),
+        'InhabitedTime': nbt.Long(rng.choice((0, 0, 0, rng.randrange(20, 1200), rng.randrange(1200, 720000)))),
+        'sections': nbt.List([_section(rng, y, y < -4 + SOLID_SECTIONS) for y in range(-4, -4 + SECTIONS_PER_CHUNK)]),
+        'Heightmaps': {name: nbt.LongArray(rng.getrandbits(63) for _ in range(37))
+                       for name in ('MOTION_BLOCKING', 'WORLD_SURFACE')},
+        'block_entities': nbt.List([], nbt.TAG_COMPOUND),
+        'isLightOn': nbt.Byte(1),
+    }
+    return nbt.encode(chunk)
+
+
+def write_region_file(path: str, region_x: int, region_z: int, indexes: List[int], rng: random.Random,
+                      existing: Dict[int, Tuple[int, bytes, int]] = None):
+    """Write (or rewrite) a region file, generating new data for the given chunk indexes."""
+    chunks = dict(existing or {})
+    now = int(time.time())
+    for index in indexes:
+        x, z = region_x * 32 + index % 32, region_z * 32 + index // 32
+        data = generate_chunk(rng, x, z, rng.randrange(1, 10 ** 7))
+        chunks[index] = (anvil.COMPRESSION_ZLIB, anvil.compress_chunk(data), now)
+    anvil.write_region(path, chunks)
+
+
+def _player_data(rng: random.Random, player_uuid: uuid.UUID) -> dict:
+    most, least = player_uuid.int >> 64, player_uuid.int & ((1 << 64) - 1)
+    as_ints = [((most >> 32) ^ 0x80000000) - 0x80000000, ((most & 0xFFFFFFFF) ^ 0x80000000) - 0x80000000,
+               ((least >> 32) ^ 0x80000000) - 0x80000000, ((least & 0xFFFFFFFF) ^ 0x80000000) - 0x80000000]
+    return {
+        'DataVersion': nbt.Int(DATA_VERSION),
+        'UUID': nbt.IntArray(as_ints),
+        'Pos': nbt.List([nbt.Double(rng.uniform(-500, 500)), nbt.Double(64.0), nbt.Double(rng.uniform(-500, 500))]),
+        'Health': nbt.Float(20.0),
+        'XpLevel': nbt.Int(rng.randrange(0, 50)),
+        'Inventory': nbt.List([{'Slot': nbt.Byte(slot), 'id': 'minecraft:cobblestone', 'count': nbt.Int(64)}
+                               for slot in range(rng.randrange(1, 36))], nbt.TAG_COMPOUND),
+    }
+
+
+def generate_world(world_path: str, spec: WorldSpec) -> dict:
+    """
+    Create a synthetic world: region files, level.dat, playerdata and many small JSON files.
+
+    :return: Summary with file and byte counts
+    """
+    rng = random.Random(spec.seed)
+    region_dir = os.path.join(world_path, 'region')
+    for directory in ('region', 'playerdata', 'advancements', 'stats', 'data', 'DIM-1/region', 'DIM1/region'):
+        os.makedirs(os.path.join(world_path, directory), exist_ok=True)
+
+    for region_x, region_z in region_coordinates(spec.regions):
+        indexes = sorted(rng.sample(range(anvil.CHUNKS_PER_REGION), spec.chunks_per_region))
+        write_region_file(os.path.join(region_dir, f'r.{region_x}.{region_z}.mca'), region_x, region_z, indexes, rng)
+
+    nbt.write_nbt_file(os.path.join(world_path, 'level.dat'), {'Data': {
+        'DataVersion': nbt.Int(DATA_VERSION), 'LevelName': 'benchmark', 'Time': nbt.Long(1000),
+        'RandomSeed': nbt.Long(spec.seed)}})
+
+    for _ in range(spec.players):
+        player_uuid = uuid.UUID(int=rng.getrandbits(128))
+        nbt.write_nbt_file(os.path.join(world_path, 'playerdata', f'{player_uuid}.dat'), _player_data(rng, player_uuid))
+        with open(os.path.join(world_path, 'stats', f'{player_uuid}.json'), 'w') as stats_file:
+            json.dump({'stats': {'minecraft:custom': {'minecraft:play_time': rng.randrange(10 ** 6)}},
+                       'DataVersion': DATA_VERSION}, stats_file)
+
+    # Advancements, map data and other small files the server keeps per player and per feature
+    for number in range(spec.small_files):
+        directory = 'advancements' if number % 2 else 'data'
+        with open(os.path.join(world_path, directory, f'file_{number}.json'), 'w') as small_file:
+            json.dump({'minecraft:story/root': {'done': bool(number % 3)}, 'n': number,
+                       'padding': 'x' * rng.randrange(50, 2000)}, small_file)
+
+    return describe_world(world_path)
+
+
+def mutate_world(world_path: str, fraction: float, seed: int = 1) -> int:
+    """
+    Regenerate a fraction of the existing chunks and touch level.dat and some playerdata, like play would.
+
+    :return: Number of chunks rewritten
+    """
+    rng = random.Random(seed)
+    region_dir = os.path.join(world_path, 'region')
+    rewritten = 0
+    for file_name in sorted(os.listdir(region_dir)):
+        coordinates = anvil.parse_region_name(file_name)
+        if coordinates is None:
+            continue
+        path = os.path.join(region_dir, file_name)
+        region = anvil.RegionFile(path)
+        present = region.chunk_indexes()
+        count = int(round(len(present) * fraction))
+        if not count:
+            continue
+        existing = {index: region.read_raw(index) + (region.timestamps[index],) for index in present}
+        write_region_file(path, *coordinates, rng.sample(present, count), rng, existing)
+        rewritten += count
+
+    player_dir = os.path.join(world_path, 'playerdata')
+    players = sorted(os.listdir(player_dir))
+    for file_name in rng.sample(players, max(1, int(len(players) * fraction))) if players else []:
+        path = os.path.join(player_dir, file_name)
+        _, data = nbt.read_nbt_file(path)
+        data['XpLevel'] = nbt.Int(data.get('XpLevel', 0) + 1)
+        nbt.write_nbt_file(path, data)
+    os.utime(os.path.join(world_path, 'level.dat'))
+    return rewritten
+
+
+def describe_world(world_path: str) -> dict:
+    files = 0
+    total_bytes = 0
+    for root, _, names in os.walk(world_path):
+        for name in names:
+            files += 1
+            total_bytes += os.path.getsize(os.path.join(root, name))
+    return {'files': files, 'bytes': total_bytes}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Generate a synthetic Minecraft world")
+    parser.add_argument('path')
+    parser.add_argument('--preset', default='small', choices=sorted(PRESETS))
+    parser.add_argument('--seed', type=int, default=0)
+    options = parser.parse_args()
+    summary = generate_world(options.path, WorldSpec.from_preset(options.preset, options.seed))
+    print(f"Generated {summary['files']} files, {summary['bytes'] / 1024 / 1024:.1f} MiB in {options.path}")
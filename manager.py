@@ -1,5 +1,6 @@
 # manager.py
 
+import contextvars
 import datetime
 import os
 import shutil
@@ -7,20 +8,51 @@ import subprocess
 import sys
 import threading
 import time
-from typing import Optional, Dict, Any, Callable
+from typing import Optional, Dict, Any, Callable, Iterable, List, Tuple, TYPE_CHECKING
 
-import schedule
-
-# Import custom modules
+# Import custom modules. Only what every command needs is imported here; the
+# scheduler, samplers, monitors and throttling are imported on first use so
+# one-shot commands start quickly.
 from utils.config_manager import ConfigManager
 from utils.logger import Logger
+from utils.metrics import (BACKUP_BYTES, BACKUP_DURATION, BACKUP_THROTTLE_SECONDS, BACKUPS_SKIPPED,
+                           COMMAND_DURATION, COMMANDS_TOTAL, SCHEDULER_LAG, directory_size)
 from utils.run_script import run_script
+from utils.process_registry import ProcessRegistry, find_screen_process, server_key
+from utils.spans import Spans, active_session, in_session_thread
 from utils.send_message import send_server_message
 
+if TYPE_CHECKING:
+    import schedule
+    from utils.countdown import ShutdownCountdown
+    from utils.governor import Governor
+    from utils.lag_monitor import LagDetector, LagMonitor
+    from utils.metrics import MetricsExporter
+    from utils.proc_stats import ProcessSampler
+    from utils.replication import Replicator
+    from utils.watchdog import Watchdog
+
+# Commands that only make sense while the interactive manager keeps running
+SCHEDULER_COMMANDS = {'sqa', 'wsqa', 'rs', 'ss', 'exit'}
+
+
+def _schedule():
+    """Import the schedule library on first use."""
+    import schedule
+    return schedule
+
 
-def load_latest_backup(backup_dir2):
+def load_latest_backup(milestone: bool = False, instance_name: Optional[str] = None,
+                       base_dir: Optional[str] = None, stop_server: bool = True):
+    """
+    Replace the world of an instance with its latest backup.
+
+    :param base_dir: Directory with config.ini and ManagerLog.txt (default: the manager's)
+    :param stop_server: Stop the server with scripts/stop_mc.py first; False when it is
+                        known not to run (e.g. a benchmark's scratch directory)
+    """
     # Get config and log paths
-    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    base_dir = base_dir or os.path.dirname(os.path.abspath(__file__))
     config_path = os.path.join(base_dir, 'config.ini')
     log_path = os.path.join(base_dir, 'ManagerLog.txt')
 
@@ -28,12 +60,14 @@ def load_latest_backup(backup_dir2):
     config_manager = ConfigManager(config_path)
     logger = Logger(log_path)
 
-    # Get server root from config
-    server_root = config_manager.get_server_root()
-
+    # Failures are observed too, under the resolved instance name once it is known
+    name = instance_name or ''
+    start = time.perf_counter()
     try:
-        # Find latest backup
-        backup_dir = os.path.join(server_root, backup_dir2)
+        # Find latest backup of the instance
+        instance = config_manager.get_instance(instance_name)
+        name = instance.name
+        backup_dir = instance.milestone_backup_dir if milestone else instance.backup_dir
 
         # Get all backup folders, sort by name (which includes timestamp)
         backups = sorted([d for d in os.listdir(backup_dir) if os.path.isdir(os.path.join(backup_dir, d))])
@@ -45,29 +79,39 @@ def load_latest_backup(backup_dir2):
         # Get the latest backup
         latest_backup = backups[-1]
         latest_backup_path = os.path.join(backup_dir, latest_backup)
-        world_path = os.path.join(server_root, 'world')
+        world_path = instance.world_path
 
-        # Stop Minecraft server (assuming stop_mc.py script exists)
-        stop_result = subprocess.run(['python3', os.path.join(base_dir, 'scripts', 'stop_mc.py')],
-                                     capture_output=True)
+        spans = Spans('restore')
+        # Stop Minecraft server
+        if stop_server:
+            with spans.phase('stop'):
+                run_script(os.path.join(base_dir, 'scripts'), 'stop_mc.py', logger, None, (instance.name,))
 
         # Remove existing world
-        if os.path.exists(world_path):
-            shutil.rmtree(world_path)
+        with spans.phase('remove'):
+            if os.path.exists(world_path):
+                shutil.rmtree(world_path)
 
         # Copy backup to world directory
-        shutil.copytree(latest_backup_path, world_path)
+        with spans.phase('copy'):
+            shutil.copytree(latest_backup_path, world_path)
+        BACKUP_DURATION.observe(time.perf_counter() - start, kind='restore', instance=name, result='ok')
+        BACKUP_BYTES.inc(directory_size(world_path), kind='restore', instance=instance.name)
 
-        logger.log(f"Loaded latest backup: {latest_backup}")
+        logger.log(f"Loaded latest backup for '{instance.name}': {latest_backup} ({spans.summary()})")
         return True
     except Exception as e:
+        BACKUP_DURATION.observe(time.perf_counter() - start, kind='restore', instance=name, result='failed')
         logger.log(f"Failed to load latest backup: {e}")
         return False
 
 
 class MinecraftServerManager:
 
-    def __init__(self):
+    def __init__(self, interactive: bool = True):
+        # One-shot runs (python manager.py <command>) never start the scheduler
+        self.interactive = interactive
+
         # Setup base paths
         self.base_dir = os.path.dirname(os.path.abspath(__file__))
         self.scripts_dir = os.path.join(self.base_dir, 'scripts')
@@ -76,12 +120,46 @@ class MinecraftServerManager:
         # Initialize config and logger
         self.config_manager = ConfigManager(self.config_path)
         self.logger = Logger(os.path.join(self.base_dir, 'ManagerLog.txt'))
+        # Profile every command and scheduled job (--profile)
+        self.profile_all = False
+
+        # Pidfiles the start scripts write for the servers and the tunnel
+        self.process_registry = ProcessRegistry(self.config_manager.get_run_dir())
 
         # Initialize scheduling
-        self.scheduled_tasks: Dict[str, schedule.Job] = {}
+        self.scheduled_tasks: Dict[str, 'schedule.Job'] = {}
+        # Warned shutdowns in progress (wsqa), by task ID in scheduled_tasks
+        self.countdowns: Dict[str, 'ShutdownCountdown'] = {}
         self.schedule_thread = None
         self.schedule_running = False
 
+        # Metrics endpoint / textfile writer, started by start_metrics()
+        self.metrics_exporter: Optional['MetricsExporter'] = None
+
+        # Background samplers of each instance's JVM, started by start_stats_sampler()
+        self.stats_samplers: Dict[str, 'ProcessSampler'] = {}
+
+        # Tick health monitors per instance, started by start_lag_monitor()
+        self.lag_monitors: Dict[str, 'LagMonitor'] = {}
+
+        # Crash watchdogs per instance, started by start_watchdog()
+        self.watchdogs: Dict[str, 'Watchdog'] = {}
+
+        # View/simulation distance governors per instance, started by start_governor()
+        self.governors: Dict[str, 'Governor'] = {}
+
+        # Copies finished backups to ReplicaDirs in the background, created on first use
+        self.replicator: Optional['Replicator'] = None
+
+        # One lock per instance so operations on the same instance never overlap,
+        # while operations on different instances run independently
+        self.instance_locks: Dict[str, threading.RLock] = {}
+        self._instance_locks_guard = threading.Lock()
+
+        # Names of commands and scheduled jobs currently running, used to annotate lag
+        self.running_jobs: Dict[str, int] = {}
+        self._running_jobs_lock = threading.Lock()
+
         # Command mapping for scheduling
         self.command_map: Dict[str, Callable[..., Any]] = {
             'sa': self.start_all,
@@ -100,29 +178,236 @@ class MinecraftServerManager:
             'log': self.show_log,
             'auto': self.toggle_autobackup,
             'auto -m': self.toggle_milestonebackup,
-            'amc': lambda: self.attach_to_server('mc'),
+            'amc': lambda selector=None: self.attach_to_server('mc', selector),
             'at': lambda: self.attach_to_server('tunnel'),
+            'stats': self.show_stats,
+            'lag': self.show_lag,
+            'jvm': self.show_jvm_profile,
+            'repl': self.show_replication,
+            'wd': self.show_watchdog,
+            'prune': self.prune,
+            'compact': self.compact,
+            'bdiff': self.backup_diff,
+            'profile': self.profile_command,
+            'gov': self.show_governor,
+            'worldstats': self.world_stats,
         }
 
-    def _run_script(self, script_name: str, log_message: Optional[str] = None) -> bool:
+        # Commands that act on instances; they receive the @instance selector as first argument
+        self.instance_commands = {
+            'sa', 'qa', 'ra', 'smc', 'qmc', 'rmc', 'backup', 'backup -m', 'load', 'load -m',
+            'log', 'amc', 'stats', 'lag', 'jvm', 'repl', 'wd', 'prune', 'compact', 'bdiff', 'profile', 'gov',
+            'worldstats',
+        }
+
+    def _run_script(self, script_name: str, log_message: Optional[str] = None, *args: str) -> bool:
         """
         Run a script from the scripts directory.
         """
-        return run_script(self.scripts_dir, script_name, self.logger, log_message)
+        return run_script(self.scripts_dir, script_name, self.logger, log_message, args)
+
+    def resolve_instances(self, selector: Optional[str] = None) -> List[str]:
+        """
+        Resolve an instance selector to instance names.
+
+        :param selector: None for the default instance, 'all', or a comma-separated list of names
+        """
+        names = self.config_manager.get_instance_names()
+        if not selector:
+            return [self.config_manager.get_default_instance()]
+        if selector == 'all':
+            return names
+        selected = [name.strip() for name in selector.split(',') if name.strip()]
+        unknown = [name for name in selected if name not in names]
+        if unknown:
+            raise ValueError(f"Unknown instance(s): {', '.join(unknown)} (configured: {', '.join(names)})")
+        return selected
+
+    def _instance_lock(self, name: str) -> threading.RLock:
+        with self._instance_locks_guard:
+            return self.instance_locks.setdefault(name, threading.RLock())
+
+    def _for_instances(self, selector: Optional[str], label: Optional[str],
+                       func: Callable[..., Any], *args) -> bool:
+        """
+        Run func(instance_name, *args) for every selected instance.
+        Several instances are handled in parallel, at most MaxParallelInstances at a time.
+
+        :param label: Prefix of the per-instance result line, or None to print nothing
+        :return: True if the function succeeded for every instance
+        """
+        names = self.resolve_instances(selector)
+        if len(names) == 1:
+            results = {names[0]: func(names[0], *args)}
+        else:
+            from concurrent.futures import ThreadPoolExecutor
+
+            workers = min(self.config_manager.get_max_parallel_instances(), len(names))
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                # Each worker runs in a copy of the caller's context so daemon clients get its output
+                futures = {name: pool.submit(contextvars.copy_context().run, in_session_thread(func), name, *args)
+                           for name in names}
+                results = {}
+                for name, future in futures.items():
+                    try:
+                        results[name] = future.result()
+                    except Exception as e:
+                        self.logger.log(f"Error on instance '{name}': {e}")
+                        results[name] = False
+        if label:
+            for name, success in results.items():
+                print(f"{label} ({name}): " + ("Success" if success is not False else "Failed"))
+        return all(success is not False for success in results.values())
+
+    def send_server_message(self, message: str, selector: Optional[str] = None) -> bool:
+        """
+        Send a message/command to the screen sessions of the selected instances.
+        """
+        return self._for_instances(
+            selector, None, lambda name: send_server_message(self.config_manager, message, self.logger, name))
+
+    def _run_command(self, command: str, func: Callable[..., Any], *args) -> Any:
+        """
+        Run a command while recording its count, result and duration.
+        A command counts as failed if it returns False or raises.
+        """
+        start = time.perf_counter()
+        result = 'error'
+        self._job_started(command)
+        try:
+            value = self._profiled(command, func, *args)
+            result = 'failed' if value is False else 'ok'
+            return value
+        finally:
+            self._job_finished(command)
+            COMMAND_DURATION.observe(time.perf_counter() - start, command=command)
+            COMMANDS_TOTAL.inc(command=command, result=result)
+
+    def _profiled(self, label: str, func: Callable[..., Any], *args) -> Any:
+        """Run func(*args), under the profiler if the manager was started with --profile."""
+        if not self.profile_all:
+            return func(*args)
+        return self._profile_call(label, func, *args)
+
+    def _profile_call(self, label: str, func: Callable[..., Any], *args) -> Any:
+        """Run func(*args) under cProfile and tracemalloc and write a report to ProfileDir."""
+        from utils.profiling import ProfileSession
+
+        if active_session.get() is not None:
+            # Already inside a profiled command
+            return func(*args)
+        session = ProfileSession(label)
+        try:
+            return session.run(func, *args)
+        finally:
+            path = session.write_report(self.config_manager.get_profile_dir(self.base_dir))
+            print(f"Profile of '{label}' ({session.wall_seconds:.2f}s) written to {path}")
+            self.logger.log(f"Profile of '{label}' written to {path}")
+
+    def profile_command(self, selector: Optional[str] = None, *command: str):
+        """Run a command under cProfile and tracemalloc, e.g. 'profile backup'."""
+        if not command:
+            print("Usage: profile <command> [args]")
+            return False
+        line = (f"@{selector} " if selector else "") + ' '.join(command)
+        return self._profile_call(' '.join(command), self.handle_command, line)
+
+    def _job_started(self, name: str):
+        with self._running_jobs_lock:
+            self.running_jobs[name] = self.running_jobs.get(name, 0) + 1
+
+    def _job_finished(self, name: str):
+        with self._running_jobs_lock:
+            remaining = self.running_jobs.get(name, 0) - 1
+            if remaining > 0:
+                self.running_jobs[name] = remaining
+            else:
+                self.running_jobs.pop(name, None)
 
-    def send_server_message(self, message: str) -> bool:
+    def get_running_jobs(self) -> list:
+        """Return the names of the commands and scheduled jobs currently running."""
+        with self._running_jobs_lock:
+            return list(self.running_jobs)
+
+    def _scheduled_job(self, task_id: str, job_name: str, func: Callable[..., Any]) -> Callable[[], Any]:
         """
-        Send a message/command to all active screen sessions.
+        Wrap a scheduled job so it runs in its own thread and the delay between
+        its planned and actual fire time is recorded.
+
+        :param task_id: Key of the job in scheduled_tasks
+        :param job_name: Low-cardinality name used as the metric label
+        :param func: Function to run when the job fires
         """
-        return send_server_message(self.config_manager, message, self.logger)
 
-    def schedule_command(self, command: str, delay_minutes: int, *args) -> bool:
+        def run_in_thread():
+            self._job_started(job_name)
+            try:
+                self._profiled(job_name, func)
+            except Exception as e:
+                self.logger.log(f"Scheduled job {task_id} failed: {e}")
+            finally:
+                self._job_finished(job_name)
+
+        def run_job():
+            job = self.scheduled_tasks.get(task_id)
+            if job is not None and job.next_run is not None:
+                lag = (datetime.datetime.now() - job.next_run).total_seconds()
+                SCHEDULER_LAG.observe(max(lag, 0.0), job=job_name)
+            # Run in a thread so a long job (e.g. a backup) never delays other jobs
+            threading.Thread(target=run_in_thread, daemon=True).start()
+
+        return run_job
+
+    def start_services(self):
+        """Start the metrics exporter, samplers, monitors and the configured backup schedules."""
+        self.start_metrics()
+        self.start_stats_sampler('all')
+        self.start_lag_monitor('all')
+        if self.config_manager.is_watchdog_enabled():
+            self.start_watchdog('all')
+        if self.config_manager.is_governor_enabled():
+            self.start_governor('all')
+        # Resume replication interrupted by a crash or restart
+        for name in self.resolve_instances('all'):
+            with self._instance_lock(name):
+                self.replicate(name)
+
+        # Check if autobackup is enabled in config and start it if necessary
+        if self.config_manager.is_autobackup_enabled():
+            self._start_autobackup()
+            print("Autobackup enabled from config.")
+
+        # Check if milestone backup is enabled in config and start it if necessary
+        if self.config_manager.is_milestonebackup_enabled():
+            self._start_milestonebackup()
+            print("MilestoneBackup enabled from config.")
+
+    def start_metrics(self):
+        """Start the /metrics endpoint and/or textfile writer if configured."""
+        port = self.config_manager.get_metrics_port()
+        textfile = self.config_manager.get_metrics_textfile()
+        if not port and not textfile:
+            return
+        from utils.metrics import MetricsExporter
+
+        self.metrics_exporter = MetricsExporter(logger=self.logger)
+        try:
+            if port:
+                self.metrics_exporter.start_http_server(port, self.config_manager.get_metrics_address())
+            if textfile:
+                self.metrics_exporter.start_textfile_writer(
+                    textfile, self.config_manager.get_metrics_textfile_interval())
+        except OSError as e:
+            self.logger.log(f"Failed to start metrics exporter: {e}")
+
+    def schedule_command(self, command: str, delay_minutes: int, *args, selector: Optional[str] = None) -> bool:
         """
         Schedule any command to run after a specified delay.
 
         :param command: Command to schedule
         :param delay_minutes: Minutes to wait before executing
         :param args: Additional arguments for the command
+        :param selector: Instance selector the command applies to
         :return: True if scheduling successful, False otherwise
         """
         try:
@@ -130,28 +415,33 @@ class MinecraftServerManager:
                 print(f"Cannot schedule unknown command: {command}")
                 return False
 
+            if selector:
+                self.resolve_instances(selector)
+
             def scheduled_execution():
                 if command in self.command_map:
-                    self.command_map[command](*args)
+                    self._execute(command, args, selector)
                 elif command.startswith('s '):
                     # Handle server message command
                     message = " ".join(args)
-                    self.send_server_message(message)
+                    self._run_command('s', self.send_server_message, message, selector)
                 elif command == 'sqa':
                     # Handle stop after delay
-                    self.stop_all()
+                    self._run_command('qa', self.stop_all, selector)
 
                 # Remove the scheduled task after execution
                 if task_id in self.scheduled_tasks:
-                    schedule.cancel_job(self.scheduled_tasks[task_id])
+                    _schedule().cancel_job(self.scheduled_tasks[task_id])
                     del self.scheduled_tasks[task_id]
 
             # Create unique task ID
             timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-            task_id = f'{command}_{timestamp}'
+            task_id = f'{command}@{selector}_{timestamp}' if selector else f'{command}_{timestamp}'
 
             # Schedule the job
-            job = schedule.every(delay_minutes).minutes.do(scheduled_execution).tag(task_id)
+            job_name = command.split()[0] if command.startswith('s ') else command
+            job = _schedule().every(delay_minutes).minutes.do(
+                self._scheduled_job(task_id, job_name, scheduled_execution)).tag(task_id)
             self.scheduled_tasks[task_id] = job
 
             # Start the scheduling thread if not already running
@@ -166,89 +456,343 @@ class MinecraftServerManager:
             self.logger.log(f"Failed to schedule command {command}: {e}")
             return False
 
-    def start_all(self):
-        """Start Minecraft server and Playit tunnel"""
+    def _covers_all_instances(self, selector: Optional[str]) -> bool:
+        return set(self.resolve_instances(selector)) == set(self.config_manager.get_instance_names())
+
+    def start_all(self, selector: Optional[str] = None):
+        """Start Minecraft server(s) and Playit tunnel"""
         success = (
                 self._run_script('start_tunnel.py', "Starting Playit tunnel") and
-                self._run_script('start_mc.py', "Starting Minecraft server")
+                self._for_instances(selector, "Start MC", self._start_instance)
         )
         print("Start All: " + ("Success" if success else "Failed"))
+        return success
 
-    def stop_all(self):
-        """Stop Minecraft server and Playit tunnel"""
-        success = (
-                self._run_script('stop_mc.py', "Stopping Minecraft server") and
-                self._run_script('stop_tunnel.py', "Stopping Playit tunnel")
-        )
+    def stop_all(self, selector: Optional[str] = None):
+        """Stop Minecraft server(s) and, once every instance is stopped, the Playit tunnel"""
+        success = self._for_instances(selector, "Stop MC", self._stop_instance)
+        if self._covers_all_instances(selector):
+            success = self._run_script('stop_tunnel.py', "Stopping Playit tunnel") and success
         print("Stop All: " + ("Success" if success else "Failed"))
+        return success
 
-    def restart_all(self):
-        """Restart Minecraft server and Playit tunnel"""
-        self.stop_all()
+    def restart_all(self, selector: Optional[str] = None):
+        """Restart Minecraft server(s) and Playit tunnel"""
+        self.stop_all(selector)
         time.sleep(2)  # Short delay between stop and start
-        self.start_all()
+        return self.start_all(selector)
 
-    def start_mc(self):
+    def _start_instance(self, name: str) -> bool:
+        with self._instance_lock(name):
+            return self._run_script('start_mc.py', f"Starting Minecraft server '{name}'", name)
+
+    def _stop_instance(self, name: str) -> bool:
+        if name in self.watchdogs:
+            self.watchdogs[name].expect_stop()
+        with self._instance_lock(name):
+            return self._run_script('stop_mc.py', f"Stopping Minecraft server '{name}'", name)
+
+    def _restart_instance(self, name: str) -> bool:
+        with self._instance_lock(name):
+            self._stop_instance(name)
+            time.sleep(2)  # Short delay between stop and start
+            return self._start_instance(name)
+
+    def start_mc(self, selector: Optional[str] = None):
         """Start Minecraft server"""
-        success = self._run_script('start_mc.py', "Starting Minecraft server")
-        print("Start MC: " + ("Success" if success else "Failed"))
+        return self._for_instances(selector, "Start MC", self._start_instance)
 
-    def stop_mc(self):
+    def stop_mc(self, selector: Optional[str] = None):
         """Stop Minecraft server"""
-        success = self._run_script('stop_mc.py', "Stopping Minecraft server")
-        print("Stop MC: " + ("Success" if success else "Failed"))
+        return self._for_instances(selector, "Stop MC", self._stop_instance)
 
-    def restart_mc(self):
+    def restart_mc(self, selector: Optional[str] = None):
         """Restart Minecraft server"""
-        self.stop_mc()
-        time.sleep(2)  # Short delay between stop and start
-        self.start_mc()
+        return self._for_instances(selector, "Restart MC", self._restart_instance)
 
     def start_tunnel(self):
         """Start Playit tunnel"""
         success = self._run_script('start_tunnel.py', "Starting Playit tunnel")
         print("Start Tunnel: " + ("Success" if success else "Failed"))
+        return success
 
     def stop_tunnel(self):
         """Stop Playit tunnel"""
         success = self._run_script('stop_tunnel.py', "Stopping Playit tunnel")
         print("Stop Tunnel: " + ("Success" if success else "Failed"))
+        return success
 
     def restart_tunnel(self):
         """Restart Playit tunnel"""
         self.stop_tunnel()
         time.sleep(2)  # Short delay between stop and start
-        self.start_tunnel()
+        return self.start_tunnel()
 
-    def backup(self, milestone=False):  # Fixed: Added milestone parameter
+    def backup(self, selector: Optional[str] = None, milestone=False):  # Fixed: Added milestone parameter
         """Create Minecraft world backup"""
         if milestone:
-            self.milestone_backup()
-        else:
-            success = self._run_script('backup.py', "Creating Minecraft world backup")
-            print("Backup: " + ("Success" if success else "Failed"))
-
-    def load_backup(self, milestone=False):
-        backup_dir = 'milestone_backups' if milestone else 'backups'
-        success = load_latest_backup(backup_dir)
-        print("Load Backup: " + ("Success" if success else "Failed"))
-
-    def load_regular_backup(self, *args):  # Fixed: Added method to handle regular backup loading
+            return self.milestone_backup(selector)
+        return self._for_instances(selector, "Backup", self._backup_instance)
+
+    def _backup_instance(self, name: str, only_if_changed: bool = False) -> bool:
+        backup_dir = self.config_manager.get_instance(name).backup_dir
+
+        def newest_backup():
+            backups = sorted(os.listdir(backup_dir)) if os.path.isdir(backup_dir) else []
+            return backups[-1] if backups else None
+
+        args = (name, '--if-changed') if only_if_changed else (name,)
+        with self._instance_lock(name):
+            previous = newest_backup()
+            start = time.perf_counter()
+            success = self._run_script('backup.py', f"Creating Minecraft world backup of '{name}'", *args)
+            newest = newest_backup()
+            if success and only_if_changed and newest == previous:
+                BACKUPS_SKIPPED.inc(instance=name)
+                return True
+            BACKUP_DURATION.observe(time.perf_counter() - start, kind='regular', instance=name,
+                                    result='ok' if success else 'failed')
+            if success:
+                self.replicate(name, [os.path.join(backup_dir, newest)] if newest and newest != previous else ())
+        if success and newest:
+            BACKUP_BYTES.inc(directory_size(os.path.join(backup_dir, newest)), kind='regular', instance=name)
+        return success
+
+    def autobackup(self, selector: Optional[str] = 'all'):
+        """Back up the selected instances, skipping worlds unchanged since their previous backup."""
+        only_if_changed = self.config_manager.is_skip_unchanged_backups_enabled()
+        return self._for_instances(selector, "Backup", self._backup_instance, only_if_changed)
+
+    def load_backup(self, milestone=False, selector: Optional[str] = None):
+        return self._for_instances(selector, "Load Backup", self._load_instance_backup, milestone)
+
+    def _load_instance_backup(self, name: str, milestone: bool) -> bool:
+        # The restore stops the server; that is not a crash to restart from
+        if name in self.watchdogs:
+            self.watchdogs[name].expect_stop()
+        with self._instance_lock(name):
+            return load_latest_backup(milestone, name)
+
+    def load_regular_backup(self, selector: Optional[str] = None, *args):  # Fixed: Added method to handle regular backup loading
         """Load the latest regular backup"""
-        self.load_backup(False)
+        return self.load_backup(False, selector)
 
-    def load_milestone_backup(self, *args):  # Fixed: Added method to handle milestone backup loading
+    def load_milestone_backup(self, selector: Optional[str] = None, *args):  # Fixed: Added method to handle milestone backup loading
         """Load the latest milestone backup"""
-        self.load_backup(True)
+        return self.load_backup(True, selector)
 
-    def show_log(self):
+    def show_log(self, selector: Optional[str] = None):
         """Show latest Minecraft server log"""
-        log_path = os.path.join(self.config_manager.get_server_root(), 'logs', 'latest.log')
+        for name in self.resolve_instances(selector):
+            log_path = self.config_manager.get_instance(name).log_path
+            try:
+                with open(log_path, 'r') as log_file:
+                    print(log_file.read())
+            except FileNotFoundError:
+                print(f"Log file not found: {log_path}")
+
+    def _server_pid_finder(self, name: str) -> Callable[[], Optional[int]]:
+        """
+        Return a function that finds the pid of an instance's JVM: from its pidfile, or
+        by scanning /proc for servers not started by start_mc.py.
+        """
+        from utils.proc_stats import find_server_pid
+
+        instance = self.config_manager.get_instance(name)
+        try:
+            jar_name = self.config_manager.get_jvm_profile(instance.jvm_profile_name).jar
+        except ValueError:
+            jar_name = 'fabric-server.jar'
+
+        def find_pid(key=server_key(name), root=instance.server_root, jar=jar_name) -> Optional[int]:
+            record = self.process_registry.get(key)
+            pid = record.live_child_pid() if record is not None else None
+            return pid if pid is not None else find_server_pid(root, jar)
+
+        return find_pid
+
+    def start_stats_sampler(self, selector: Optional[str] = 'all'):
+        """Start sampling the resource usage of the instances' JVMs in the background."""
+        from utils.proc_stats import ProcessSampler
+
+        for name in self.resolve_instances(selector):
+            if name not in self.stats_samplers:
+                self.stats_samplers[name] = ProcessSampler(
+                    self._server_pid_finder(name),
+                    self.config_manager.get_stats_sample_interval(),
+                    self.config_manager.get_stats_history_size(),
+                    self.logger)
+            self.stats_samplers[name].start()
+
+    def show_stats(self, selector: Optional[str] = None):
+        """Show current and windowed resource usage of the server JVM."""
+        for name in self.resolve_instances(selector):
+            if name not in self.stats_samplers:
+                self.start_stats_sampler(name)
+            sampler = self.stats_samplers[name]
+            if sampler.history.latest() is None:
+                sampler.sample_once()
+            print(f"[{name}]")
+            print(sampler.report())
+
+    def start_watchdog(self, selector: Optional[str] = 'all'):
+        """Start restarting the instances automatically when their JVM crashes."""
+        from utils.watchdog import Watchdog
+
+        for name in self.resolve_instances(selector):
+            if name not in self.watchdogs:
+                instance = self.config_manager.get_instance(name)
+                self.watchdogs[name] = Watchdog(
+                    name,
+                    self._server_pid_finder(name),
+                    lambda instance_name=name: self._run_command('smc', self._start_instance, instance_name),
+                    instance.log_path,
+                    instance.server_root,
+                    self.config_manager.get_crash_report_dir(self.base_dir),
+                    self.logger,
+                    interval_seconds=self.config_manager.get_watchdog_interval(),
+                    backoff_seconds=self.config_manager.get_watchdog_backoff(),
+                    max_backoff_seconds=self.config_manager.get_watchdog_max_backoff(),
+                    max_restarts=self.config_manager.get_watchdog_max_restarts(),
+                    window_seconds=self.config_manager.get_watchdog_window(),
+                    log_lines=self.config_manager.get_watchdog_log_lines())
+            self.watchdogs[name].start()
+
+    def show_watchdog(self, selector: Optional[str] = None, action: Optional[str] = None):
+        """Show the watchdog state and crash history; 'wd reset' resumes restarts after a crash loop."""
+        if not self.watchdogs:
+            print("The watchdog is not running (WatchdogEnabled).")
+            return False
+        for name in self.resolve_instances(selector):
+            watchdog = self.watchdogs.get(name)
+            if watchdog is None:
+                continue
+            if action == 'reset':
+                watchdog.reset()
+                self.logger.log(f"Watchdog of '{name}' reset")
+            print(f"[{name}]")
+            print(watchdog.report())
+
+    def start_lag_monitor(self, selector: Optional[str] = 'all'):
+        """Start watching latest.log (and RCON, if enabled) of the instances for tick lag."""
+        from utils.lag_monitor import LagDetector, LagMonitor
+        from utils.rcon import rcon_client_for_instance
+
+        for name in self.resolve_instances(selector):
+            if name in self.lag_monitors:
+                self.lag_monitors[name].start()
+                continue
+            instance = self.config_manager.get_instance(name)
+            chat = None
+            if self.config_manager.is_lag_chat_alerts_enabled():
+                chat = lambda message, instance_name=name: self.send_server_message(message, instance_name)
+            self.lag_monitors[name] = LagMonitor(
+                name,
+                instance.log_path,
+                self.logger,
+                rcon_client=rcon_client_for_instance(self.config_manager, instance),
+                rcon_command=self.config_manager.get_lag_rcon_command(),
+                interval_seconds=self.config_manager.get_lag_poll_interval(),
+                warn_mspt=self.config_manager.get_lag_warn_mspt(),
+                warn_behind_ms=self.config_manager.get_lag_warn_behind_ms(),
+                alert_cooldown_seconds=self.config_manager.get_lag_alert_cooldown(),
+                running_jobs=self.get_running_jobs,
+                chat=chat)
+            self.lag_monitors[name].start()
+
+    def show_lag(self, selector: Optional[str] = None):
+        """Show MSPT percentiles and recent lag events."""
+        for name in self.resolve_instances(selector):
+            if name not in self.lag_monitors:
+                self.start_lag_monitor(name)
+            print(f"[{name}]")
+            print(self.lag_monitors[name].report())
+
+    def start_governor(self, selector: Optional[str] = 'all'):
+        """Start adjusting view and simulation distance of the instances to their tick health."""
+        from utils.countdown import parse_player_count
+        from utils.governor import Governor
+        from utils.rcon import RconError
+        from utils.send_message import send_server_message
+
+        view_command = self.config_manager.get_governor_view_command()
+        simulation_command = self.config_manager.get_governor_simulation_command()
+        if not (view_command or simulation_command):
+            self.logger.log("Governor not started: set GovernorViewCommand and/or GovernorSimulationCommand")
+            return
+        self.start_lag_monitor(selector)
+        for name in self.resolve_instances(selector):
+            if name in self.governors:
+                self.governors[name].start()
+                continue
+            monitor = self.lag_monitors[name]
+            if monitor.rcon_client is None:
+                self.logger.log(f"Governor of '{name}' not started: it needs MSPT over RCON (RconEnabled)")
+                continue
+
+            def send_command(command: str, instance_name=name, client=monitor.rcon_client) -> bool:
+                try:
+                    client.command(command)
+                    return True
+                except (OSError, RconError) as e:
+                    self.logger.log(f"RCON command to '{instance_name}' failed, using screen: {e}")
+                return send_server_message(self.config_manager, f'/{command}', self.logger, instance_name,
+                                           echo_log=False)
+
+            def player_count(client=monitor.rcon_client) -> Optional[int]:
+                try:
+                    return parse_player_count(client.command('list'))
+                except (OSError, RconError):
+                    return None
+
+            min_view, max_view = self.config_manager.get_governor_view_bounds()
+            min_simulation, max_simulation = self.config_manager.get_governor_simulation_bounds()
+            self.governors[name] = Governor(
+                name, monitor, send_command, player_count, self._server_pid_finder(name),
+                self.config_manager.get_instance(name).server_root, self.logger,
+                view_command=view_command,
+                simulation_command=simulation_command,
+                min_view=min_view, max_view=max_view,
+                min_simulation=min_simulation, max_simulation=max_simulation,
+                step=self.config_manager.get_governor_step(),
+                high_mspt=self.config_manager.get_governor_high_mspt(),
+                low_mspt=self.config_manager.get_governor_low_mspt(),
+                window_seconds=self.config_manager.get_governor_window(),
+                cooldown_seconds=self.config_manager.get_governor_cooldown(),
+                interval_seconds=self.config_manager.get_lag_poll_interval())
+            self.governors[name].start()
+
+    def show_governor(self, selector: Optional[str] = None, action: Optional[str] = None):
+        """Show the distances set by the governor and its adjustments; 'gov reset' restores the upper bounds."""
+        if not self.governors:
+            print("The governor is not running (GovernorEnabled).")
+            return False
+        success = True
+        for name in self.resolve_instances(selector):
+            governor = self.governors.get(name)
+            if governor is None:
+                continue
+            if action == 'reset':
+                success = governor.reset() and success
+            print(f"[{name}]")
+            print(governor.report())
+        return success
+
+    def show_jvm_profile(self, selector: Optional[str] = None, name: Optional[str] = None):
+        """Show the java command of a launch profile and startup times per profile."""
         try:
-            with open(log_path, 'r') as log_file:
-                print(log_file.read())
-        except FileNotFoundError:
-            print(f"Log file not found: {log_path}")
+            if name is None:
+                name = self.config_manager.get_instance(self.resolve_instances(selector)[0]).jvm_profile_name
+            profile = self.config_manager.get_jvm_profile(name)
+            print(f"JVM profile '{profile.name}': {profile.heap_mb()}M heap, {profile.gc} GC")
+            print("  " + " ".join(profile.build_command()))
+        except (ValueError, OSError) as e:
+            print(f"Invalid JVM profile: {e}")
+            return False
+        from utils.jvm_profile import read_launch_history, summarize_launch_history
+
+        print(summarize_launch_history(read_launch_history(os.path.join(self.base_dir, 'LaunchHistory.jsonl'))))
+        return True
 
     def show_scheduled_tasks(self):
         """Display currently scheduled tasks."""
@@ -258,7 +802,13 @@ class MinecraftServerManager:
 
         print("Current Scheduled Tasks:")
         for task_id, job in self.scheduled_tasks.items():
-            print(f"- Task ID: {task_id} (Next run in {job.next_run - datetime.datetime.now()})")
+            countdown = self.countdowns.get(task_id)
+            if countdown is not None:
+                from utils.countdown import format_duration
+
+                print(f"- Task ID: {task_id} (Shutdown in {format_duration(countdown.remaining())})")
+            else:
+                print(f"- Task ID: {task_id} (Next run in {job.next_run - datetime.datetime.now()})")
 
     def toggle_autobackup(self):
         """Toggle the autobackup setting and start/stop the backup schedule."""
@@ -278,12 +828,14 @@ class MinecraftServerManager:
 
     def _start_autobackup(self):
         """Start scheduled autobackup if not already running."""
-        if "autobackup" not in self.scheduled_tasks:
+        if self.interactive and "autobackup" not in self.scheduled_tasks:
             # Get interval from config (default to 60 minutes if not set)
             autobackup_interval = int(self.config_manager.get('SERVER', 'autobackupinterval', fallback=60))
 
             # Schedule autobackup based on the interval from the config file
-            job = schedule.every(autobackup_interval).minutes.do(self.backup).tag("autobackup")
+            job = _schedule().every(autobackup_interval).minutes.do(
+                self._scheduled_job("autobackup", "autobackup",
+                                    lambda: self._run_command('backup', self.autobackup, 'all'))).tag("autobackup")
             self.scheduled_tasks["autobackup"] = job
             print(f"Autobackup scheduled every {autobackup_interval} minutes.")
             self._start_schedule_thread()
@@ -291,7 +843,7 @@ class MinecraftServerManager:
     def _stop_autobackup(self):
         """Stop scheduled autobackup if it's running."""
         if "autobackup" in self.scheduled_tasks:
-            schedule.cancel_job(self.scheduled_tasks["autobackup"])
+            _schedule().cancel_job(self.scheduled_tasks["autobackup"])
             del self.scheduled_tasks["autobackup"]
             print("Autobackup schedule stopped.")
 
@@ -313,12 +865,14 @@ class MinecraftServerManager:
 
     def _start_milestonebackup(self):
         """Start scheduled milestone backup if not already running."""
-        if "milestonebackup" not in self.scheduled_tasks:
+        if self.interactive and "milestonebackup" not in self.scheduled_tasks:
             milestonebackup_interval = self.config_manager.get_milestone_backup_interval()
-            milestonebackup_dir = self.config_manager.get_milestone_backup_dir()
 
             # Schedule milestone backup based on interval from the config file
-            job = schedule.every(milestonebackup_interval).minutes.do(self.milestone_backup).tag("milestonebackup")
+            job = _schedule().every(milestonebackup_interval).minutes.do(
+                self._scheduled_job("milestonebackup", "milestonebackup",
+                                    lambda: self._run_command('backup -m', self.milestone_backup, 'all'))
+            ).tag("milestonebackup")
             self.scheduled_tasks["milestonebackup"] = job
             print(f"Milestone backup scheduled every {milestonebackup_interval} minutes.")
             self._start_schedule_thread()
@@ -326,59 +880,344 @@ class MinecraftServerManager:
     def _stop_milestonebackup(self):
         """Stop scheduled milestone backup if it's running."""
         if "milestonebackup" in self.scheduled_tasks:
-            schedule.cancel_job(self.scheduled_tasks["milestonebackup"])
+            _schedule().cancel_job(self.scheduled_tasks["milestonebackup"])
             del self.scheduled_tasks["milestonebackup"]
             print("Milestone backup schedule stopped.")
 
-    def milestone_backup(self):
+    def milestone_backup(self, selector: Optional[str] = None):
         """Create a milestone backup without a max backup limit."""
-        milestonebackup_dir = self.config_manager.get_milestone_backup_dir()
+        return self._for_instances(selector, "Milestone Backup", self._milestone_backup_instance)
+
+    def _milestone_backup_instance(self, name: str) -> bool:
+        from utils.throttle import ThrottledCopier, load_throttle_settings, run_with_priority
+
+        instance = self.config_manager.get_instance(name)
+        milestonebackup_dir = instance.milestone_backup_dir
         timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
         backup_path = os.path.join(milestonebackup_dir, f"milestone_backup_{timestamp}")
         os.makedirs(milestonebackup_dir, exist_ok=True)
 
-        success = shutil.copytree(os.path.join(self.config_manager.get_server_root(), 'world'), backup_path)
-        self.logger.log(f"Milestone backup created: {backup_path}")
+        settings = load_throttle_settings(self.config_manager)
+        is_lagging = self._lag_check(name) if settings.adaptive else None
+        copier = ThrottledCopier(settings, is_lagging)
+        spans = Spans('milestone')
+        with self._instance_lock(name):
+            start = time.perf_counter()
+            try:
+                with spans.phase('copy'):
+                    run_with_priority(settings, copier.copytree, instance.world_path, backup_path, logger=self.logger)
+            except Exception as e:
+                BACKUP_DURATION.observe(time.perf_counter() - start, kind='milestone', instance=name, result='failed')
+                self.logger.log(f"Failed to create milestone backup of '{name}': {e}")
+                return False
+            finally:
+                # Only the copy backs off on lag
+                if is_lagging is not None:
+                    is_lagging.close()
+            BACKUP_DURATION.observe(time.perf_counter() - start, kind='milestone', instance=name, result='ok')
+            if self.config_manager.is_backup_manifests_enabled():
+                from utils.backup_manifest import ensure_manifest
+
+                try:
+                    with spans.phase('manifest'):
+                        run_with_priority(settings, ensure_manifest, self.base_dir, name, 'milestone_backups',
+                                          backup_path)
+                except Exception as e:
+                    self.logger.log(f"Could not write the manifest of {backup_path}: {e}")
+            self.replicate(name, [backup_path])
+        BACKUP_BYTES.inc(copier.bytes_copied, kind='milestone', instance=name)
+        BACKUP_THROTTLE_SECONDS.inc(copier.throttled_seconds, kind='milestone', instance=name)
+        self.logger.log(f"Milestone backup created: {backup_path} ({copier.summary()}; {spans.summary()})")
+        return True
 
+    def replicate(self, selector: Optional[str] = None, finished: Iterable[str] = ()):
+        """
+        Queue the finished backups of the instances that are not on every ReplicaDirs target yet.
 
+        :param finished: Paths of backups just written; other backups are only replicated
+                         once they are known to be complete (see Replicator)
+        """
+        names = [name for name in self.resolve_instances(selector)
+                 if self.config_manager.get_instance(name).replica_dirs]
+        if not names:
+            return
+        if self.replicator is None:
+            from utils.replication import Replicator
+
+            self.replicator = Replicator(self.config_manager, self.logger)
+        self.replicator.catch_up(names, finished)
+
+    def show_replication(self, selector: Optional[str] = None):
+        """Show pending replications, lag and the last replicated backup per target."""
+        from utils.replication import Replicator
+
+        if self.replicator is None:
+            self.replicator = Replicator(self.config_manager, self.logger)
+        for name in self.resolve_instances(selector):
+            print(f"[{name}]")
+            print(self.replicator.report(name))
+
+    def _check_stopped(self, name: str, action: str) -> bool:
+        """Whether an instance's server is down, so its world files can be rewritten; prints why not."""
+        if self._server_pid_finder(name)() is not None:
+            print(f"[{name}] The server is running; stop it before {action}.")
+            return False
+        return True
 
-    def warn_and_schedule_stop_all(self, delay_minutes: int):
+    def prune(self, selector: Optional[str] = None, action: Optional[str] = None):
         """
-        Warn players about an upcoming server shutdown and then schedule the stop.
+        Remove chunks players barely visited (InhabitedTime below PruneMinInhabitedTicks)
+        from the worlds of stopped servers. Without 'apply' only the space that would be
+        reclaimed is reported.
+        """
+        from utils.prune import format_report, parse_protected_boxes, prune_world, spawn_box
 
-        :param delay_minutes: Number of minutes to wait before stopping.
+        if action not in (None, 'apply'):
+            print("Usage: prune [apply]")
+            return False
+        apply = action == 'apply'
+        min_ticks = self.config_manager.get_prune_min_inhabited_ticks()
+        try:
+            boxes = parse_protected_boxes(self.config_manager.get_prune_protect())
+        except ValueError as e:
+            print(f"PruneProtect: {e}")
+            return False
+
+        success = True
+        # One instance at a time; each prune already uses every core
+        for name in self.resolve_instances(selector):
+            instance = self.config_manager.get_instance(name)
+            with self._instance_lock(name):
+                if not self._check_stopped(name, "pruning"):
+                    success = False
+                    continue
+                instance_boxes = {dimension: list(entries) for dimension, entries in boxes.items()}
+                spawn = spawn_box(instance.world_path, self.config_manager.get_prune_spawn_radius())
+                if spawn is not None:
+                    instance_boxes['overworld'].append(spawn)
+                start = time.perf_counter()
+                try:
+                    results = prune_world(instance.world_path, min_ticks, instance_boxes, apply,
+                                          self.config_manager.get_maintenance_workers())
+                except Exception as e:
+                    self.logger.log(f"Pruning the world of '{name}' failed: {e}")
+                    success = False
+                    continue
+            print(f"[{name}] Chunks with InhabitedTime below {min_ticks} ticks "
+                  f"({time.perf_counter() - start:.1f}s):")
+            print(format_report(results, apply))
+            if apply:
+                reclaimed = sum(result.reclaimed for region_results in results.values() for result in region_results)
+                self.logger.log(f"Pruned the world of '{name}', reclaiming {reclaimed / 1024 / 1024:.1f} MiB")
+        return success
+
+    def _find_backup(self, name: str, backup: str) -> Optional[Tuple[str, str]]:
+        """
+        Resolve a backup of an instance by name or unique part of its name, e.g. a timestamp.
+
+        :return: (kind, path), kind being 'backups' or 'milestone_backups'; None if not found or ambiguous
+        """
+        instance = self.config_manager.get_instance(name)
+        candidates = []
+        for kind, backup_dir in (('backups', instance.backup_dir), ('milestone_backups', instance.milestone_backup_dir)):
+            if not os.path.isdir(backup_dir):
+                continue
+            for entry in sorted(os.listdir(backup_dir)):
+                if os.path.isdir(os.path.join(backup_dir, entry)):
+                    if entry == backup:
+                        return kind, os.path.join(backup_dir, entry)
+                    if backup in entry:
+                        candidates.append((kind, os.path.join(backup_dir, entry)))
+        if len(candidates) == 1:
+            return candidates[0]
+        if candidates:
+            print(f"'{backup}' matches {len(candidates)} backups: "
+                  + ', '.join(os.path.basename(path) for _, path in candidates))
+        else:
+            print(f"No backup of '{name}' matches '{backup}'")
+        return None
+
+    def backup_diff(self, selector: Optional[str] = None, old: Optional[str] = None, new: Optional[str] = None):
+        """
+        Show which files, region chunks and player data differ between two backups, using
+        their manifests. A backup without a cached manifest gets one built first.
+        """
+        from utils.backup_manifest import BackupDiff, ensure_manifest
+
+        if not old or not new:
+            print("Usage: bdiff <backup> <backup> (names or unique parts of them, e.g. timestamps)")
+            return False
+        name = self.resolve_instances(selector)[0]
+        old_backup, new_backup = self._find_backup(name, old), self._find_backup(name, new)
+        if old_backup is None or new_backup is None:
+            return False
+        start = time.perf_counter()
+        manifests = [ensure_manifest(self.base_dir, name, kind, path) for kind, path in (old_backup, new_backup)]
+        diff = BackupDiff(*manifests)
+        print(f"[{name}] {os.path.basename(old_backup[1])} -> {os.path.basename(new_backup[1])} "
+              f"({time.perf_counter() - start:.2f}s)")
+        print(diff.format())
+        return True
+
+    def compact(self, selector: Optional[str] = None):
+        """Rewrite the region files of stopped servers without the free sectors between chunks."""
+        from utils.compact import compact_world, format_report
+
+        success = True
+        for name in self.resolve_instances(selector):
+            instance = self.config_manager.get_instance(name)
+            with self._instance_lock(name):
+                if not self._check_stopped(name, "compacting"):
+                    success = False
+                    continue
+                start = time.perf_counter()
+                try:
+                    results = compact_world(instance.world_path, self.config_manager.get_maintenance_workers())
+                except Exception as e:
+                    self.logger.log(f"Compacting the world of '{name}' failed: {e}")
+                    success = False
+                    continue
+            report = format_report(results)
+            print(f"[{name}] {report} in {time.perf_counter() - start:.1f}s")
+            self.logger.log(f"Compacted the world of '{name}': {report.splitlines()[0]}")
+            success = success and not any(result.error for result in results)
+        return success
+
+    def world_stats(self, selector: Optional[str] = None, output: Optional[str] = None):
+        """Show chunk counts, stored and file bytes, recent regions and the largest chunks; 'json' for JSON."""
+        import json
+
+        from utils.worldstats import format_table, scan_world, summarize
+
+        if output not in (None, 'json'):
+            print("Usage: worldstats [json]")
+            return False
+        summaries = {}
+        for name in self.resolve_instances(selector):
+            start = time.perf_counter()
+            try:
+                results = scan_world(self.config_manager.get_instance(name).world_path,
+                                     self.config_manager.get_maintenance_workers())
+            except Exception as e:
+                self.logger.log(f"Reading the world stats of '{name}' failed: {e}")
+                return False
+            summaries[name] = summarize(results)
+            if output is None:
+                print(f"[{name}] {len(results)} region files read in {time.perf_counter() - start:.2f}s")
+                print(format_table(summaries[name]))
+        if output == 'json':
+            print(json.dumps(summaries, indent=2))
+        return True
+
+    def _lag_check(self, name: str) -> 'LagDetector':
+        """Return a check whether an instance lagged recently, reusing its running lag monitor; close it after use."""
+        from utils.lag_monitor import LagDetector, lag_detector
+
+        monitor = self.lag_monitors.get(name)
+        if monitor is not None and monitor.running:
+            return LagDetector(monitor, owned=False)
+        return lag_detector(self.config_manager, self.config_manager.get_instance(name), self.logger)
+
+    def warn_and_schedule_stop_all(self, delay_minutes: int, selector: Optional[str] = None):
         """
-        warning_message = f"Server will shutdown in {delay_minutes} minutes. Please prepare to log out."
+        Count down to stopping the servers, warning players at each ShutdownWarnings stage
+        and every second of the final countdown. The countdown is advanced by the scheduler
+        thread, can be cancelled with rs, and stops early once no players are online.
 
-        # Send the warning message to all active screen sessions
-        if not self.send_server_message(warning_message):
-            self.logger.log("Failed to send warning message to any active screen session.")
+        :param delay_minutes: Number of minutes to wait before stopping.
+        :param selector: Instance selector of the servers to stop.
+        """
+        from utils.countdown import RCON_TIMEOUT_SECONDS, ShutdownCountdown, parse_player_count
+        from utils.rcon import RconError, rcon_client_for_instance
 
-        # Schedule the server stop
-        self.schedule_stop_all(delay_minutes)
+        names = self.resolve_instances(selector)
+        task_id = f'wsqa@{selector}_{delay_minutes}' if selector else f'wsqa_{delay_minutes}'
+        if task_id in self.scheduled_tasks:
+            print(f"A shutdown countdown is already running (Task ID: {task_id})")
+            return False
+        rcon_clients = {name: rcon_client_for_instance(self.config_manager, self.config_manager.get_instance(name),
+                                                       RCON_TIMEOUT_SECONDS)
+                        for name in names}
+
+        def announce(message: str):
+            for name, client in rcon_clients.items():
+                try:
+                    if client is not None:
+                        client.command(f'say {message}')
+                        continue
+                except (OSError, RconError) as e:
+                    self.logger.log(f"RCON message to '{name}' failed, using screen: {e}")
+                send_server_message(self.config_manager, message, self.logger, name, echo_log=False)
+
+        def close_clients():
+            for client in rcon_clients.values():
+                if client is not None:
+                    client.close()
+
+        early_when_empty = self.config_manager.is_shutdown_early_when_empty()
+        if early_when_empty and None in rcon_clients.values():
+            # The player count is only available over RCON
+            early_when_empty = False
+            self.logger.log("Early shutdown of empty servers needs RconEnabled; counting down in full")
+        check_interval = self.config_manager.get_shutdown_player_check_interval()
+        next_check = [time.monotonic() + check_interval]
+
+        def check_players():
+            try:
+                counts = [parse_player_count(client.command('list')) for client in rcon_clients.values()]
+            except (OSError, RconError):
+                return
+            if counts and all(count == 0 for count in counts) and task_id in self.countdowns:
+                self.logger.log(f"No players online; stopping {', '.join(names)} now ({task_id})")
+                countdown.stop_now()
+
+        def stop():
+            countdown.close()
+            self._run_command('qa', self.stop_all, selector)
+
+        def tick():
+            if countdown.tick():
+                self._scheduled_job(task_id, 'wsqa', stop)()
+                # rs or an early stop may already have removed it
+                self.countdowns.pop(task_id, None)
+                self.scheduled_tasks.pop(task_id, None)
+                return _schedule().CancelJob
+            if early_when_empty and time.monotonic() >= next_check[0]:
+                next_check[0] = time.monotonic() + check_interval
+                # Inline on the scheduler thread: the clients' short timeout bounds the wait
+                check_players()
+
+        countdown = ShutdownCountdown(delay_minutes * 60, self.config_manager.get_shutdown_warnings(),
+                                      self.config_manager.get_shutdown_final_countdown(), announce, close_clients)
+        self.countdowns[task_id] = countdown
+        self.scheduled_tasks[task_id] = _schedule().every(1).seconds.do(tick).tag(task_id)
+        self._start_schedule_thread()
 
-        log_message = f"Warned players and scheduled server stop in {delay_minutes} minutes."
+        log_message = f"Started shutdown countdown of {delay_minutes} minutes (Task ID: {task_id})"
         print(log_message)
         self.logger.log(log_message)
+        return True
 
-    def schedule_stop_all(self, delay_minutes: int):
+    def schedule_stop_all(self, delay_minutes: int, selector: Optional[str] = None):
         """
         Schedule stopping the Minecraft server and Playit tunnel.
         
         :param delay_minutes: Number of minutes to wait before stopping
+        :param selector: Instance selector of the servers to stop
         """
+        self.resolve_instances(selector)
 
         def scheduled_stop():
-            self.stop_all()
+            self._run_command('qa', self.stop_all, selector)
             # Cancel this job after it runs
             if task_id in self.scheduled_tasks:
-                schedule.cancel_job(self.scheduled_tasks[task_id])
+                _schedule().cancel_job(self.scheduled_tasks[task_id])
                 del self.scheduled_tasks[task_id]
                 print(f"Scheduled stop task completed and removed: {task_id}")
 
         # Schedule the job to run once after delay_minutes
-        task_id = f'sqa_{delay_minutes}'
-        job = schedule.every(delay_minutes).minutes.do(scheduled_stop).tag(task_id)
+        task_id = f'sqa@{selector}_{delay_minutes}' if selector else f'sqa_{delay_minutes}'
+        job = _schedule().every(delay_minutes).minutes.do(self._scheduled_job(task_id, 'sqa', scheduled_stop)).tag(task_id)
         self.scheduled_tasks[task_id] = job
 
         print(f"Scheduled server stop in {delay_minutes} minutes")
@@ -389,12 +1228,12 @@ class MinecraftServerManager:
 
     def _start_schedule_thread(self):
         """Start the thread that runs scheduled jobs."""
-        if not self.schedule_running:
+        if self.interactive and not self.schedule_running:
             self.schedule_running = True
 
             def run_schedule():
                 while self.schedule_running:
-                    schedule.run_pending()
+                    _schedule().run_pending()
                     time.sleep(1)
 
             # Create and start the thread
@@ -411,34 +1250,37 @@ class MinecraftServerManager:
             self.schedule_thread = None
             print("Scheduling thread stopped.")
 
-    def attach_to_server(self, target: str = "mc"):
+    def attach_to_server(self, target: str = "mc", selector: Optional[str] = None):
         """
         Attach to a screen session for either Minecraft server or tunnel.
 
         Args:
             target (str): Either 'mc' for Minecraft server or 'tunnel' for Playit tunnel
                          Default is 'mc'
+            selector (str): Instance to attach to when target is 'mc'
         """
+        screen_name = "playitScreen"
         try:
-            screen_name = "minecraftScreen" if target == "mc" else "playitScreen"
+            if target == "mc":
+                names = self.resolve_instances(selector)
+                if len(names) != 1:
+                    print("Attach needs exactly one instance, e.g. '@lobby amc'.")
+                    return False
+                screen_name = self.config_manager.get_instance(names[0]).screen_name
+                record = self.process_registry.find_session(server_key(names[0]), screen_name)
+                session = record.session_id if record else None
+            else:
+                pid = find_screen_process(screen_name)
+                session = f"{pid}.{screen_name}" if pid is not None else None
 
             # First check if the screen session exists
-            try:
-                screen_sessions = subprocess.check_output(['screen', '-ls'], stderr=subprocess.STDOUT, text=True)
-                if screen_name not in screen_sessions:
-                    print(f"No active {screen_name} session found.")
-                    self.logger.log(f"Attempted to attach to non-existent screen session: {screen_name}")
-                    return False
-            except subprocess.CalledProcessError as e:
-                if "No Sockets found" in str(e.output):
-                    print(f"No active screen sessions found.")
-                else:
-                    print(f"Error checking screen sessions: {e}")
-                self.logger.log(f"Failed to check screen sessions: {e}")
+            if session is None:
+                print(f"No active {screen_name} session found.")
+                self.logger.log(f"Attempted to attach to non-existent screen session: {screen_name}")
                 return False
 
             # Attempt to attach to the screen session
-            subprocess.run(['screen', '-r', screen_name], check=True)
+            subprocess.run(['screen', '-r', session], check=True)
             return True
 
         except subprocess.CalledProcessError as e:
@@ -450,44 +1292,67 @@ class MinecraftServerManager:
             self.logger.log(f"Error in attach_to_server: {e}")
             return False
 
+    def _execute(self, command: str, args=(), selector: Optional[str] = None) -> Any:
+        """Run a command from command_map, passing the instance selector to instance commands."""
+        func = self.command_map[command]
+        if command in self.instance_commands:
+            return self._run_command(command, func, selector, *args)
+        if selector:
+            print(f"'{command}' does not act on an instance; ignoring @{selector}")
+        return self._run_command(command, func, *args)
+
     def handle_command(self, command_input: str) -> bool:
         """
-        Handle command input including scheduling syntax.
+        Handle command input including scheduling syntax and an optional
+        leading instance selector (@name, @name1,name2 or @all).
+
+        :return: False if the command is unknown, failed or raised
         """
         try:
             parts = command_input.strip().split()
             if not parts:
                 return False
 
+            selector = None
+            if parts[0].startswith('@'):
+                selector = parts[0][1:]
+                parts = parts[1:]
+                if not parts:
+                    return False
+
             # Check for scheduling syntax: command -s minutes
             if len(parts) >= 3 and parts[-2] == '-s' and parts[-1].isdigit():
                 delay_minutes = int(parts[-1])
                 base_command = " ".join(parts[:-2])
-                return self.schedule_command(base_command, delay_minutes, *parts[1:-2])
+                return self.schedule_command(base_command, delay_minutes, *parts[1:-2], selector=selector)
 
             # Handle regular commands
             command = " ".join(parts)  # Fixed: Join all parts to handle commands with spaces
             base_command = parts[0].lower()
 
+            result = True
             if command in self.command_map:
-                self.command_map[command]()  # Fixed: Use full command string for lookup
+                result = self._execute(command, (), selector)  # Fixed: Use full command string for lookup
             elif base_command in self.command_map:
-                self.command_map[base_command](*parts[1:])
+                result = self._execute(base_command, parts[1:], selector)
             elif base_command == 'sqa' and len(parts) == 2 and parts[1].isdigit():
-                self.schedule_stop_all(int(parts[1]))
+                self.schedule_stop_all(int(parts[1]), selector)
             elif base_command == 'wsqa' and len(parts) == 2 and parts[1].isdigit():
-                self.warn_and_schedule_stop_all(int(parts[1]))
+                self.warn_and_schedule_stop_all(int(parts[1]), selector)
             elif base_command == 'rs' and len(parts) == 2:
                 task_id = parts[1]
                 if task_id in self.scheduled_tasks:
-                    schedule.cancel_job(self.scheduled_tasks[task_id])
+                    _schedule().cancel_job(self.scheduled_tasks[task_id])
                     del self.scheduled_tasks[task_id]
+                    countdown = self.countdowns.pop(task_id, None)
+                    if countdown is not None:
+                        countdown.cancel()
                     print(f"Removed scheduled task: {task_id}")
                 else:
                     print(f"No such scheduled task: {task_id}")
             elif base_command == 's' and len(parts) >= 2:
                 message_body = " ".join(parts[1:])
-                self.send_server_message(message_body)
+                result = self._run_command('s', self.send_server_message, message_body, selector)
             elif base_command == 'ss':
                 self.show_scheduled_tasks()
             elif base_command == 'help':
@@ -500,7 +1365,8 @@ class MinecraftServerManager:
                 print("Unknown command. Type 'help' for a list of commands.")
                 return False
 
-            return True
+            # Commands report failure by returning False
+            return result is not False
 
         except Exception as e:
             print(f"Error handling command: {e}")
@@ -529,44 +1395,114 @@ class MinecraftServerManager:
         - auto -m      : Toggle milestone backup
         - amc          : Attach to Minecraft server console
         - at           : Attach to Playit tunnel console
+        - stats        : Show server JVM CPU, memory, threads, FDs and I/O
+        - lag          : Show MSPT percentiles and recent lag events
+        - jvm [profile]: Show JVM launch command and startup times per profile
+        - repl         : Show backup replication status and lag
+        - wd [reset]   : Show crash watchdog state; reset resumes restarts after a crash loop
+        - gov [reset]  : Show view/simulation distance set by the governor; reset restores the maximum
+        - prune [apply]: Report (or, with apply, remove) barely visited chunks of a stopped server
+        - compact      : Rewrite region files of a stopped server without free sectors
+        - bdiff <a> <b>: Show changed files, chunks and player data between two backups
+        - worldstats [json]: Show chunk counts, sizes, recent regions and largest chunks per dimension
+        - profile <cmd>: Run a command under cProfile and tracemalloc and write a report
         - sqa <minutes>: Schedule server stop after a delay
-        - wsqa <minutes>: Warn players and schedule stop after a delay
+        - wsqa <minutes>: Count down to a stop, warning players at each stage
         - rs <task_id> : Remove a scheduled task by ID
         - ss           : Show scheduled tasks
+        - jobs         : Show commands running in the background
         - s <txt>      : Send a message to console (/say is added) 
                          or a command (if it's already starting with /)
 
         Add -s <minutes> to any command to schedule it
+        Prefix a command with @<instance>, @<a>,<b> or @all to choose instances
         - help         : Show this help message
         - exit         : Exit the program
         """
         print(help_text)
         self.logger.log("Displayed help information")
 
-def main():
+def run_once(argv: List[str], profile: bool = False) -> int:
+    """
+    Run a single command given on the command line and return the exit status:
+    0 on success, 1 if the command failed, 2 for unknown or interactive-only commands.
+
+    :param profile: Profile the command (--profile)
+    """
+    parts = argv[1:] if argv and argv[0].startswith('@') else argv
+    if not parts:
+        print("Usage: manager.py [@instance] <command> [args]")
+        return 2
+    base_command = parts[0].lower()
+    if base_command in SCHEDULER_COMMANDS or (len(parts) >= 3 and parts[-2] == '-s'):
+        print(f"'{' '.join(parts)}' needs the running scheduler; use the interactive manager "
+              f"or send it to the daemon with msmctl.py.")
+        return 2
+
+    manager = MinecraftServerManager(interactive=False)
+    manager.profile_all = profile
+    if (' '.join(parts) not in manager.command_map and base_command not in manager.command_map
+            and base_command not in ('s', 'help')):
+        print(f"Unknown command '{parts[0]}'. Run 'manager.py help' for a list of commands.")
+        return 2
+    success = manager.handle_command(' '.join(argv))
+    if manager.replicator is not None and manager.replicator.pending:
+        # Finish copying the new backup; an interrupted copy would be resumed later anyway
+        print("Waiting for replication to finish...")
+        manager.replicator.drain()
+    return 0 if success else 1
+
+
+def run_daemon(profile: bool = False) -> int:
+    """
+    Run the manager without a console: it owns the scheduler, jobs and monitors and
+    takes commands from any number of clients over the control socket (see msmctl.py).
+    """
+    import signal
+    from utils.control import ControlServer
+
     manager = MinecraftServerManager()
+    manager.profile_all = profile
+    stopped = threading.Event()
+    control = ControlServer(manager.config_manager.get_control_socket(manager.base_dir),
+                            manager.handle_command, manager.logger, on_shutdown=stopped.set)
+    try:
+        control.start()
+    except (RuntimeError, OSError) as e:
+        print(f"Cannot start daemon: {e}")
+        return 1
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, lambda *_: stopped.set())
+    manager.start_services()
+
+    stopped.wait()
+    control.stop()
+    manager.stop_schedule_thread()
+    manager.logger.log("Manager daemon stopped")
+    return 0
 
-    # Check if autobackup is enabled in config and start it if necessary
-    if manager.config_manager.is_autobackup_enabled():
-        manager._start_autobackup()
-        print("Autobackup enabled from config.")
 
-    # Check if autobackup is enabled in config and start it if necessary
-    if manager.config_manager.is_milestonebackup_enabled():
-        manager._start_milestonebackup()
-        print("MilestoneBackup enabled from config.")
+def main():
+    # --profile writes a profile report for every command and scheduled job
+    argv = [arg for arg in sys.argv[1:] if arg != '--profile']
+    profile = len(argv) != len(sys.argv) - 1
+    if argv == ['--daemon']:
+        sys.exit(run_daemon(profile))
+    if argv:
+        sys.exit(run_once(argv, profile))
+
+    manager = MinecraftServerManager()
+    manager.profile_all = profile
+    manager.start_services()
 
     print("Minecraft Server Manager")
     manager.help()
 
-    while True:
-        try:
-            command_input = input("Enter command (or 'help' for options): ").strip()
-            manager.handle_command(command_input)
+    import asyncio
+    from utils.command_loop import CommandLoop
+
+    asyncio.run(CommandLoop(manager, max_jobs=manager.config_manager.get_max_concurrent_commands()).run())
 
-        except Exception as e:
-            print(f"An error occurred: {e}")
-            manager.logger.log(f"Error in main loop: {e}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,110 @@
+# msmctl.py
+"""
+Thin client for the manager daemon (python manager.py --daemon).
+
+    python msmctl.py <command...>          run a command, e.g. msmctl.py @lobby backup
+    python msmctl.py --follow              stream the manager log until interrupted
+    python msmctl.py --shutdown            stop the daemon
+    python msmctl.py --socket PATH ...     use another control socket
+
+Exits with 0 when the command succeeded, 1 when it failed and 3 when no daemon is listening.
+Only the standard library modules below are imported, so each call starts quickly.
+"""
+import json
+import os
+import socket
+import struct
+import sys
+
+# Must match utils/control.py
+FRAME_HEADER = struct.Struct('>I')
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def default_socket_path() -> str:
+    """ControlSocket from config.ini, or manager.sock next to it."""
+    try:
+        with open(os.path.join(BASE_DIR, 'config.ini')) as config_file:
+            in_server_section = False
+            for line in config_file:
+                line = line.strip()
+                if line.startswith('['):
+                    in_server_section = line == '[SERVER]'
+                elif in_server_section and '=' in line:
+                    key, value = line.split('=', 1)
+                    if key.strip().lower() == 'controlsocket' and value.strip():
+                        return value.strip()
+    except OSError:
+        pass
+    return os.path.join(BASE_DIR, 'manager.sock')
+
+
+def send_frame(sock: socket.socket, message: dict):
+    data = json.dumps(message).encode('utf-8')
+    sock.sendall(FRAME_HEADER.pack(len(data)) + data)
+
+
+def recv_exact(sock: socket.socket, size: int) -> bytes:
+    data = b''
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("The daemon closed the connection")
+        data += chunk
+    return data
+
+
+def recv_frame(sock: socket.socket) -> dict:
+    (length,) = FRAME_HEADER.unpack(recv_exact(sock, FRAME_HEADER.size))
+    return json.loads(recv_exact(sock, length).decode('utf-8'))
+
+
+def main(argv) -> int:
+    socket_path = None
+    if len(argv) >= 2 and argv[0] == '--socket':
+        socket_path, argv = argv[1], argv[2:]
+    if not argv:
+        print(__doc__.strip())
+        return 1
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(socket_path or default_socket_path())
+    except OSError as e:
+        print(f"Cannot reach the manager daemon: {e}", file=sys.stderr)
+        return 3
+
+    with sock:
+        try:
+            if argv == ['--follow']:
+                send_frame(sock, {'op': 'follow'})
+            elif argv == ['--shutdown']:
+                send_frame(sock, {'op': 'shutdown'})
+            else:
+                send_frame(sock, {'op': 'command', 'line': ' '.join(argv)})
+            while True:
+                message = recv_frame(sock)
+                kind = message.get('type')
+                if kind == 'output':
+                    sys.stdout.write(message['data'])
+                    sys.stdout.flush()
+                elif kind == 'log':
+                    print(message['data'], flush=True)
+                elif kind == 'result':
+                    return 0 if message.get('ok') else 1
+                elif kind == 'error':
+                    print(f"Daemon error: {message.get('error')}", file=sys.stderr)
+                    return 1
+        except KeyboardInterrupt:
+            return 0
+        except (ConnectionError, OSError) as e:
+            if argv == ['--follow']:
+                # The daemon stopped
+                return 0
+            print(f"Lost connection to the manager daemon: {e}", file=sys.stderr)
+            return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
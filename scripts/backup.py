@@ -1,18 +1,34 @@
 # scripts/backup.py
 import os
-import shutil
 import sys
+import time
 from datetime import datetime
 
 # Add parent directory to path to import utils
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from utils.logger import Logger
 from utils.config_manager import ConfigManager
+from utils.lag_monitor import lag_detector
+from utils.backup_manifest import ensure_manifest
+from utils.prewarm import update_heat
+from utils.spans import Spans
+from utils.world_index import (find_changes, load_world_index, read_signals, save_world_index, scan_world,
+                               update_index)
+from utils.throttle import ThrottledCopier, load_throttle_settings, run_with_priority, throttled_rmtree
 
 
-def create_minecraft_backup():
+def remove_old_backups(backup_dir, max_backups, settings, logger):
+    """Delete the oldest backups until at most max_backups remain."""
+    backups = sorted(os.listdir(backup_dir))
+    for backup_name in backups[:max(len(backups) - max_backups, 0)]:
+        run_with_priority(settings, throttled_rmtree, os.path.join(backup_dir, backup_name),
+                          settings.delete_files_per_second)
+        logger.log(f"Oldest backup removed: {backup_name}")
+
+
+def create_minecraft_backup(instance_name=None, only_if_changed=False, base_dir=None):
     # Get config and log paths
-    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    base_dir = base_dir or os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
     config_path = os.path.join(base_dir, 'config.ini')
     log_path = os.path.join(base_dir, 'ManagerLog.txt')
 
@@ -20,13 +36,13 @@ def create_minecraft_backup():
     config_manager = ConfigManager(config_path)
     logger = Logger(log_path)
 
-    # Get server root and max backups from config
-    server_root = config_manager.get_server_root()
-    max_backups = config_manager.get_max_world_backups()
-
     try:
+        # Get world location and max backups of the instance from config
+        instance = config_manager.get_instance(instance_name)
+        max_backups = instance.max_world_backups
+
         # Create backup directory if it doesn't exist
-        backup_dir = os.path.join(server_root, 'backups')
+        backup_dir = instance.backup_dir
         os.makedirs(backup_dir, exist_ok=True)
 
         # Generate timestamp for backup
@@ -34,19 +50,70 @@ def create_minecraft_backup():
         backup_name = f"world_backup_{timestamp}"
 
         # Full paths
-        world_path = os.path.join(server_root, 'world')
+        world_path = instance.world_path
         backup_path = os.path.join(backup_dir, backup_name)
+        index_path = os.path.join(base_dir, f'WorldIndex_{instance.name}.json')
+
+        # Compare the world with the index kept since the previous backup: first the mtimes of
+        # level.dat, region/ and playerdata/, which only move when the server saves, then, if
+        # they did, the sizes and mtimes of all files. Both are taken before copying, so writes
+        # during the copy count as changes next time.
+        spans = Spans('backup')
+        previous = load_world_index(index_path)
+        # A backup the index describes that was since removed cannot stand in for a new one
+        skippable = only_if_changed and previous and os.path.isdir(os.path.join(backup_dir, previous['backup']))
+        check_start = time.perf_counter()
+        with spans.phase('scan'):
+            signals = read_signals(world_path)
+            if skippable and previous['signals'] == signals:
+                logger.log(f"World of '{instance.name}' not saved since {previous['backup']} "
+                           f"(checked in {(time.perf_counter() - check_start) * 1000:.2f} ms), skipping backup")
+                return True
+            world_index = scan_world(world_path, config_manager.get_backup_change_ignore())
+        scan_ms = (time.perf_counter() - check_start) * 1000
+        if skippable and not find_changes(previous['files'], world_index):
+            # Saved, but only files that do not count (level.dat, ...) changed: keep the new
+            # signals so the next check is cheap again
+            save_world_index(index_path, previous['backup'], previous['files'], signals)
+            logger.log(f"World of '{instance.name}' unchanged since {previous['backup']} "
+                       f"({len(world_index)} files checked in {scan_ms:.1f} ms), skipping backup")
+            return True
+
+        # Perform backup with low I/O and CPU priority and the configured bandwidth cap
+        settings = load_throttle_settings(config_manager)
+        is_lagging = lag_detector(config_manager, instance, logger) if settings.adaptive else None
+        copier = ThrottledCopier(settings, is_lagging)
+        try:
+            with spans.phase('copy'):
+                run_with_priority(settings, copier.copytree, world_path, backup_path, logger=logger)
+        finally:
+            if is_lagging is not None:
+                is_lagging.close()
+        files = previous['files'] if previous else {}
+        updated = update_index(files, world_index)
+        save_world_index(index_path, backup_name, files, signals)
+        if config_manager.is_prewarm_enabled():
+            # Region files saved since the last backup were visited; prewarm ranks by these scores
+            try:
+                update_heat(os.path.join(base_dir, f'RegionHeat_{instance.name}.json'), files,
+                            config_manager.get_prewarm_heat_half_life())
+            except OSError as e:
+                logger.log(f"Could not update the region heat map of '{instance.name}': {e}")
+        logger.log(f"Minecraft world backup created for '{instance.name}': {backup_name} ({copier.summary()}, "
+                   f"{updated} of {len(files)} index entries updated)")
 
-        # Perform backup
-        shutil.copytree(world_path, backup_path)
-        logger.log(f"Minecraft world backup created: {backup_name}")
+        if config_manager.is_backup_manifests_enabled():
+            # Hashes only the files that changed since the previous backup's manifest
+            try:
+                with spans.phase('manifest'):
+                    run_with_priority(settings, ensure_manifest, base_dir, instance.name, 'backups', backup_path)
+            except Exception as e:
+                logger.log(f"Could not write the manifest of {backup_name}: {e}")
 
         # Enforce max backups by removing the oldest if necessary
-        backups = sorted(os.listdir(backup_dir))
-        if len(backups) > max_backups:
-            oldest_backup = os.path.join(backup_dir, backups[0])
-            shutil.rmtree(oldest_backup)
-            logger.log(f"Oldest backup removed: {backups[0]}")
+        with spans.phase('rotate'):
+            remove_old_backups(backup_dir, max_backups, settings, logger)
+        logger.log(f"Backup phases for '{instance.name}': {spans.summary()}")
 
         return True
     except Exception as e:
@@ -55,4 +122,6 @@ def create_minecraft_backup():
 
 
 if __name__ == "__main__":
-    create_minecraft_backup()
+    # Usage: backup.py [instance] [--if-changed]
+    args = [arg for arg in sys.argv[1:] if arg != '--if-changed']
+    sys.exit(0 if create_minecraft_backup(args[0] if args else None, '--if-changed' in sys.argv[1:]) else 1)
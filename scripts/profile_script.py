@@ -0,0 +1,35 @@
+# scripts/profile_script.py
+"""
+Run another script under cProfile and tracemalloc; run_script() uses it while a command is profiled.
+
+    profile_script.py <output prefix> <script> [args...]
+
+Writes <prefix>.prof and <prefix>.tracemalloc for the manager's report and exits with the script's status.
+"""
+import os
+import runpy
+import sys
+
+# Add parent directory to path to import utils
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.profiling import ProfileSession
+
+
+def profile_script(prefix: str, script_path: str, args) -> int:
+    sys.argv = [script_path, *args]
+    session = ProfileSession(os.path.basename(script_path))
+    status = 0
+    try:
+        session.run(runpy.run_path, script_path, run_name='__main__')
+    except SystemExit as e:
+        status = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+    finally:
+        session.dump(prefix)
+    return status
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print(__doc__.strip())
+        sys.exit(2)
+    sys.exit(profile_script(sys.argv[1], sys.argv[2], sys.argv[3:]))
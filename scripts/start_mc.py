@@ -1,16 +1,42 @@
 import os
+import re
+import shlex
 import subprocess
 import sys
 import time
+from datetime import datetime
 
 # Add parent directory to path to import utils
 base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.append(base_dir)
 from utils.logger import Logger
 from utils.config_manager import ConfigManager
+from utils.jvm_profile import record_launch
+from utils.lag_monitor import LogTailer
+from utils.prewarm import prewarm_world
+from utils.proc_stats import process_start_time
+from utils.process_registry import ProcessRegistry, child_pids, server_key
 
+DONE_PATTERN = re.compile(r'Done \(([\d.]+)s\)!')
 
-def start_minecraft_server():
+
+def wait_for_startup(tailer: LogTailer, timeout_seconds: float):
+    """
+    Follow latest.log until the server reports "Done (N.NNNs)!" or the timeout expires.
+
+    :return: Startup time reported by the server in seconds, or None if not seen
+    """
+    deadline = time.monotonic() + timeout_seconds
+    while time.monotonic() < deadline:
+        for line in tailer.read_lines():
+            match = DONE_PATTERN.search(line)
+            if match:
+                return float(match.group(1))
+        time.sleep(0.5)
+    return None
+
+
+def start_minecraft_server(instance_name=None):
     # Get config and log paths
     config_path = os.path.join(base_dir, 'config.ini')
     log_path = os.path.join(base_dir, 'ManagerLog.txt')
@@ -20,72 +46,109 @@ def start_minecraft_server():
     logger = Logger(log_path)
 
     try:
-        # Get server root from config
-        server_root = config_manager.get_server_root()
-
-        # Log active screen sessions
-        try:
-            screen_sessions = subprocess.check_output(['screen', '-ls'], stderr=subprocess.STDOUT, text=True)
-            logger.log("Active Screen Sessions:\n" + screen_sessions.strip())
-        except subprocess.CalledProcessError as e:
-            if e.returncode == 1 and "No Sockets found" in e.output:
-                logger.log("No active screen sessions")
-            else:
-                logger.log(f"Error checking screen sessions: {e}")
-
-        # Check if the screen session already exists
-        try:
-            subprocess.check_output(['screen', '-S', 'minecraftScreen', '-Q', 'select', '.'], stderr=subprocess.STDOUT)
-            logger.log("Screen session 'minecraftScreen' already exists")
+        # Get server root and screen session of the instance from config
+        instance = config_manager.get_instance(instance_name)
+        server_root = instance.server_root
+        screen_name = instance.screen_name
+
+        # Check if the instance's screen session is already running
+        registry = ProcessRegistry(config_manager.get_run_dir())
+        key = server_key(instance.name)
+        running = registry.find_session(key, screen_name)
+        if running is not None:
+            logger.log(f"Screen session '{running.session_id}' already exists")
             return False
-        except subprocess.CalledProcessError:
-            pass  # Screen session doesn't exist, which is what we want
-
-        # Create a new detached screen session and start the Minecraft server
-        start_command = f'cd "{server_root}" && java -Xmx16G -jar fabric-server.jar nogui'
-        subprocess.run([
-            'screen',
-            '-dmS',  # Start as a detached session
-            'minecraftScreen',
-            'bash',
-            '-c',
-            start_command
-        ], check=True)
-
-        # Delay to allow server to start
-        time.sleep(15)
-
-        # Verify the screen session is running
-        try:
-            screen_sessions = subprocess.check_output(['screen', '-ls'], stderr=subprocess.STDOUT, text=True)
-            if 'minecraftScreen' in screen_sessions:
-                logger.log("Minecraft server started successfully in screen session")
-                return True
-            else:
-                logger.log("Screen session not found after starting server")
-                return False
-        except subprocess.CalledProcessError as e:
-            logger.log(f"Error verifying screen session: {e}")
+
+        # Read the regions players are likely to load first into the page cache
+        if config_manager.is_prewarm_enabled():
+            try:
+                result = prewarm_world(instance.world_path, config_manager.get_prewarm_max_mb() * 1024 * 1024,
+                                       config_manager.get_prewarm_ranking(),
+                                       os.path.join(base_dir, f'RegionHeat_{instance.name}.json'),
+                                       config_manager.get_prewarm_workers(),
+                                       config_manager.get_prewarm_heat_half_life())
+                logger.log(f"Prewarmed '{instance.name}': {result.summary()}")
+            except (OSError, ValueError) as e:
+                logger.log(f"Prewarm of '{instance.name}' skipped: {e}")
+
+        # Build the java command from the configured launch profile
+        profile = config_manager.get_jvm_profile(instance.jvm_profile_name)
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        java_command = profile.build_command(timestamp=timestamp)
+        if instance.port:
+            java_command += ['--port', str(instance.port)]
+        heap_mb = profile.heap_mb()
+        logger.log(f"Using JVM profile '{profile.name}' for instance '{instance.name}' "
+                   f"({heap_mb}M heap, {profile.gc} GC): {' '.join(java_command)}")
+
+        # Create a new detached screen session and start the Minecraft server.
+        # -D -m starts the session without forking, so its pid is known and goes into the
+        # pidfile; exec makes the JVM the session's direct child.
+        tailer = LogTailer(instance.log_path)
+        start_command = f'cd {shlex.quote(server_root)} && exec {shlex.join(java_command)}'
+        screen = subprocess.Popen(['screen', '-DmS', screen_name, 'bash', '-c', start_command],
+                                  stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                                  start_new_session=True)
+        record = registry.register(key, screen.pid, screen_name)
+        if record is None:
+            logger.log(f"Screen session {screen_name} exited right after starting (code {screen.poll()})")
             return False
 
+        # Wait for the server to report it is done starting
+        launched_at = time.monotonic()
+        startup_seconds = wait_for_startup(tailer, config_manager.get_startup_wait())
+        if startup_seconds is not None:
+            logger.log(f"Server reported startup in {startup_seconds:.3f}s "
+                       f"({time.monotonic() - launched_at:.1f}s since launch)")
+
+        # Record the launch so startup time and GC behaviour can be compared across profiles
+        record_launch(os.path.join(base_dir, 'LaunchHistory.jsonl'), {
+            'timestamp': timestamp,
+            'instance': instance.name,
+            'profile': profile.name,
+            'heap_mb': heap_mb,
+            'gc': profile.gc,
+            'gc_log': profile.gc_log_path(timestamp),
+            'command': java_command,
+            'startup_seconds': startup_seconds,
+        })
+
+        # Verify the screen session is running and record the JVM it runs
+        if record.is_alive():
+            children = child_pids(record.pid)
+            if children:
+                record.child_pid, record.child_start_time = children[0], process_start_time(children[0])
+                registry.save(record)
+            logger.log(f"Minecraft server '{instance.name}' started successfully in screen session "
+                       f"{record.session_id}" + (f" (JVM pid {record.child_pid})" if record.child_pid else ""))
+            return True
+        registry.remove(key)
+        logger.log(f"Screen session {screen_name} not found after starting server")
+        return False
+
     except Exception as e:
         logger.log(f"Failed to start Minecraft server: {e}")
         return False
 
 
-def attach_to_server():
+def attach_to_server(instance_name=None):
     """
     Utility function to attach to the Minecraft server screen session.
     Can be called separately to connect to the running server.
     """
+    config_manager = ConfigManager(os.path.join(base_dir, 'config.ini'))
     try:
-        subprocess.run(['screen', '-r', 'minecraftScreen'], check=True)
-    except subprocess.CalledProcessError as e:
+        instance = config_manager.get_instance(instance_name)
+        record = ProcessRegistry(config_manager.get_run_dir()).find_session(server_key(instance.name),
+                                                                             instance.screen_name)
+        subprocess.run(['screen', '-r', record.session_id if record else instance.screen_name], check=True)
+    except (subprocess.CalledProcessError, ValueError) as e:
         print(f"Failed to attach to screen session: {e}")
 
 
 if __name__ == "__main__":
+    # Usage: start_mc.py [instance] | start_mc.py attach [instance]
     if len(sys.argv) > 1 and sys.argv[1] == "attach":
-        attach_to_server()
+        attach_to_server(sys.argv[2] if len(sys.argv) > 2 else None)
     else:
-        start_minecraft_server()
\ No newline at end of file
+        sys.exit(0 if start_minecraft_server(sys.argv[1] if len(sys.argv) > 1 else None) else 1)
\ No newline at end of file
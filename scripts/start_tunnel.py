@@ -2,18 +2,31 @@
 import os
 import subprocess
 import sys
+import time
 
 # Add parent directory to path to import utils
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.config_manager import ConfigManager
 from utils.logger import Logger
+from utils.process_registry import TUNNEL_KEY, ProcessRegistry, find_process
+
+# Seconds to wait for the playit process to appear after the terminal was opened
+TUNNEL_START_WAIT = 5
 
 
 def start_playit_tunnel():
-    log_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'ManagerLog.txt')
+    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    log_path = os.path.join(base_dir, 'ManagerLog.txt')
 
     logger = Logger(log_path)
+    registry = ProcessRegistry(ConfigManager(os.path.join(base_dir, 'config.ini')).get_run_dir())
 
     try:
+        running = registry.get(TUNNEL_KEY)
+        if running is not None:
+            logger.log(f"Playit tunnel is already running (pid {running.pid})")
+            return True
+
         # Start Playit tunnel in a new terminal
         subprocess.run([
             'gnome-terminal',
@@ -23,7 +36,17 @@ def start_playit_tunnel():
             'playit; exec bash'
         ], check=True)
 
-        logger.log("Playit tunnel started successfully")
+        # The terminal starts playit in its own process tree; find it to write the pidfile
+        deadline = time.monotonic() + TUNNEL_START_WAIT
+        while time.monotonic() < deadline:
+            pid = find_process('playit')
+            if pid is not None:
+                registry.register(TUNNEL_KEY, pid)
+                logger.log(f"Playit tunnel started successfully (pid {pid})")
+                return True
+            time.sleep(0.1)
+
+        logger.log("Playit tunnel started, but its process was not found")
         return True
     except subprocess.CalledProcessError as e:
         logger.log(f"Failed to start Playit tunnel: {e}")
@@ -1,6 +1,5 @@
 # scripts/stop_mc.py
 import os
-import re
 import subprocess
 import sys
 import time
@@ -8,54 +7,60 @@ import time
 # Add parent directory to path to import utils
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from utils.logger import Logger
+from utils.config_manager import ConfigManager
+from utils.process_registry import ProcessRegistry, server_key
+from utils.screen import send_to_screen
 
+# Seconds to wait for the server to save and exit before its session is closed
+STOP_TIMEOUT = 60
+# Seconds between checks whether the session has exited (a /proc read, so it can be short)
+STOP_POLL_INTERVAL = 0.2
 
-def stop_all_screens():
-    # Path for logging
-    log_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'ManagerLog.txt')
-    logger = Logger(log_path)
+
+def stop_minecraft_server(instance_name=None):
+    # Get config and log paths
+    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    config_manager = ConfigManager(os.path.join(base_dir, 'config.ini'))
+    logger = Logger(os.path.join(base_dir, 'ManagerLog.txt'))
 
     try:
-        # Get list of all screen sessions
-        screen_list_output = subprocess.check_output(['screen', '-ls'], universal_newlines=True)
-
-        # Extract screen session names using regex
-        screen_sessions = re.findall(r'\t(\d+\.\S+)', screen_list_output)
-
-        logger.log(f"Found {len(screen_sessions)} screen sessions")
-
-        # Iterate through each screen session
-        for session in screen_sessions:
-            try:
-                # Try to send stop command (useful for Minecraft-like servers)
-                subprocess.run([
-                    'screen',
-                    '-S',
-                    session,
-                    '-X',
-                    'stuff',
-                    '\nstop\n'
-                ], check=True, timeout=3)
-
-                logger.log(f"Sent stop command to session {session}")
-            except subprocess.CalledProcessError as cmd_err:
-                logger.log(f"Failed to send stop command to {session}: {cmd_err}")
-            except subprocess.TimeoutExpired:
-                logger.log(f"Timeout sending stop command to {session}")
-
-        # Wait a bit to allow graceful shutdown
-        time.sleep(3)
-
-        # Kill all screen sessions
-        subprocess.run(['killall', 'screen'], check=True)
-
-        logger.log("All screen sessions killed")
+        instance = config_manager.get_instance(instance_name)
+        registry = ProcessRegistry(config_manager.get_run_dir())
+        key = server_key(instance.name)
+        record = registry.find_session(key, instance.screen_name)
+        if record is None:
+            logger.log(f"No screen session {instance.screen_name} for instance '{instance.name}'")
+            return True
+        session = record.session_id
+
+        # Ask the server to save and stop
+        try:
+            send_to_screen(session, 'stop')
+            logger.log(f"Sent stop command to session {session}")
+        except subprocess.CalledProcessError as cmd_err:
+            logger.log(f"Failed to send stop command to {session}: {cmd_err}")
+        except subprocess.TimeoutExpired:
+            logger.log(f"Timeout sending stop command to {session}")
+
+        # Wait for the session to end once the server has shut down
+        deadline = time.monotonic() + STOP_TIMEOUT
+        while time.monotonic() < deadline:
+            if not record.is_alive():
+                registry.remove(key)
+                logger.log(f"Minecraft server '{instance.name}' stopped")
+                return True
+            time.sleep(STOP_POLL_INTERVAL)
+
+        # Close only this instance's session; other instances keep running
+        subprocess.run(['screen', '-S', session, '-X', 'quit'], check=True)
+        registry.remove(key)
+        logger.log(f"Screen session {session} did not exit after {STOP_TIMEOUT}s and was closed")
         return True
 
     except Exception as e:
-        logger.log(f"Error stopping screen sessions: {e}")
+        logger.log(f"Error stopping Minecraft server: {e}")
         return False
 
 
 if __name__ == "__main__":
-    stop_all_screens()
+    sys.exit(0 if stop_minecraft_server(sys.argv[1] if len(sys.argv) > 1 else None) else 1)
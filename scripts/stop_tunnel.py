@@ -1,25 +1,49 @@
 # scripts/stop_tunnel.py
 import os
+import signal
 import subprocess
 import sys
+import time
 
 # Add parent directory to path to import utils
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.config_manager import ConfigManager
 from utils.logger import Logger
+from utils.process_registry import TUNNEL_KEY, ProcessRegistry
+
+# Seconds to wait for playit to exit after SIGTERM
+TUNNEL_STOP_TIMEOUT = 10
 
 
 def stop_playit_tunnel():
-    log_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'ManagerLog.txt')
+    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    log_path = os.path.join(base_dir, 'ManagerLog.txt')
 
     logger = Logger(log_path)
+    registry = ProcessRegistry(ConfigManager(os.path.join(base_dir, 'config.ini')).get_run_dir())
 
     try:
-        # Find and kill Playit process
-        subprocess.run(['pkill', '-f', 'playit'], check=True)
-
-        logger.log("Playit tunnel stopped successfully")
+        record = registry.get(TUNNEL_KEY)
+        if record is None:
+            # Started before pidfiles were kept: find and kill Playit process
+            subprocess.run(['pkill', '-f', 'playit'], check=True)
+            logger.log("Playit tunnel stopped successfully")
+            return True
+
+        # Signal exactly the registered process, not everything mentioning playit
+        os.kill(record.pid, signal.SIGTERM)
+        deadline = time.monotonic() + TUNNEL_STOP_TIMEOUT
+        while record.is_alive() and time.monotonic() < deadline:
+            time.sleep(0.1)
+        if record.is_alive():
+            try:
+                os.kill(record.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+        registry.remove(TUNNEL_KEY)
+        logger.log(f"Playit tunnel stopped successfully (pid {record.pid})")
         return True
-    except subprocess.CalledProcessError as e:
+    except (subprocess.CalledProcessError, OSError) as e:
         logger.log(f"Failed to stop Playit tunnel: {e}")
         return False
 
@@ -0,0 +1,86 @@
+# tests/test_anvil.py
+import os
+import random
+
+import pytest
+
+from utils import anvil, nbt
+
+
+def _chunks():
+    rng = random.Random(3)
+    chunks = {}
+    for index, compression in ((0, anvil.COMPRESSION_ZLIB), (31, anvil.COMPRESSION_GZIP),
+                               (32, anvil.COMPRESSION_NONE), (1023, anvil.COMPRESSION_ZLIB)):
+        data = nbt.encode({'xPos': nbt.Int(index % 32), 'zPos': nbt.Int(index // 32),
+                           'InhabitedTime': nbt.Long(index)})
+        chunks[index] = (compression, anvil.compress_chunk(data, compression), 1700000000 + index)
+    # Incompressible payload spanning several sectors
+    chunks[500] = (anvil.COMPRESSION_NONE, rng.randbytes(3 * anvil.SECTOR_SIZE + 17), 1700000500)
+    return chunks
+
+
+def test_verify_region_accepts_built_region(tmp_path):
+    path = str(tmp_path / 'r.0.0.mca')
+    chunks = _chunks()
+    with open(path, 'wb') as region_file:
+        region_file.write(anvil.build_region(chunks))
+    anvil.verify_region(path, chunks)
+    assert os.path.getsize(path) == anvil.region_size(chunks)
+    assert os.path.getsize(path) % anvil.SECTOR_SIZE == 0
+
+
+def test_built_region_reads_back(tmp_path):
+    path = str(tmp_path / 'r.0.0.mca')
+    chunks = _chunks()
+    anvil.write_region(path, chunks, verify=True)
+    region = anvil.RegionFile(path)
+    assert region.chunk_indexes() == sorted(chunks)
+    for index in (0, 31, 32, 1023):
+        assert region.read_chunk(index)['InhabitedTime'] == index
+    assert region.read_raw(500) == (anvil.COMPRESSION_NONE, chunks[500][1])
+    assert region.read_raw(1) is None
+
+
+def test_external_chunk_stub(tmp_path):
+    path = str(tmp_path / 'r.1.-1.mca')
+    chunks = _chunks()
+    chunks[33] = (anvil.COMPRESSION_ZLIB | anvil.EXTERNAL_FLAG, b'ignored', 1700000033)
+    anvil.write_region(path, chunks, verify=True)
+    region = anvil.RegionFile(path)
+    assert region.is_external(33)
+    assert region.external_path(33) == str(tmp_path / 'c.33.-31.mcc')
+
+
+@pytest.mark.parametrize('change', ['payload', 'timestamp', 'missing', 'extra'])
+def test_verify_region_rejects_mismatch(tmp_path, change):
+    path = str(tmp_path / 'r.0.0.mca')
+    chunks = _chunks()
+    anvil.write_region(path, chunks)
+    compression, payload, timestamp = chunks[0]
+    if change == 'payload':
+        chunks[0] = (compression, payload[:-1] + bytes([payload[-1] ^ 1]), timestamp)
+    elif change == 'timestamp':
+        chunks[0] = (compression, payload, timestamp + 1)
+    elif change == 'missing':
+        del chunks[0]
+    else:
+        chunks[1] = chunks[0]
+    with pytest.raises(anvil.AnvilError):
+        anvil.verify_region(path, chunks)
+
+
+def test_write_region_keeps_old_file_when_verify_fails(tmp_path, monkeypatch):
+    path = str(tmp_path / 'r.0.0.mca')
+    chunks = _chunks()
+    anvil.write_region(path, chunks)
+    original = (tmp_path / 'r.0.0.mca').read_bytes()
+
+    def fail(*_):
+        raise anvil.AnvilError("mismatch")
+
+    monkeypatch.setattr(anvil, 'verify_region', fail)
+    with pytest.raises(anvil.AnvilError):
+        anvil.write_region(path, {0: chunks[0]}, verify=True)
+    assert (tmp_path / 'r.0.0.mca').read_bytes() == original
+    assert os.listdir(tmp_path) == ['r.0.0.mca']
@@ -0,0 +1,85 @@
+# tests/test_compact.py
+import os
+import random
+import struct
+
+from utils import anvil, compact
+
+
+def _chunks():
+    rng = random.Random(5)
+    chunks = {}
+    for index in rng.sample(range(anvil.CHUNKS_PER_REGION), 40):
+        payload = rng.randbytes(rng.randrange(100, 3 * anvil.SECTOR_SIZE))
+        chunks[index] = (anvil.COMPRESSION_ZLIB, payload, 1700000000 + index)
+    chunks[7] = (anvil.COMPRESSION_ZLIB | anvil.EXTERNAL_FLAG, b'', 1700000007)
+    return chunks
+
+
+def _write_fragmented(path, chunks):
+    """Region file whose chunks are separated by sectors no header entry points to."""
+    stale = {index + 1: (anvil.COMPRESSION_ZLIB, bytes(anvil.SECTOR_SIZE), 0)
+             for index in chunks if index + 1 not in chunks and index + 1 < anvil.CHUNKS_PER_REGION}
+    data = bytearray(anvil.build_region({**chunks, **stale}))
+    for index in stale:
+        struct.pack_into('>I', data, 4 * index, 0)
+    with open(path, 'wb') as region_file:
+        region_file.write(data)
+    return len(data)
+
+
+def test_compact_keeps_chunk_bytes(tmp_path):
+    path = str(tmp_path / 'r.0.0.mca')
+    chunks = _chunks()
+    size_before = _write_fragmented(path, chunks)
+    before = anvil.RegionFile(path)
+    raw_before = {index: before.read_raw(index) for index in before.chunk_indexes() if not before.is_external(index)}
+
+    result = compact.compact_region(path)
+
+    assert result.error is None
+    assert result.chunks == len(chunks)
+    assert result.bytes_before == size_before
+    assert result.bytes_after == os.path.getsize(path) == anvil.region_size(chunks) < size_before
+    anvil.verify_region(path, chunks)
+    after = anvil.RegionFile(path)
+    raw_after = {index: after.read_raw(index) for index in after.chunk_indexes() if not after.is_external(index)}
+    assert raw_after == raw_before
+    assert after.is_external(7)
+
+
+def test_compact_leaves_packed_file_alone(tmp_path):
+    path = str(tmp_path / 'r.0.0.mca')
+    anvil.write_region(path, _chunks())
+    data = open(path, 'rb').read()
+    mtime = os.stat(path).st_mtime_ns
+    result = compact.compact_region(path)
+    assert result.error is None and result.reclaimed == 0
+    assert open(path, 'rb').read() == data
+    assert os.stat(path).st_mtime_ns == mtime
+
+
+def test_compact_reports_malformed_file(tmp_path):
+    path = str(tmp_path / 'r.0.0.mca')
+    anvil.write_region(path, _chunks())
+    with open(path, 'r+b') as region_file:
+        region_file.truncate(anvil.HEADER_SIZE + anvil.SECTOR_SIZE)
+    data = open(path, 'rb').read()
+    result = compact.compact_region(path)
+    assert result.error
+    assert result.reclaimed == 0
+    assert open(path, 'rb').read() == data
+
+
+def test_compact_world(tmp_path):
+    chunks = _chunks()
+    sizes = {}
+    for folder in anvil.REGION_FOLDERS:
+        os.makedirs(tmp_path / folder)
+        sizes[folder] = _write_fragmented(str(tmp_path / folder / 'r.0.-1.mca'), chunks)
+    results = compact.compact_world(str(tmp_path), workers=2)
+    assert len(results) == len(anvil.REGION_FOLDERS)
+    assert all(result.error is None and result.reclaimed > 0 for result in results)
+    for folder in anvil.REGION_FOLDERS:
+        anvil.verify_region(str(tmp_path / folder / 'r.0.-1.mca'), chunks)
+    assert "3 region files, 3 rewritten" in compact.format_report(results)
@@ -0,0 +1,62 @@
+# tests/test_nbt.py
+import pytest
+
+from utils import nbt
+
+
+def _sample():
+    return {
+        'byte': nbt.Byte(-128),
+        'short': nbt.Short(32767),
+        'int': nbt.Int(-2 ** 31),
+        'long': nbt.Long(2 ** 63 - 1),
+        'float': nbt.Float(0.5),
+        'double': nbt.Double(-1.25e300),
+        'string': 'Überworld ☃',
+        'empty_string': '',
+        'bytes': nbt.ByteArray(bytes(range(256))),
+        'ints': nbt.IntArray([0, -1, 2 ** 31 - 1]),
+        'longs': nbt.LongArray([-2 ** 63, 0, 2 ** 63 - 1]),
+        'empty_list': nbt.List(),
+        'typed_empty_list': nbt.List([], nbt.TAG_COMPOUND),
+        'doubles': nbt.List([nbt.Double(1.0), nbt.Double(2.0)]),
+        'nested': nbt.List([nbt.List([nbt.Int(1)]), nbt.List([], nbt.TAG_INT)]),
+        'compounds': nbt.List([{'Name': 'minecraft:stone'}, {'Name': 'minecraft:air', 'Properties': {}}]),
+        'Level': {'InhabitedTime': nbt.Long(1200), 'Sections': {}},
+    }
+
+
+def test_decode_inverts_encode():
+    value = _sample()
+    assert nbt.decode(nbt.encode(value)) == ('', value)
+    assert nbt.decode(nbt.encode(value, 'root')) == ('root', value)
+
+
+def test_round_trip_keeps_tag_types():
+    data = nbt.encode(_sample(), 'root')
+    name, value = nbt.decode(data)
+    assert nbt.encode(value, name) == data
+    assert type(value['byte']) is nbt.Byte
+    assert type(value['long']) is nbt.Long
+    assert value['typed_empty_list'].item_type == nbt.TAG_COMPOUND
+
+
+def test_find_value_matches_decode():
+    data = nbt.encode(_sample())
+    assert nbt.find_value(data, ('Level', 'InhabitedTime')) == 1200
+    assert nbt.find_value(data, ('string',)) == 'Überworld ☃'
+    assert nbt.find_value(data, ('Level', 'Missing')) is None
+    assert nbt.find_value(data, ('string', 'child')) is None
+
+
+@pytest.mark.parametrize('compressed', [True, False])
+def test_nbt_file_round_trip(tmp_path, compressed):
+    path = str(tmp_path / 'level.dat')
+    nbt.write_nbt_file(path, _sample(), 'Data', compressed=compressed)
+    assert nbt.read_nbt_file(path) == ('Data', _sample())
+
+
+def test_truncated_data_raises():
+    data = nbt.encode(_sample())
+    with pytest.raises(nbt.NbtError):
+        nbt.decode(data[:-10])
@@ -0,0 +1,96 @@
+# tests/test_prune.py
+import os
+import shutil
+
+import pytest
+
+from benchmarks.world_generator import WorldSpec, generate_world
+from utils import anvil, nbt, prune
+
+MIN_TICKS = 1200
+SPAWN_RADIUS = 40
+# Block coordinates; chunks 16..23 on both axes
+PROTECTED = '256,256,383,383'
+
+
+@pytest.fixture(scope='module')
+def generated_world(tmp_path_factory):
+    """Synthetic world with one full region and matching entities and poi regions."""
+    world_path = str(tmp_path_factory.mktemp('generated') / 'world')
+    generate_world(world_path, WorldSpec(regions=1, chunks_per_region=anvil.CHUNKS_PER_REGION,
+                                         players=0, small_files=0, seed=7))
+    nbt.write_nbt_file(os.path.join(world_path, 'level.dat'),
+                       {'Data': {'SpawnX': nbt.Int(100), 'SpawnZ': nbt.Int(-20)}})
+    region = anvil.RegionFile(os.path.join(world_path, 'region', 'r.0.0.mca'))
+    for folder in prune.COMPANION_FOLDERS:
+        os.makedirs(os.path.join(world_path, folder))
+        companion = {index: (anvil.COMPRESSION_ZLIB, anvil.compress_chunk(nbt.encode({'Index': nbt.Int(index)})), 1)
+                     for index in region.chunk_indexes()}
+        anvil.write_region(os.path.join(world_path, folder, 'r.0.0.mca'), companion)
+    return world_path
+
+
+@pytest.fixture
+def world(generated_world, tmp_path):
+    return shutil.copytree(generated_world, str(tmp_path / 'world'))
+
+
+def _inhabited_times(path):
+    region = anvil.RegionFile(path)
+    return {index: prune.inhabited_time(region.read_chunk_data(index)) for index in region.chunk_indexes()}
+
+
+def _boxes(world_path):
+    boxes = prune.parse_protected_boxes([PROTECTED])['overworld']
+    return boxes + [prune.spawn_box(world_path, SPAWN_RADIUS)]
+
+
+def test_spawn_box(world):
+    assert prune.spawn_box(world, SPAWN_RADIUS) == (3, -4, 8, 1)
+    assert prune.spawn_box(world, 0) is None
+
+
+def test_prune_region_dry_run_changes_nothing(world):
+    path = os.path.join(world, 'region', 'r.0.0.mca')
+    before = open(path, 'rb').read()
+    result = prune.prune_region(path, 0, 0, MIN_TICKS, _boxes(world), apply=False)
+    assert 0 < result.pruned < result.chunks == anvil.CHUNKS_PER_REGION
+    assert result.reclaimed > 0
+    assert open(path, 'rb').read() == before
+
+
+def test_prune_region_removes_uninhabited_chunks(world):
+    path = os.path.join(world, 'region', 'r.0.0.mca')
+    boxes = _boxes(world)
+    times = _inhabited_times(path)
+    protected = {index for index in times if prune._is_protected(index % 32, index // 32, boxes)}
+    expected_kept = {index for index, ticks in times.items() if ticks >= MIN_TICKS} | protected
+    # Both the spawn area and the protected box hold chunks that would otherwise go
+    assert any(times[index] < MIN_TICKS and index % 32 in range(3, 9) for index in protected)
+    assert any(times[index] < MIN_TICKS and index % 32 in range(16, 24) for index in protected)
+
+    result = prune.prune_region(path, 0, 0, MIN_TICKS, boxes, apply=True)
+
+    assert result.pruned == len(times) - len(expected_kept)
+    assert result.errors == 0
+    region = anvil.RegionFile(path)
+    assert set(region.chunk_indexes()) == expected_kept
+    for index in expected_kept:
+        assert prune.inhabited_time(region.read_chunk_data(index)) == times[index]
+    for folder in prune.COMPANION_FOLDERS:
+        companion = anvil.RegionFile(os.path.join(world, folder, 'r.0.0.mca'))
+        assert set(companion.chunk_indexes()) == expected_kept
+        for index in expected_kept:
+            assert companion.read_chunk(index) == {'Index': index}
+    total = sum(os.path.getsize(os.path.join(world, folder, 'r.0.0.mca'))
+                for folder in ('region',) + prune.COMPANION_FOLDERS)
+    assert result.bytes_after == total
+
+
+def test_prune_region_deletes_emptied_files(world):
+    path = os.path.join(world, 'region', 'r.0.0.mca')
+    result = prune.prune_region(path, 0, 0, 2 ** 62, [], apply=True)
+    assert result.pruned == result.chunks
+    assert result.bytes_after == 0
+    for folder in ('region',) + prune.COMPANION_FOLDERS:
+        assert not os.path.exists(os.path.join(world, folder, 'r.0.0.mca'))
@@ -0,0 +1,228 @@
+# utils/anvil.py
+import gzip
+import os
+import re
+import struct
+import zlib
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from utils import nbt
+
+SECTOR_SIZE = 4096
+HEADER_SIZE = 2 * SECTOR_SIZE
+CHUNKS_PER_REGION = 1024
+
+COMPRESSION_GZIP = 1
+COMPRESSION_ZLIB = 2
+COMPRESSION_NONE = 3
+COMPRESSION_LZ4 = 4
+# Set on the compression byte when the chunk is stored in an external c.<x>.<z>.mcc file
+EXTERNAL_FLAG = 0x80
+
+REGION_FILE_PATTERN = re.compile(r'^r\.(-?\d+)\.(-?\d+)\.mca$')
+# Folder of each dimension, relative to the world folder
+DIMENSION_FOLDERS = {'overworld': '', 'the_nether': 'DIM-1', 'the_end': 'DIM1'}
+# Folders of a dimension holding region files: terrain, and entities and POIs since 1.17
+REGION_FOLDERS = ('region', 'entities', 'poi')
+
+_HEADER = struct.Struct(f'>{CHUNKS_PER_REGION}I{CHUNKS_PER_REGION}i')
+_CHUNK_PREFIX = struct.Struct('>iB')
+
+
+class AnvilError(Exception):
+    """Raised when a region file or chunk is malformed."""
+
+
+def chunk_index(x: int, z: int) -> int:
+    """Index of a chunk within its region's header (chunk coordinates, any region)."""
+    return (x & 31) + (z & 31) * 32
+
+
+def parse_region_name(file_name: str) -> Optional[Tuple[int, int]]:
+    """Return the region coordinates of an r.<x>.<z>.mca file name, or None."""
+    match = REGION_FILE_PATTERN.match(file_name)
+    return (int(match.group(1)), int(match.group(2))) if match else None
+
+
+def find_region_files(world_path: str, folders=REGION_FOLDERS) -> List[Tuple[str, str, int, int]]:
+    """(dimension, path, region x, region z) of the region files of every dimension of a world."""
+    regions = []
+    for dimension, dimension_folder in DIMENSION_FOLDERS.items():
+        for folder in folders:
+            region_dir = os.path.join(world_path, dimension_folder, folder)
+            if not os.path.isdir(region_dir):
+                continue
+            for file_name in sorted(os.listdir(region_dir)):
+                coordinates = parse_region_name(file_name)
+                if coordinates is not None:
+                    regions.append((dimension, os.path.join(region_dir, file_name), *coordinates))
+    return regions
+
+
+def parse_header(header: bytes) -> Tuple[List[Tuple[int, int]], List[int]]:
+    """
+    Parse the 8 KiB region header.
+
+    :return: ([(sector offset, sector count)] * 1024, [timestamp] * 1024); (0, 0) marks a missing chunk
+    """
+    if len(header) < HEADER_SIZE:
+        raise AnvilError(f"Region header is {len(header)} bytes, expected {HEADER_SIZE}")
+    values = _HEADER.unpack_from(header)
+    locations = [(value >> 8, value & 0xFF) for value in values[:CHUNKS_PER_REGION]]
+    return locations, list(values[CHUNKS_PER_REGION:])
+
+
+def decompress_chunk(compression: int, payload: bytes) -> bytes:
+    """Decompress a chunk payload stored with the given compression type."""
+    if compression == COMPRESSION_ZLIB:
+        return zlib.decompress(payload)
+    if compression == COMPRESSION_GZIP:
+        return gzip.decompress(payload)
+    if compression == COMPRESSION_NONE:
+        return bytes(payload)
+    raise AnvilError(f"Unsupported chunk compression type {compression}")
+
+
+def compress_chunk(data: bytes, compression: int = COMPRESSION_ZLIB, level: int = 6) -> bytes:
+    if compression == COMPRESSION_ZLIB:
+        return zlib.compress(data, level)
+    if compression == COMPRESSION_GZIP:
+        return gzip.compress(data, level)
+    if compression == COMPRESSION_NONE:
+        return data
+    raise AnvilError(f"Unsupported chunk compression type {compression}")
+
+
+class RegionFile:
+    """Read access to the chunks of one .mca region file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as region_file:
+            self.data = region_file.read()
+        if len(self.data) == 0:
+            # The server creates empty region files before the first chunk is saved
+            self.locations, self.timestamps = [(0, 0)] * CHUNKS_PER_REGION, [0] * CHUNKS_PER_REGION
+        else:
+            self.locations, self.timestamps = parse_header(self.data[:HEADER_SIZE])
+
+    def chunk_indexes(self) -> List[int]:
+        """Indexes of all chunks present in the region."""
+        return [index for index, (offset, _) in enumerate(self.locations) if offset]
+
+    def read_raw(self, index: int) -> Optional[Tuple[int, bytes]]:
+        """Return (compression type, compressed payload) of a chunk, or None if it is missing."""
+        offset, sectors = self.locations[index]
+        if offset == 0:
+            return None
+        start = offset * SECTOR_SIZE
+        if start + _CHUNK_PREFIX.size > len(self.data):
+            raise AnvilError(f"Chunk {index} of {self.path} points past the end of the file")
+        length, compression = _CHUNK_PREFIX.unpack_from(self.data, start)
+        if length < 1 or start + 4 + length > len(self.data):
+            raise AnvilError(f"Chunk {index} of {self.path} has invalid length {length}")
+        if compression & EXTERNAL_FLAG:
+            external = os.path.join(os.path.dirname(self.path), self._external_name(index))
+            with open(external, 'rb') as external_file:
+                return compression & ~EXTERNAL_FLAG, external_file.read()
+        return compression, self.data[start + 5:start + 4 + length]
+
+    def raw_compression(self, index: int) -> int:
+        """Compression byte of a chunk as stored, including EXTERNAL_FLAG (0 if missing)."""
+        offset, _ = self.locations[index]
+        start = offset * SECTOR_SIZE + 4
+        return self.data[start] if offset and start < len(self.data) else 0
+
+    def is_external(self, index: int) -> bool:
+        """Whether a chunk is stored in an external c.<x>.<z>.mcc file."""
+        return bool(self.raw_compression(index) & EXTERNAL_FLAG)
+
+    def external_path(self, index: int) -> str:
+        return os.path.join(os.path.dirname(self.path), self._external_name(index))
+
+    def _external_name(self, index: int) -> str:
+        region_x, region_z = parse_region_name(os.path.basename(self.path)) or (0, 0)
+        return f"c.{region_x * 32 + index % 32}.{region_z * 32 + index // 32}.mcc"
+
+    def read_chunk_data(self, index: int) -> Optional[bytes]:
+        """Return the uncompressed NBT bytes of a chunk, or None if it is missing."""
+        raw = self.read_raw(index)
+        return decompress_chunk(*raw) if raw else None
+
+    def read_chunk(self, index: int):
+        """Return the decoded NBT root compound of a chunk, or None if it is missing."""
+        data = self.read_chunk_data(index)
+        return nbt.decode(data)[1] if data is not None else None
+
+    def iter_chunks(self) -> Iterator[Tuple[int, object]]:
+        for index in self.chunk_indexes():
+            yield index, self.read_chunk(index)
+
+
+def build_region(chunks: Dict[int, Tuple[int, bytes, int]]) -> bytes:
+    """
+    Lay out a region file with chunks packed back to back after the header.
+
+    :param chunks: index -> (compression type, compressed payload, timestamp); a compression
+                   type with EXTERNAL_FLAG keeps the chunk in its .mcc file and the payload is ignored
+    """
+    locations = [0] * CHUNKS_PER_REGION
+    timestamps = [0] * CHUNKS_PER_REGION
+    body = []
+    next_sector = HEADER_SIZE // SECTOR_SIZE
+    for index in sorted(chunks):
+        compression, payload, timestamp = chunks[index]
+        if compression & EXTERNAL_FLAG:
+            payload = b''
+        record = _CHUNK_PREFIX.pack(len(payload) + 1, compression) + payload
+        sectors = -(-len(record) // SECTOR_SIZE)
+        if sectors > 255:
+            raise AnvilError(f"Chunk {index} needs {sectors} sectors; external chunks are not supported")
+        record += b'\x00' * (sectors * SECTOR_SIZE - len(record))
+        locations[index] = (next_sector << 8) | sectors
+        timestamps[index] = timestamp
+        body.append(record)
+        next_sector += sectors
+    return _HEADER.pack(*locations, *timestamps) + b''.join(body)
+
+
+def region_size(chunks: Dict[int, Tuple[int, bytes, int]]) -> int:
+    """Size of the file build_region() would produce, without building it."""
+    sectors = 0
+    for compression, payload, _ in chunks.values():
+        length = _CHUNK_PREFIX.size + (0 if compression & EXTERNAL_FLAG else len(payload))
+        sectors += -(-length // SECTOR_SIZE)
+    return HEADER_SIZE + sectors * SECTOR_SIZE
+
+
+def verify_region(path: str, chunks: Dict[int, Tuple[int, bytes, int]]):
+    """Check that a region file holds exactly the given chunks; raises AnvilError otherwise."""
+    region = RegionFile(path)
+    if set(region.chunk_indexes()) != set(chunks):
+        raise AnvilError(f"{path} holds {len(region.chunk_indexes())} chunks, expected {len(chunks)}")
+    for index, (compression, payload, timestamp) in chunks.items():
+        if region.timestamps[index] != timestamp or region.raw_compression(index) != compression:
+            raise AnvilError(f"Chunk {index} of {path} was not written correctly")
+        if not compression & EXTERNAL_FLAG and region.read_raw(index)[1] != payload:
+            raise AnvilError(f"Chunk {index} of {path} was not written correctly")
+
+
+def write_region(path: str, chunks: Dict[int, Tuple[int, bytes, int]], verify: bool = False):
+    """
+    Atomically write a region file built by build_region().
+
+    :param verify: Read the new file back from disk and compare every chunk before it replaces the old one
+    """
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, 'wb') as region_file:
+            region_file.write(build_region(chunks))
+            region_file.flush()
+            os.fsync(region_file.fileno())
+        if verify:
+            verify_region(tmp_path, chunks)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    os.replace(tmp_path, path)
@@ -0,0 +1,194 @@
+# utils/backup_manifest.py
+import hashlib
+import json
+import os
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from utils import anvil
+from utils.replication import hash_file
+
+MANIFEST_VERSION = 1
+# Threads hashing files while a manifest is built; hashlib releases the GIL on large buffers
+HASH_WORKERS = 8
+# Top-level world folders holding one file per player
+PLAYER_FOLDERS = ('playerdata', 'stats', 'advancements')
+
+
+def manifest_path(base_dir: str, instance: str, kind: str, backup_name: str) -> str:
+    """Manifests live next to config.ini, so backups and restored worlds never contain them."""
+    return os.path.join(base_dir, 'manifests', instance, kind, f'{backup_name}.json')
+
+
+def load_manifest(path: str) -> Optional[dict]:
+    try:
+        with open(path) as manifest_file:
+            manifest = json.load(manifest_file)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(manifest, dict) or manifest.get('version') != MANIFEST_VERSION:
+        return None
+    return manifest
+
+
+def save_manifest(path: str, manifest: dict):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as manifest_file:
+        json.dump(manifest, manifest_file, separators=(',', ':'))
+    os.replace(tmp_path, path)
+
+
+def _chunk_table(data: bytes) -> Dict[str, List[int]]:
+    """chunk index -> [timestamp, crc32 of the stored chunk record] of a region file's contents."""
+    if len(data) < anvil.HEADER_SIZE:
+        return {}
+    locations, timestamps = anvil.parse_header(data[:anvil.HEADER_SIZE])
+    table = {}
+    for index, (offset, sectors) in enumerate(locations):
+        if offset:
+            record = data[offset * anvil.SECTOR_SIZE:(offset + sectors) * anvil.SECTOR_SIZE]
+            table[str(index)] = [timestamps[index], zlib.crc32(record[:4 + int.from_bytes(record[:4], 'big')])]
+    return table
+
+
+def _hash_entry(path: str) -> Tuple[str, Optional[Dict[str, List[int]]]]:
+    """blake2b hex digest of a file, and its chunk table if it is a region file."""
+    if anvil.parse_region_name(os.path.basename(path)) is None:
+        return hash_file(path), None
+    with open(path, 'rb') as region_file:
+        data = region_file.read()
+    return hashlib.blake2b(data).hexdigest(), _chunk_table(data)
+
+
+def build_manifest(backup_path: str, previous: Optional[dict] = None) -> dict:
+    """
+    Record the path, size, mtime and blake2b hash of every file of a backup, plus a
+    timestamp and checksum per chunk of each region file.
+
+    Backups keep the mtimes of the world, so a file with the same size and mtime as in
+    the previous backup's manifest is the same file; its entry is reused without reading it.
+    """
+    old_files = previous['files'] if previous else {}
+    old_chunks = previous['chunks'] if previous else {}
+    files: Dict[str, list] = {}
+    chunks: Dict[str, dict] = {}
+    to_hash = []
+    for root, _, names in os.walk(backup_path):
+        for name in names:
+            path = os.path.join(root, name)
+            rel = os.path.relpath(path, backup_path)
+            stat = os.stat(path)
+            old = old_files.get(rel)
+            if old and old[0] == stat.st_size and old[1] == stat.st_mtime_ns:
+                files[rel] = old
+                if rel in old_chunks:
+                    chunks[rel] = old_chunks[rel]
+            else:
+                files[rel] = [stat.st_size, stat.st_mtime_ns, None]
+                to_hash.append(rel)
+
+    with ThreadPoolExecutor(max_workers=HASH_WORKERS) as pool:
+        hashed = pool.map(_hash_entry, [os.path.join(backup_path, rel) for rel in to_hash])
+        for rel, (digest, table) in zip(to_hash, hashed):
+            files[rel][2] = digest
+            if table is not None:
+                chunks[rel] = table
+    return {'version': MANIFEST_VERSION, 'backup': os.path.basename(backup_path), 'files': files, 'chunks': chunks}
+
+
+def _newest_manifest(manifest_dir: str, before: str) -> Optional[dict]:
+    """The cached manifest of the newest backup older than `before`, to reuse its hashes."""
+    if not os.path.isdir(manifest_dir):
+        return None
+    names = sorted(name[:-5] for name in os.listdir(manifest_dir) if name.endswith('.json'))
+    older = [name for name in names if name < before]
+    return load_manifest(os.path.join(manifest_dir, f'{older[-1]}.json')) if older else None
+
+
+def ensure_manifest(base_dir: str, instance: str, kind: str, backup_path: str) -> dict:
+    """
+    Load the cached manifest of a backup, building and caching it first if needed.
+    Manifests of backups that no longer exist are removed.
+    """
+    backup_name = os.path.basename(backup_path.rstrip(os.sep))
+    path = manifest_path(base_dir, instance, kind, backup_name)
+    manifest = load_manifest(path)
+    if manifest is not None:
+        return manifest
+    manifest_dir = os.path.dirname(path)
+    manifest = build_manifest(backup_path, _newest_manifest(manifest_dir, backup_name))
+    save_manifest(path, manifest)
+
+    backup_dir = os.path.dirname(backup_path.rstrip(os.sep))
+    for name in os.listdir(manifest_dir):
+        if name.endswith('.json') and not os.path.isdir(os.path.join(backup_dir, name[:-5])):
+            os.remove(os.path.join(manifest_dir, name))
+    return manifest
+
+
+def chunk_coordinates(region_rel: str, index: int) -> Tuple[int, int]:
+    region_x, region_z = anvil.parse_region_name(os.path.basename(region_rel))
+    return region_x * 32 + index % 32, region_z * 32 + index // 32
+
+
+class BackupDiff:
+    """Differences between two backup manifests."""
+
+    def __init__(self, old: dict, new: dict):
+        old_files, new_files = old['files'], new['files']
+        self.added = sorted(set(new_files) - set(old_files))
+        self.removed = sorted(set(old_files) - set(new_files))
+        self.modified = sorted(rel for rel in set(old_files) & set(new_files)
+                               if old_files[rel][0] != new_files[rel][0] or old_files[rel][2] != new_files[rel][2])
+        # region file -> (added, removed, changed) chunk coordinates
+        self.chunks: Dict[str, Tuple[list, list, list]] = {}
+        for rel in self.modified + self.added + self.removed:
+            if rel not in old['chunks'] and rel not in new['chunks']:
+                continue
+            old_table, new_table = old['chunks'].get(rel, {}), new['chunks'].get(rel, {})
+            self.chunks[rel] = tuple(
+                [chunk_coordinates(rel, int(index)) for index in sorted(indexes, key=int)]
+                for indexes in (set(new_table) - set(old_table), set(old_table) - set(new_table),
+                                {index for index in set(old_table) & set(new_table)
+                                 if old_table[index][1] != new_table[index][1]}))
+
+    def is_empty(self) -> bool:
+        return not (self.added or self.removed or self.modified)
+
+    def format(self, limit: int = 20) -> str:
+        """Changed region files with their chunk coordinates, then player data, then other files."""
+        if self.is_empty():
+            return "No differences."
+        changes = {'+': self.added, '-': self.removed, '~': self.modified}
+        regions, players, other = [], [], []
+        for sign, paths in changes.items():
+            for rel in paths:
+                if rel in self.chunks:
+                    regions.append((rel, sign))
+                elif rel.split(os.sep)[0] in PLAYER_FOLDERS:
+                    players.append(f"  {sign}{rel}")
+                else:
+                    other.append(f"  {sign}{rel}")
+
+        lines = [f"{len(self.added)} added, {len(self.removed)} removed, {len(self.modified)} modified files"]
+        if regions:
+            lines.append(f"Region files ({len(regions)}):")
+            for rel, sign in sorted(regions):
+                added, removed, changed = self.chunks[rel]
+                counts = ', '.join(f"{len(coordinates)} {label}" for coordinates, label in
+                                   ((changed, 'changed'), (added, 'added'), (removed, 'removed')) if coordinates)
+                lines.append(f"  {sign}{rel}: {counts or 'no chunk changes'}")
+                for coordinates, label in ((changed, '~'), (added, '+'), (removed, '-')):
+                    if coordinates:
+                        shown = ' '.join(f"{x},{z}" for x, z in coordinates[:limit])
+                        more = f" (+{len(coordinates) - limit} more)" if len(coordinates) > limit else ""
+                        lines.append(f"      {label} {shown}{more}")
+        for title, entries in (("Player data", players), ("Other files", other)):
+            if entries:
+                lines.append(f"{title} ({len(entries)}):")
+                lines.extend(entries[:limit])
+                if len(entries) > limit:
+                    lines.append(f"  ... {len(entries) - limit} more")
+        return '\n'.join(lines)
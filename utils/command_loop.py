@@ -0,0 +1,174 @@
+# utils/command_loop.py
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict
+
+from utils.control import install_output_routing, output_sink
+
+# Commands that need the terminal or return immediately; they run in the foreground
+FOREGROUND_COMMANDS = {'help', 'ss', 'rs', 'jobs', 'exit', 'amc', 'at'}
+
+
+class Job:
+    """A command running in the background of the interactive manager."""
+
+    def __init__(self, job_id: int, command: str):
+        self.id = job_id
+        self.command = command
+        self.started = time.monotonic()
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+
+class CommandLoop:
+    """
+    Interactive prompt that stays responsive while commands run.
+
+    Lines are read by a daemon thread and handed to an asyncio loop. Long commands
+    (backups, restores, restarts) run as numbered jobs in a thread pool; their output is
+    printed as it happens, prefixed with the job number, and a notice is printed when
+    they finish. Operations on the same instance are still serialized by the manager's
+    instance locks, so only independent commands actually overlap.
+    """
+
+    def __init__(self, manager, prompt: str = "Enter command (or 'help' for options): ",
+                 max_jobs: int = 4):
+        """
+        :param manager: MinecraftServerManager whose handle_command runs the commands
+        :param max_jobs: Number of commands that run at once; further commands wait for a free slot
+        """
+        self.manager = manager
+        self.prompt = prompt
+        self.max_jobs = max_jobs
+        self.jobs: Dict[int, Job] = {}
+        self._next_id = 1
+        self._stdout = None
+        self._stdout_lock = threading.Lock()
+
+    def _write(self, text: str):
+        with self._stdout_lock:
+            self._stdout.write(text)
+            self._stdout.flush()
+
+    def _handle(self, command: str, prefix: str = '') -> bool:
+        """
+        Run a command, printing its output a whole line at a time (print() writes the text
+        and the newline separately), so lines of concurrent commands never run into each other.
+
+        :param prefix: Put in front of every output line, e.g. the job number
+        """
+        pending = []
+        lock = threading.Lock()
+
+        def sink(text: str):
+            with lock:
+                pending.append(text)
+                if '\n' not in text:
+                    return
+                complete, _, rest = ''.join(pending).rpartition('\n')
+                pending[:] = [rest] if rest else []
+            self._write(''.join(f"{prefix}{line}\n" for line in complete.split('\n')))
+
+        token = output_sink.set(sink)
+        try:
+            return self.manager.handle_command(command)
+        finally:
+            output_sink.reset(token)
+            if pending:
+                self._write(f"{prefix}{''.join(pending)}\n")
+
+    def _start_reader(self, loop: asyncio.AbstractEventLoop, lines: asyncio.Queue,
+                      ready: threading.Event):
+        """
+        Read lines on a daemon thread so a pending input() never keeps the process alive.
+        The next prompt is shown only once the loop has dispatched the previous line, so
+        foreground commands such as amc get the terminal to themselves.
+        """
+        def reader():
+            while True:
+                ready.wait()
+                ready.clear()
+                try:
+                    line = input(self.prompt)
+                except EOFError:
+                    line = None
+                loop.call_soon_threadsafe(lines.put_nowait, line)
+                if line is None:
+                    return
+
+        threading.Thread(target=reader, name='command-input', daemon=True).start()
+
+    def _submit(self, loop: asyncio.AbstractEventLoop, pool: ThreadPoolExecutor, command: str):
+        job = Job(self._next_id, command)
+        self._next_id += 1
+        running = len(self.jobs)
+        self.jobs[job.id] = job
+        if running >= self.max_jobs:
+            self._write(f"[#{job.id}] {command} queued ({running} jobs running)\n")
+        else:
+            self._write(f"[#{job.id}] {command} started\n")
+
+        def finished(future: asyncio.Future):
+            del self.jobs[job.id]
+            if future.cancelled():
+                status = "cancelled"
+            elif future.exception() is not None:
+                status = f"raised {future.exception()}"
+            else:
+                status = "done" if future.result() else "failed"
+            self._write(f"[#{job.id}] {command} {status} after {job.elapsed():.1f}s\n")
+
+        loop.run_in_executor(pool, self._handle, command, f"[#{job.id}] ").add_done_callback(finished)
+
+    def show_jobs(self):
+        if not self.jobs:
+            self._write("No commands running.\n")
+            return
+        self._write(''.join(f"[#{job.id}] {job.command} ({job.elapsed():.1f}s)\n" for job in self.jobs.values()))
+
+    async def _wait_for_jobs(self):
+        if self.jobs:
+            self._write(f"Waiting for {len(self.jobs)} running command(s) to finish...\n")
+        while self.jobs:
+            await asyncio.sleep(0.1)
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        lines: asyncio.Queue = asyncio.Queue()
+        ready = threading.Event()
+        ready.set()
+        self._stdout = install_output_routing()
+        self._start_reader(loop, lines, ready)
+
+        with ThreadPoolExecutor(max_workers=self.max_jobs, thread_name_prefix='command') as pool:
+            while True:
+                line = await lines.get()
+                if line is None:
+                    # stdin closed: behave like 'exit'
+                    line = 'exit'
+                command = line.strip()
+                parts = command.split()
+                if parts and parts[0].startswith('@'):
+                    parts = parts[1:]
+                base_command = parts[0].lower() if parts else ''
+
+                try:
+                    if not base_command:
+                        pass
+                    elif base_command == 'jobs':
+                        self.show_jobs()
+                    elif base_command == 'exit':
+                        await self._wait_for_jobs()
+                        self.manager.handle_command('exit')
+                    elif base_command in FOREGROUND_COMMANDS:
+                        # May take over the terminal (amc, at), so the prompt waits
+                        await loop.run_in_executor(None, self._handle, command)
+                    else:
+                        self._submit(loop, pool, command)
+                except Exception as e:
+                    print(f"An error occurred: {e}")
+                    self.manager.logger.log(f"Error in main loop: {e}")
+                ready.set()
@@ -0,0 +1,75 @@
+# utils/compact.py
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+
+from utils import anvil
+
+
+class CompactResult:
+    """Outcome of compacting one region file."""
+
+    def __init__(self, path: str, bytes_before: int):
+        self.path = path
+        self.bytes_before = bytes_before
+        self.bytes_after = bytes_before
+        self.chunks = 0
+        self.error: Optional[str] = None
+
+    @property
+    def reclaimed(self) -> int:
+        return self.bytes_before - self.bytes_after
+
+
+def compact_region(path: str) -> CompactResult:
+    """
+    Rewrite a region file with its chunks packed back to back, dropping the sectors left
+    behind when the server moved a chunk that grew. Chunk payloads are copied without
+    being decompressed; the new file is read back and compared chunk by chunk before it
+    replaces the old one. Files that are already packed are left alone. Runs in a worker process.
+    """
+    result = CompactResult(path, os.path.getsize(path))
+    try:
+        region = anvil.RegionFile(path)
+        chunks = {}
+        for index in region.chunk_indexes():
+            if region.is_external(index):
+                # Stays in its c.<x>.<z>.mcc file; only the one-sector stub is moved
+                chunks[index] = (region.raw_compression(index), b'', region.timestamps[index])
+            else:
+                compression, payload = region.read_raw(index)
+                chunks[index] = (compression, payload, region.timestamps[index])
+        result.chunks = len(chunks)
+        if not chunks or anvil.region_size(chunks) >= len(region.data):
+            return result
+        anvil.write_region(path, chunks, verify=True)
+    except (anvil.AnvilError, OSError) as e:
+        result.error = str(e)
+        return result
+    result.bytes_after = os.path.getsize(path)
+    return result
+
+
+def compact_world(world_path: str, workers: Optional[int] = None) -> List[CompactResult]:
+    """
+    Compact the terrain, entity and POI region files of every dimension in parallel.
+    The server must not be running.
+    """
+    paths = [path for _, path, _, _ in anvil.find_region_files(world_path)]
+    if not paths:
+        return []
+    with ProcessPoolExecutor(max_workers=workers or None) as pool:
+        return list(pool.map(compact_region, paths, chunksize=4))
+
+
+def format_report(results: List[CompactResult]) -> str:
+    mib = 1024 * 1024
+    before = sum(result.bytes_before for result in results)
+    after = sum(result.bytes_after for result in results)
+    rewritten = sum(1 for result in results if result.reclaimed)
+    lines = [f"{len(results)} region files, {rewritten} rewritten: {before / mib:.1f} MiB -> {after / mib:.1f} MiB"
+             + (f" ({(before - after) / before:.1%} reclaimed)" if before else "")]
+    for result in results:
+        if result.error:
+            lines.append(f"  Skipped {result.path}: {result.error}")
+    return '\n'.join(lines)
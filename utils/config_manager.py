@@ -1,6 +1,103 @@
 # utils/config_manager.py
 import configparser
 import os
+from typing import List, Optional, Tuple
+
+from utils.countdown import parse_stages
+from utils.jvm_profile import DEFAULT_PROFILES, LaunchProfile
+from utils.world_index import DEFAULT_IGNORE_PATTERNS
+
+
+DEFAULT_INSTANCE = 'default'
+
+
+class InstanceConfig:
+    """
+    Settings of one managed server instance.
+
+    Named instances are read from an [INSTANCE:<name>] section. Tunables such as
+    MaxWorldBackups or JvmProfile fall back to the SERVER section; locations,
+    the screen session name and ports do not, so instances never share them.
+    The implicit 'default' instance is described by the SERVER section alone.
+    """
+
+    def __init__(self, config: configparser.ConfigParser, name: str):
+        self.config = config
+        self.name = name
+        self.section = 'SERVER' if name == DEFAULT_INSTANCE else f'INSTANCE:{name}'
+        if not config.has_section(self.section):
+            raise ValueError(f"Instance '{name}' has no [{self.section}] section in config.ini")
+
+    def _get_own(self, option: str, fallback=None):
+        return self.config.get(self.section, option, fallback=fallback)
+
+    def _get_shared(self, option: str, fallback=None):
+        return self.config.get(self.section, option, fallback=self.config.get('SERVER', option, fallback=fallback))
+
+    @property
+    def server_root(self) -> str:
+        root = self._get_own('ServerRootLocation')
+        if not root:
+            raise ValueError(f"Instance '{self.name}' has no ServerRootLocation")
+        return root
+
+    @property
+    def screen_name(self) -> str:
+        default = 'minecraftScreen' if self.name == DEFAULT_INSTANCE else f'minecraftScreen_{self.name}'
+        return self._get_own('ScreenName', fallback=default)
+
+    @property
+    def world_name(self) -> str:
+        return self._get_own('WorldName', fallback='world')
+
+    @property
+    def world_path(self) -> str:
+        return os.path.join(self.server_root, self.world_name)
+
+    @property
+    def backup_dir(self) -> str:
+        return self._get_own('BackupDir', fallback=os.path.join(self.server_root, 'backups'))
+
+    @property
+    def milestone_backup_dir(self) -> str:
+        if self.name == DEFAULT_INSTANCE:
+            fallback = '/home/miro/Desktop/Fabric/milestone_backups'
+        else:
+            fallback = os.path.join(self.server_root, 'milestone_backups')
+        return self._get_own('milestonebackupdir', fallback=fallback)
+
+    @property
+    def max_world_backups(self) -> int:
+        return int(self._get_shared('MaxWorldBackups', fallback=10))
+
+    @property
+    def replica_dirs(self) -> List[str]:
+        """Secondary directories every backup is replicated to"""
+        value = self._get_shared('ReplicaDirs', fallback='')
+        return [path.strip() for path in value.split(',') if path.strip()]
+
+    @property
+    def port(self) -> Optional[int]:
+        """Server port passed to the server with --port (None keeps server.properties)"""
+        port = self._get_own('Port', fallback='')
+        return int(port) if port else None
+
+    @property
+    def rcon_port(self) -> Optional[int]:
+        port = self._get_own('RconPort', fallback='')
+        return int(port) if port else None
+
+    @property
+    def rcon_password(self) -> Optional[str]:
+        return self._get_own('RconPassword', fallback=None)
+
+    @property
+    def jvm_profile_name(self) -> str:
+        return self._get_shared('JvmProfile', fallback='g1')
+
+    @property
+    def log_path(self) -> str:
+        return os.path.join(self.server_root, 'logs', 'latest.log')
 
 
 class ConfigManager:
@@ -69,6 +166,303 @@ class ConfigManager:
         self.config.set('SERVER', 'IsMilestoneBackupEnabled', str(enabled))
         self._save_config()
 
+    def get_metrics_port(self) -> int:
+        """Get the port of the local /metrics endpoint (0 disables it)"""
+        return self.config.getint('SERVER', 'MetricsPort', fallback=0)
+
+    def get_metrics_address(self) -> str:
+        """Get the address the /metrics endpoint binds to"""
+        return self.config.get('SERVER', 'MetricsAddress', fallback='127.0.0.1')
+
+    def get_metrics_textfile(self) -> str:
+        """Get the node_exporter textfile path for metrics (empty disables it)"""
+        return self.config.get('SERVER', 'MetricsTextfile', fallback='')
+
+    def get_metrics_textfile_interval(self) -> int:
+        """Get the metrics textfile rewrite interval in seconds"""
+        return self.config.getint('SERVER', 'MetricsTextfileInterval', fallback=15)
+
+    def get_stats_sample_interval(self) -> float:
+        """Get the JVM resource sampling interval in seconds"""
+        return self.config.getfloat('SERVER', 'StatsSampleInterval', fallback=5.0)
+
+    def get_stats_history_size(self) -> int:
+        """Get the number of JVM resource samples kept in memory"""
+        return self.config.getint('SERVER', 'StatsHistorySize', fallback=720)
+
+    def is_rcon_enabled(self) -> bool:
+        """Check if the manager may query the server over RCON"""
+        return self.config.getboolean('SERVER', 'RconEnabled', fallback=False)
+
+    def get_rcon_host(self) -> str:
+        """Get the RCON host"""
+        return self.config.get('SERVER', 'RconHost', fallback='127.0.0.1')
+
+    def get_lag_poll_interval(self) -> float:
+        """Get the lag monitor poll interval in seconds"""
+        return self.config.getfloat('SERVER', 'LagPollInterval', fallback=5.0)
+
+    def get_lag_rcon_command(self) -> str:
+        """Get the console command used to query tick times over RCON"""
+        return self.config.get('SERVER', 'LagRconCommand', fallback='tick query')
+
+    def get_lag_warn_mspt(self) -> float:
+        """Get the MSPT above which a lag warning is emitted"""
+        return self.config.getfloat('SERVER', 'LagWarnMspt', fallback=50.0)
+
+    def get_lag_warn_behind_ms(self) -> int:
+        """Get the "Can't keep up" delay in ms above which a lag warning is emitted"""
+        return self.config.getint('SERVER', 'LagWarnBehindMs', fallback=2000)
+
+    def get_lag_alert_cooldown(self) -> float:
+        """Get the minimum number of seconds between two lag warnings"""
+        return self.config.getfloat('SERVER', 'LagAlertCooldown', fallback=60.0)
+
+    def is_lag_chat_alerts_enabled(self) -> bool:
+        """Check if lag warnings are also announced in chat"""
+        return self.config.getboolean('SERVER', 'LagChatAlerts', fallback=False)
+
+    def get_jvm_profile_name(self) -> str:
+        """Get the name of the JVM launch profile used to start the server"""
+        return self.config.get('SERVER', 'JvmProfile', fallback='g1')
+
+    def get_jvm_profile(self, name: Optional[str] = None) -> LaunchProfile:
+        """
+        Get a JVM launch profile from its [JVM:<name>] section.
+        Built-in profiles ('g1', 'zgc') supply defaults for options the section does not set.
+
+        :param name: Profile name, defaults to JvmProfile
+        """
+        name = name or self.get_jvm_profile_name()
+        section = f'JVM:{name}'
+        if name not in DEFAULT_PROFILES and not self.config.has_section(section):
+            raise ValueError(f"JVM profile '{name}' is not defined in {self.config_path}")
+        options = {key.lower(): value for key, value in DEFAULT_PROFILES.get(name, {}).items()}
+        if self.config.has_section(section):
+            options.update(self.config.items(section))
+        return LaunchProfile(name, options)
+
+    def get_startup_wait(self) -> int:
+        """Get the maximum number of seconds to wait for the server to finish starting"""
+        return self.config.getint('SERVER', 'StartupWaitSeconds', fallback=15)
+
+    def get_backup_io_class(self) -> str:
+        """Get the I/O scheduling class of backup I/O (idle, best-effort, realtime or none)"""
+        return self.config.get('SERVER', 'BackupIoClass', fallback='best-effort').lower()
+
+    def get_backup_io_level(self) -> int:
+        """Get the I/O priority level of backup I/O within its class (0 highest, 7 lowest)"""
+        return self.config.getint('SERVER', 'BackupIoLevel', fallback=7)
+
+    def get_backup_nice(self) -> int:
+        """Get the CPU niceness of backup threads"""
+        return self.config.getint('SERVER', 'BackupNice', fallback=10)
+
+    def get_backup_max_mbps(self) -> float:
+        """Get the backup bandwidth cap in MiB/s (0 = unlimited)"""
+        return self.config.getfloat('SERVER', 'BackupMaxMBps', fallback=0.0)
+
+    def is_backup_adaptive(self) -> bool:
+        """Check if backups back off while the server reports tick lag"""
+        return self.config.getboolean('SERVER', 'BackupAdaptive', fallback=False)
+
+    def get_backup_min_mbps(self) -> float:
+        """Get the lowest bandwidth adaptive backups back off to, in MiB/s"""
+        return self.config.getfloat('SERVER', 'BackupMinMBps', fallback=5.0)
+
+    def get_backup_delete_rate(self) -> float:
+        """Get the maximum number of files deleted per second by backup retention (0 = unlimited)"""
+        return self.config.getfloat('SERVER', 'BackupDeleteFilesPerSecond', fallback=0.0)
+
+    def is_skip_unchanged_backups_enabled(self) -> bool:
+        """Check if autobackups are skipped while the world is unchanged since the previous backup"""
+        return self.config.getboolean('SERVER', 'SkipUnchangedBackups', fallback=True)
+
+    def get_backup_change_ignore(self) -> List[str]:
+        """Get the world file patterns that do not count as changes for SkipUnchangedBackups"""
+        value = self.config.get('SERVER', 'BackupChangeIgnore', fallback=', '.join(DEFAULT_IGNORE_PATTERNS))
+        return [pattern.strip() for pattern in value.split(',') if pattern.strip()]
+
+    def get_replication_chunk_mb(self) -> int:
+        """Get the size of the sequential chunks backups are replicated in"""
+        return max(1, self.config.getint('SERVER', 'ReplicationChunkMB', fallback=16))
+
+    def get_replication_max_mbps(self) -> float:
+        """Get the replication bandwidth cap in MiB/s (0 = unlimited)"""
+        return self.config.getfloat('SERVER', 'ReplicationMaxMBps', fallback=0.0)
+
+    def get_shutdown_warnings(self) -> List[int]:
+        """Get the remaining times (in seconds, longest first) at which wsqa warns players"""
+        return parse_stages(self.config.get('SERVER', 'ShutdownWarnings', fallback='30m, 10m, 1m, 10s'))
+
+    def get_shutdown_final_countdown(self) -> int:
+        """Get the length in seconds of the per-second countdown before a warned shutdown"""
+        return self.config.getint('SERVER', 'ShutdownFinalCountdown', fallback=5)
+
+    def is_shutdown_early_when_empty(self) -> bool:
+        """Check if a warned shutdown happens early once no players are online"""
+        return self.config.getboolean('SERVER', 'ShutdownEarlyWhenEmpty', fallback=True)
+
+    def get_shutdown_player_check_interval(self) -> float:
+        """Get the seconds between player count checks during a warned shutdown"""
+        return self.config.getfloat('SERVER', 'ShutdownPlayerCheckInterval', fallback=30.0)
+
+    def is_watchdog_enabled(self) -> bool:
+        """Check if crashed servers are restarted automatically"""
+        return self.config.getboolean('SERVER', 'WatchdogEnabled', fallback=False)
+
+    def get_watchdog_interval(self) -> float:
+        """Get the seconds between watchdog checks while a server is down (or without pidfd support)"""
+        return self.config.getfloat('SERVER', 'WatchdogInterval', fallback=2.0)
+
+    def get_watchdog_backoff(self) -> float:
+        """Get the delay before the first restart after a crash, doubled for each further crash"""
+        return self.config.getfloat('SERVER', 'WatchdogBackoffSeconds', fallback=10.0)
+
+    def get_watchdog_max_backoff(self) -> float:
+        """Get the longest delay before a restart"""
+        return self.config.getfloat('SERVER', 'WatchdogMaxBackoffSeconds', fallback=600.0)
+
+    def get_watchdog_max_restarts(self) -> int:
+        """Get how many crashes within the window are restarted before the watchdog gives up"""
+        return self.config.getint('SERVER', 'WatchdogMaxRestarts', fallback=5)
+
+    def get_watchdog_window(self) -> float:
+        """Get the window in seconds in which crashes are counted"""
+        return self.config.getfloat('SERVER', 'WatchdogWindowSeconds', fallback=3600.0)
+
+    def get_watchdog_log_lines(self) -> int:
+        """Get how many lines of latest.log go into a crash report"""
+        return self.config.getint('SERVER', 'WatchdogLogLines', fallback=200)
+
+    def get_crash_report_dir(self, base_dir: str) -> str:
+        """Get the directory crash reports are written to"""
+        return self.config.get('SERVER', 'CrashReportDir', fallback=os.path.join(base_dir, 'crash_reports'))
+
+    def is_backup_manifests_enabled(self) -> bool:
+        """Check if a manifest (file hashes and chunk checksums) is written for each new backup"""
+        return self.config.getboolean('SERVER', 'BackupManifests', fallback=True)
+
+    def get_prune_min_inhabited_ticks(self) -> int:
+        """Get the InhabitedTime (in ticks, 20 per second) below which prune removes a chunk"""
+        return self.config.getint('SERVER', 'PruneMinInhabitedTicks', fallback=1200)
+
+    def get_prune_protect(self) -> List[str]:
+        """Get the areas prune never touches, as '[dimension:]x1,z1,x2,z2' block coordinates"""
+        value = self.config.get('SERVER', 'PruneProtect', fallback='')
+        return [entry.strip() for entry in value.split(';') if entry.strip()]
+
+    def get_prune_spawn_radius(self) -> int:
+        """Get the radius in blocks around the world spawn that prune never touches"""
+        return self.config.getint('SERVER', 'PruneSpawnRadius', fallback=512)
+
+    def get_maintenance_workers(self) -> int:
+        """Get the number of processes prune and compact use for region files (0 = one per CPU)"""
+        return self.config.getint('SERVER', 'MaintenanceWorkers', fallback=0)
+
+    def is_prewarm_enabled(self) -> bool:
+        """Check if region files are read into the page cache before the server starts"""
+        return self.config.getboolean('SERVER', 'PrewarmEnabled', fallback=False)
+
+    def get_prewarm_max_mb(self) -> int:
+        """Get the most MiB of region files read into the page cache before a start"""
+        return self.config.getint('SERVER', 'PrewarmMaxMB', fallback=1024)
+
+    def get_prewarm_ranking(self) -> str:
+        """Get how region files are picked for prewarming ('heat' or 'mtime')"""
+        return self.config.get('SERVER', 'PrewarmRanking', fallback='heat').lower()
+
+    def get_prewarm_workers(self) -> int:
+        """Get the number of region files read in parallel while prewarming"""
+        return max(1, self.config.getint('SERVER', 'PrewarmWorkers', fallback=4))
+
+    def get_prewarm_heat_half_life(self) -> float:
+        """Get the hours after which a region file's visit score has halved"""
+        return self.config.getfloat('SERVER', 'PrewarmHeatHalfLifeHours', fallback=24.0)
+
+    def is_governor_enabled(self) -> bool:
+        """Check if view and simulation distance are lowered automatically while the server lags"""
+        return self.config.getboolean('SERVER', 'GovernorEnabled', fallback=False)
+
+    def get_governor_view_command(self) -> str:
+        """Get the console command setting the view distance, with a {value} placeholder (empty = not adjusted)"""
+        return self.config.get('SERVER', 'GovernorViewCommand', fallback='')
+
+    def get_governor_simulation_command(self) -> str:
+        """Get the console command setting the simulation distance, with a {value} placeholder (empty = not adjusted)"""
+        return self.config.get('SERVER', 'GovernorSimulationCommand', fallback='')
+
+    def get_governor_view_bounds(self) -> Tuple[int, int]:
+        """Get the lowest and highest view distance the governor sets (highest 0 = server.properties)"""
+        return (self.config.getint('SERVER', 'GovernorMinViewDistance', fallback=4),
+                self.config.getint('SERVER', 'GovernorMaxViewDistance', fallback=0))
+
+    def get_governor_simulation_bounds(self) -> Tuple[int, int]:
+        """Get the lowest and highest simulation distance the governor sets (highest 0 = server.properties)"""
+        return (self.config.getint('SERVER', 'GovernorMinSimulationDistance', fallback=4),
+                self.config.getint('SERVER', 'GovernorMaxSimulationDistance', fallback=0))
+
+    def get_governor_step(self) -> int:
+        """Get how many chunks a distance changes by in one adjustment"""
+        return self.config.getint('SERVER', 'GovernorStep', fallback=2)
+
+    def get_governor_high_mspt(self) -> float:
+        """Get the median MSPT at which the governor lowers a distance"""
+        return self.config.getfloat('SERVER', 'GovernorHighMspt', fallback=45.0)
+
+    def get_governor_low_mspt(self) -> float:
+        """Get the 95th percentile MSPT under which the governor raises a distance again"""
+        return self.config.getfloat('SERVER', 'GovernorLowMspt', fallback=30.0)
+
+    def get_governor_window(self) -> float:
+        """Get the seconds of MSPT samples the governor looks at"""
+        return self.config.getfloat('SERVER', 'GovernorWindowSeconds', fallback=60.0)
+
+    def get_governor_cooldown(self) -> float:
+        """Get the minimum number of seconds between two governor adjustments"""
+        return self.config.getfloat('SERVER', 'GovernorCooldownSeconds', fallback=120.0)
+
+    def get_run_dir(self) -> str:
+        """Get the directory holding the pidfiles of the servers and the tunnel"""
+        return self.config.get('SERVER', 'RunDir',
+                               fallback=os.path.join(os.path.dirname(os.path.abspath(self.config_path)), 'run'))
+
+    def get_profile_dir(self, base_dir: str) -> str:
+        """Get the directory profile reports are written to"""
+        return self.config.get('SERVER', 'ProfileDir', fallback=os.path.join(base_dir, 'profiles'))
+
+    def get_control_socket(self, base_dir: str) -> str:
+        """Get the path of the daemon's control socket"""
+        return self.config.get('SERVER', 'ControlSocket', fallback=os.path.join(base_dir, 'manager.sock'))
+
+    def get_instance_names(self) -> List[str]:
+        """Get the names of the managed instances, in config order"""
+        names = self.config.get('SERVER', 'Instances', fallback='')
+        return [name.strip() for name in names.split(',') if name.strip()] or [DEFAULT_INSTANCE]
+
+    def get_default_instance(self) -> str:
+        """Get the instance used when a command has no @instance selector"""
+        return self.config.get('SERVER', 'DefaultInstance', fallback=self.get_instance_names()[0])
+
+    def get_instance(self, name: Optional[str] = None) -> InstanceConfig:
+        """
+        Get the settings of a managed instance.
+
+        :param name: Instance name, defaults to DefaultInstance
+        """
+        name = name or self.get_default_instance()
+        if name not in self.get_instance_names():
+            raise ValueError(f"Unknown instance '{name}' (configured: {', '.join(self.get_instance_names())})")
+        return InstanceConfig(self.config, name)
+
+    def get_max_parallel_instances(self) -> int:
+        """Get the maximum number of instances a fleet-wide command works on at once"""
+        return max(1, self.config.getint('SERVER', 'MaxParallelInstances', fallback=2))
+
+    def get_max_concurrent_commands(self) -> int:
+        """Get how many commands the interactive manager runs in the background at once"""
+        return max(1, self.config.getint('SERVER', 'MaxConcurrentCommands', fallback=4))
+
     def get(self, section: str, option: str, fallback=None):
         """
         General method to retrieve a value from the config with an optional fallback.
@@ -0,0 +1,230 @@
+# utils/control.py
+import contextvars
+import json
+import os
+import socket
+import socketserver
+import struct
+import sys
+import threading
+from typing import Callable, Optional
+
+# Frames are a 4-byte big-endian length followed by a UTF-8 JSON object
+FRAME_HEADER = struct.Struct('>I')
+MAX_FRAME_SIZE = 16 * 1024 * 1024
+
+# Where print() output of the current command goes; None means the daemon's own stdout
+output_sink: contextvars.ContextVar[Optional[Callable[[str], None]]] = contextvars.ContextVar(
+    'output_sink', default=None)
+
+
+class ProtocolError(Exception):
+    """Raised on malformed or oversized frames."""
+
+
+def send_frame(sock: socket.socket, message: dict):
+    data = json.dumps(message, separators=(',', ':')).encode('utf-8')
+    sock.sendall(FRAME_HEADER.pack(len(data)) + data)
+
+
+def _recv_exact(sock: socket.socket, size: int) -> Optional[bytes]:
+    data = b''
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            if data:
+                raise ProtocolError("Connection closed in the middle of a frame")
+            return None
+        data += chunk
+    return data
+
+
+def recv_frame(sock: socket.socket) -> Optional[dict]:
+    """Read one frame; returns None when the peer closed the connection."""
+    header = _recv_exact(sock, FRAME_HEADER.size)
+    if header is None:
+        return None
+    (length,) = FRAME_HEADER.unpack(header)
+    if length > MAX_FRAME_SIZE:
+        raise ProtocolError(f"Frame of {length} bytes exceeds the {MAX_FRAME_SIZE} byte limit")
+    data = _recv_exact(sock, length)
+    if data is None:
+        raise ProtocolError("Connection closed in the middle of a frame")
+    try:
+        message = json.loads(data.decode('utf-8'))
+    except ValueError as e:
+        raise ProtocolError(f"Invalid JSON frame: {e}") from e
+    if not isinstance(message, dict):
+        raise ProtocolError("Frames must contain a JSON object")
+    return message
+
+
+class _RoutingStream:
+    """
+    sys.stdout replacement that sends output of a client's command back to that client.
+    Output from threads without a sink (scheduler, monitors) goes to the original stream.
+    """
+
+    def __init__(self, fallback):
+        self.fallback = fallback
+
+    def write(self, text: str) -> int:
+        sink = output_sink.get()
+        if sink is None:
+            return self.fallback.write(text)
+        sink(text)
+        return len(text)
+
+    def flush(self):
+        self.fallback.flush()
+
+    def __getattr__(self, name):
+        return getattr(self.fallback, name)
+
+
+def install_output_routing():
+    """Route sys.stdout by output_sink; returns the original stream."""
+    if not isinstance(sys.stdout, _RoutingStream):
+        sys.stdout = _RoutingStream(sys.stdout)
+    return sys.stdout.fallback
+
+
+class ControlServer:
+    """
+    Unix-socket control API of the manager daemon.
+
+    Requests (one per frame):
+        {"op": "command", "line": "@lobby backup"}  run a command; its output is streamed as
+                                                    {"type": "output", "data": ...} frames and
+                                                    finished by {"type": "result", "ok": bool}
+        {"op": "follow"}                            stream every log line as {"type": "log", ...}
+                                                    until the client disconnects
+        {"op": "ping"}                              {"type": "pong"}
+        {"op": "shutdown"}                          stop the daemon
+    """
+
+    def __init__(self, socket_path: str, handle_command: Callable[[str], bool], logger,
+                 on_shutdown: Optional[Callable[[], None]] = None):
+        self.socket_path = socket_path
+        self.handle_command = handle_command
+        self.logger = logger
+        self.on_shutdown = on_shutdown
+        self.server: Optional[socketserver.ThreadingUnixStreamServer] = None
+        self.thread: Optional[threading.Thread] = None
+
+    def _handle(self, sock: socket.socket):
+        send_lock = threading.Lock()
+
+        def send(message: dict):
+            with send_lock:
+                send_frame(sock, message)
+
+        while True:
+            try:
+                request = recv_frame(sock)
+            except ProtocolError as e:
+                send({'type': 'error', 'error': str(e)})
+                return
+            if request is None:
+                return
+            op = request.get('op')
+            if op == 'command':
+                self._run(str(request.get('line', '')), send)
+            elif op == 'follow':
+                self._follow(sock, send)
+                return
+            elif op == 'ping':
+                send({'type': 'pong', 'pid': os.getpid()})
+            elif op == 'shutdown':
+                send({'type': 'result', 'ok': True})
+                self.logger.log("Shutdown requested over the control socket")
+                threading.Thread(target=self.stop, daemon=True).start()
+                return
+            else:
+                send({'type': 'error', 'error': f"Unknown op '{op}'"})
+
+    def _run(self, line: str, send: Callable[[dict], None]):
+        def sink(text: str):
+            try:
+                send({'type': 'output', 'data': text})
+            except OSError:
+                # The client went away; the command still runs to completion
+                pass
+
+        token = output_sink.set(sink)
+        try:
+            if line.strip().lower() == 'exit':
+                print("'exit' closes the interactive manager; use 'msmctl.py --shutdown' to stop the daemon.")
+                ok = False
+            else:
+                ok = self.handle_command(line)
+        finally:
+            output_sink.reset(token)
+        send({'type': 'result', 'ok': bool(ok)})
+
+    def _follow(self, sock: socket.socket, send: Callable[[dict], None]):
+        from utils.logger import add_log_listener, remove_log_listener
+
+        closed = threading.Event()
+
+        def listener(entry: str):
+            try:
+                send({'type': 'log', 'data': entry})
+            except OSError:
+                closed.set()
+
+        add_log_listener(listener)
+        try:
+            # Block until the client disconnects
+            while not closed.is_set() and sock.recv(4096):
+                pass
+        except OSError:
+            pass
+        finally:
+            remove_log_listener(listener)
+
+    def start(self):
+        """Bind the socket (owner-only permissions) and serve clients from a background thread."""
+        if os.path.exists(self.socket_path):
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(self.socket_path)
+                raise RuntimeError(f"Another manager daemon is listening on {self.socket_path}")
+            except (ConnectionRefusedError, FileNotFoundError):
+                # Left behind by a daemon that did not exit cleanly
+                os.unlink(self.socket_path)
+            finally:
+                probe.close()
+
+        control = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                try:
+                    control._handle(self.request)
+                except OSError:
+                    pass
+
+        old_umask = os.umask(0o177)
+        try:
+            self.server = socketserver.ThreadingUnixStreamServer(self.socket_path, Handler)
+        finally:
+            os.umask(old_umask)
+        self.server.daemon_threads = True
+        install_output_routing()
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.logger.log(f"Control socket listening on {self.socket_path}")
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+            try:
+                os.unlink(self.socket_path)
+            except FileNotFoundError:
+                pass
+        if self.on_shutdown:
+            self.on_shutdown()
+
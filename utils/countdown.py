@@ -0,0 +1,106 @@
+# utils/countdown.py
+import math
+import re
+import time
+from typing import Callable, List, Optional
+
+DURATION_PATTERN = re.compile(r'^(\d+)\s*([smh]?)$')
+# A bare number means minutes, like everywhere else in the manager
+DURATION_UNITS = {'': 60, 's': 1, 'm': 60, 'h': 3600}
+# "There are 3 of a maximum of 20 players online" (or "There are 3/20 players online")
+PLAYER_COUNT_PATTERN = re.compile(r'There are (\d+)')
+# RCON timeout of a countdown's clients: they are polled from the scheduler thread every second
+RCON_TIMEOUT_SECONDS = 1.0
+
+
+def parse_duration(text: str) -> int:
+    """Parse '30m', '10s', '1h' or '5' (minutes) to seconds."""
+    match = DURATION_PATTERN.match(text.strip().lower())
+    if not match:
+        raise ValueError(f"Invalid duration '{text}' (use e.g. 30m, 10s or 1h)")
+    return int(match.group(1)) * DURATION_UNITS[match.group(2)]
+
+
+def parse_stages(text: str) -> List[int]:
+    """Parse a comma-separated list of durations to seconds, longest first."""
+    return sorted({parse_duration(part) for part in text.split(',') if part.strip()}, reverse=True)
+
+
+def format_duration(seconds: float) -> str:
+    seconds = int(math.ceil(seconds))
+    for unit, size in (('hour', 3600), ('minute', 60)):
+        if seconds >= size and seconds % size == 0:
+            count = seconds // size
+            return f"{count} {unit}{'s' if count != 1 else ''}"
+    if seconds >= 60:
+        return f"{seconds // 60} min {seconds % 60} s"
+    return f"{seconds} second{'s' if seconds != 1 else ''}"
+
+
+def parse_player_count(output: str) -> Optional[int]:
+    """Number of online players from the output of the 'list' command."""
+    match = PLAYER_COUNT_PATTERN.search(output)
+    return int(match.group(1)) if match else None
+
+
+class ShutdownCountdown:
+    """
+    Warned shutdown that is advanced by tick() from the scheduler thread about once a
+    second, so a countdown costs neither a process nor a sleeping thread.
+
+    Players are warned when the countdown starts, when each stage (e.g. 10 minutes
+    left) is reached and every second during the final countdown. Stages longer than
+    the delay are skipped.
+    """
+
+    def __init__(self, delay_seconds: int, stages: List[int], final_seconds: int,
+                 announce: Callable[[str], None], on_close: Optional[Callable[[], None]] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        :param stages: Remaining times in seconds at which to warn, see parse_stages()
+        :param final_seconds: Length of the per-second countdown at the end (0 = none)
+        :param announce: Sends a message to the players
+        :param on_close: Called once the countdown is cancelled or has finished
+        """
+        self.clock = clock
+        self.deadline = clock() + delay_seconds
+        self.stages = sorted((stage for stage in stages if final_seconds < stage < delay_seconds), reverse=True)
+        self.final_seconds = final_seconds
+        self.announce = announce
+        self.on_close = on_close
+        self._last_second: Optional[int] = None
+        announce(f"Server shutdown in {format_duration(delay_seconds)}!")
+
+    def remaining(self) -> float:
+        return max(0.0, self.deadline - self.clock())
+
+    def tick(self) -> bool:
+        """Send the warnings that are due. Returns True once the server should stop."""
+        remaining = self.remaining()
+        if remaining <= 0:
+            return True
+        seconds = math.ceil(remaining)
+        if seconds <= self.final_seconds:
+            if seconds != self._last_second:
+                self._last_second = seconds
+                self.announce(f"Server shutdown in {seconds}...")
+            return False
+        reached = [stage for stage in self.stages if stage >= seconds]
+        if reached:
+            # After a delayed tick only the closest stage is announced
+            self.stages = [stage for stage in self.stages if stage < seconds]
+            self.announce(f"Server shutdown in {format_duration(min(reached))}!")
+        return False
+
+    def stop_now(self):
+        """Skip the rest of the countdown; the next tick() returns True."""
+        self.deadline = self.clock()
+
+    def cancel(self):
+        self.announce("Server shutdown cancelled.")
+        self.close()
+
+    def close(self):
+        if self.on_close is not None:
+            self.on_close()
+            self.on_close = None
@@ -0,0 +1,220 @@
+# utils/governor.py
+import threading
+import time
+from collections import namedtuple
+from typing import Callable, List, Optional
+
+from utils.metrics import REGISTRY
+from utils.proc_stats import RingBuffer
+from utils.server_properties import read_server_properties
+
+# Vanilla default of both distances when server.properties does not set them
+DEFAULT_DISTANCE = 10
+# MSPT samples needed in the window before the governor acts on them
+MIN_SAMPLES = 3
+
+Adjustment = namedtuple('Adjustment', ['timestamp', 'setting', 'old', 'new', 'reason'])
+
+GOVERNOR_DISTANCE = REGISTRY.gauge('msm_governor_distance', 'View and simulation distance set by the governor.',
+                                   ('instance', 'setting'))
+GOVERNOR_ADJUSTMENTS = REGISTRY.counter('msm_governor_adjustments_total',
+                                        'View/simulation distance changes made by the governor.', ('instance', 'setting'))
+
+
+class Knob:
+    """A distance setting the governor can change at runtime through a console command."""
+
+    def __init__(self, setting: str, command: str, minimum: int, maximum: int):
+        """
+        :param setting: server.properties key, e.g. 'view-distance'
+        :param command: Console command with a {value} placeholder; empty if the server has none
+        """
+        self.setting = setting
+        self.command = command
+        self.minimum = minimum
+        self.maximum = maximum
+        self.value = maximum
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.command)
+
+
+class Governor:
+    """
+    Steps view-distance and simulation-distance down while a server is overloaded and
+    back up once it has recovered.
+
+    MSPT comes from the instance's lag monitor (polled over RCON) together with its
+    "Can't keep up!" events. Two thresholds and a cooldown give the hysteresis: the
+    median MSPT over the window must reach high_mspt (or the server fell behind) to
+    step down, and the 95th percentile must stay under low_mspt to step up, with at
+    least cooldown_seconds between two changes. Simulation distance, which drives tick
+    cost, is lowered first and raised last. Nothing is lowered while no player is online.
+
+    The starting values are those in server.properties; when the server restarts it
+    loads them again, so the governor starts over from them.
+    """
+
+    def __init__(self, name: str, monitor, send_command: Callable[[str], bool],
+                 player_count: Callable[[], Optional[int]], find_pid: Callable[[], Optional[int]],
+                 server_root: str, logger, view_command: str = '', simulation_command: str = '',
+                 min_view: int = 4, max_view: int = 0, min_simulation: int = 4, max_simulation: int = 0,
+                 step: int = 2, high_mspt: float = 45.0, low_mspt: float = 30.0, window_seconds: float = 60.0,
+                 cooldown_seconds: float = 120.0, interval_seconds: float = 10.0):
+        """
+        :param monitor: LagMonitor of the instance; it must poll MSPT over RCON
+        :param send_command: Runs a console command on the server; returns success
+        :param player_count: Number of online players, or None if unknown
+        :param max_view: Upper bound of view-distance (0 = the value in server.properties)
+        :param max_simulation: Upper bound of simulation-distance (0 = the value in server.properties)
+        """
+        self.name = name
+        self.monitor = monitor
+        self.send_command = send_command
+        self.player_count = player_count
+        self.find_pid = find_pid
+        self.server_root = server_root
+        self.logger = logger
+        self.step = max(1, step)
+        self.high_mspt = high_mspt
+        self.low_mspt = low_mspt
+        self.window_seconds = window_seconds
+        self.cooldown_seconds = cooldown_seconds
+        self.interval_seconds = interval_seconds
+        self._bounds = {'view-distance': (min_view, max_view), 'simulation-distance': (min_simulation, max_simulation)}
+        # Lowered in this order, raised in reverse
+        self.knobs = [Knob('simulation-distance', simulation_command, min_simulation, max_simulation),
+                      Knob('view-distance', view_command, min_view, max_view)]
+        self.adjustments = RingBuffer(50)
+        self.pid: Optional[int] = None
+        self._last_change: Optional[float] = None
+        # Serialises the governor thread with reset() from a command
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.load_defaults()
+
+    def load_defaults(self):
+        """Take the starting values and unset upper bounds from server.properties."""
+        properties = read_server_properties(self.server_root)
+        view = int(properties.get('view-distance') or DEFAULT_DISTANCE)
+        for knob in self.knobs:
+            configured = int(properties.get(knob.setting) or view)
+            minimum, maximum = self._bounds[knob.setting]
+            knob.maximum = maximum or configured
+            knob.minimum = min(minimum, knob.maximum)
+            knob.value = configured
+            GOVERNOR_DISTANCE.set(knob.value, instance=self.name, setting=knob.setting)
+        self._last_change = None
+
+    def _set(self, knob: Knob, value: int, reason: str) -> bool:
+        if not self.send_command(knob.command.format(value=value)):
+            self.logger.log(f"Governor '{self.name}': could not set {knob.setting} to {value}")
+            return False
+        self.adjustments.append(Adjustment(time.time(), knob.setting, knob.value, value, reason))
+        self.logger.log(f"Governor '{self.name}': {knob.setting} {knob.value} -> {value} ({reason})")
+        knob.value = value
+        GOVERNOR_DISTANCE.set(value, instance=self.name, setting=knob.setting)
+        GOVERNOR_ADJUSTMENTS.inc(instance=self.name, setting=knob.setting)
+        return True
+
+    def _step_down(self, reason: str) -> bool:
+        for knob in self.knobs:
+            if knob.enabled and knob.value > knob.minimum:
+                return self._set(knob, max(knob.minimum, knob.value - self.step), reason)
+        return False
+
+    def _step_up(self, reason: str) -> bool:
+        for knob in reversed(self.knobs):
+            if knob.enabled and knob.value < knob.maximum:
+                return self._set(knob, min(knob.maximum, knob.value + self.step), reason)
+        return False
+
+    def _lag_events(self) -> int:
+        cutoff = time.time() - self.window_seconds
+        return sum(1 for event in self.monitor.lag_events.items() if event.timestamp >= cutoff)
+
+    def check_once(self) -> Optional[str]:
+        """Evaluate tick health once and adjust a distance if needed; returns the reason of a change."""
+        with self._lock:
+            return self._check()
+
+    def _check(self) -> Optional[str]:
+        pid = self.find_pid()
+        if pid is None:
+            self.pid = None
+            return None
+        if pid != self.pid:
+            # (Re)started server: it runs with the values in server.properties
+            self.pid = pid
+            self.load_defaults()
+            return None
+        if self._last_change is not None and time.monotonic() - self._last_change < self.cooldown_seconds:
+            return None
+        stats = self.monitor.mspt_percentiles(self.window_seconds)
+        if stats is None or stats['samples'] < MIN_SAMPLES:
+            return None
+        behind = self._lag_events()
+        players = self.player_count()
+        context = (f"MSPT p50 {stats['p50']:.1f}ms p95 {stats['p95']:.1f}ms over {self.window_seconds:.0f}s"
+                   + (f", {behind} lag events" if behind else "")
+                   + (f", {players} players" if players is not None else ""))
+
+        changed = False
+        if (stats['p50'] >= self.high_mspt or behind) and players != 0:
+            changed = self._step_down(context)
+        elif stats['p95'] <= self.low_mspt and not behind:
+            changed = self._step_up(context)
+        if changed:
+            self._last_change = time.monotonic()
+            return context
+        return None
+
+    def reset(self) -> bool:
+        """Restore the upper bound of every distance."""
+        success = True
+        with self._lock:
+            for knob in self.knobs:
+                if knob.enabled and knob.value != knob.maximum:
+                    success = self._set(knob, knob.maximum, "reset") and success
+            self._last_change = time.monotonic()
+        return success
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+
+        def run():
+            while not self._stop_event.is_set():
+                try:
+                    self.check_once()
+                except Exception as e:
+                    self.logger.log(f"Error in governor of '{self.name}': {e}")
+                self._stop_event.wait(self.interval_seconds)
+
+        self._thread = threading.Thread(target=run, name=f'governor-{self.name}', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def report(self) -> str:
+        lines = []
+        for knob in reversed(self.knobs):
+            if knob.enabled:
+                lines.append(f"{knob.setting}: {knob.value} (bounds {knob.minimum}-{knob.maximum})")
+            else:
+                lines.append(f"{knob.setting}: not adjusted (no command configured)")
+        lines.append(f"Thresholds: down at p50 >= {self.high_mspt:.0f}ms, up at p95 <= {self.low_mspt:.0f}ms, "
+                     f"{self.cooldown_seconds:.0f}s between changes")
+        adjustments: List[Adjustment] = self.adjustments.items()
+        lines.append(f"Adjustments: {len(adjustments)} recorded")
+        for adjustment in adjustments[-10:]:
+            when = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(adjustment.timestamp))
+            lines.append(f"  [{when}] {adjustment.setting} {adjustment.old} -> {adjustment.new} ({adjustment.reason})")
+        return '\n'.join(lines)
@@ -0,0 +1,170 @@
+# utils/jvm_profile.py
+import json
+import shlex
+from datetime import datetime
+from typing import Dict, List, Optional
+
+# Flags recommended for G1 on Minecraft servers (Aikar's flags); the young
+# generation sizing switches at 12 GiB of heap.
+G1_FLAGS = [
+    '-XX:+UseG1GC', '-XX:+ParallelRefProcEnabled', '-XX:MaxGCPauseMillis=200',
+    '-XX:+UnlockExperimentalVMOptions', '-XX:+DisableExplicitGC',
+    '-XX:G1HeapWastePercent=5', '-XX:G1MixedGCCountTarget=4', '-XX:InitiatingHeapOccupancyPercent=15',
+    '-XX:G1MixedGCLiveThresholdPercent=90', '-XX:G1RSetUpdatingPauseTimePercent=5',
+    '-XX:SurvivorRatio=32', '-XX:+PerfDisableSharedMem', '-XX:MaxTenuringThreshold=1',
+]
+G1_SMALL_HEAP_FLAGS = ['-XX:G1NewSizePercent=30', '-XX:G1MaxNewSizePercent=40',
+                       '-XX:G1HeapRegionSize=8M', '-XX:G1ReservePercent=20']
+G1_LARGE_HEAP_FLAGS = ['-XX:G1NewSizePercent=40', '-XX:G1MaxNewSizePercent=50',
+                       '-XX:G1HeapRegionSize=16M', '-XX:G1ReservePercent=15']
+ZGC_FLAGS = ['-XX:+UseZGC', '-XX:+DisableExplicitGC', '-XX:+PerfDisableSharedMem']
+
+GC_PROFILES = ('g1', 'zgc', 'zgc-generational', 'default')
+
+# Built-in profiles, used when config.ini has no [JVM:<name>] section of that name
+DEFAULT_PROFILES = {
+    'g1': {'GC': 'g1'},
+    'zgc': {'GC': 'zgc', 'HeapHeadroomPercent': '30'},
+}
+
+
+def read_meminfo(path: str = '/proc/meminfo') -> Dict[str, int]:
+    """Read /proc/meminfo into a mapping of field names to bytes."""
+    meminfo = {}
+    with open(path, 'r') as meminfo_file:
+        for line in meminfo_file:
+            key, _, value = line.partition(':')
+            parts = value.split()
+            if parts:
+                meminfo[key] = int(parts[0]) * (1024 if len(parts) > 1 and parts[1] == 'kB' else 1)
+    return meminfo
+
+
+def compute_heap_mb(total_mb: int, headroom_percent: float, min_headroom_mb: int,
+                    min_heap_mb: int, max_heap_mb: int) -> int:
+    """
+    Size the heap from host memory, leaving headroom for the OS page cache,
+    JVM off-heap memory and the manager itself.
+    """
+    headroom_mb = max(total_mb * headroom_percent / 100.0, min_headroom_mb)
+    heap_mb = int(total_mb - headroom_mb)
+    return max(min_heap_mb, min(heap_mb, max_heap_mb))
+
+
+def parse_size_mb(value: str) -> int:
+    """Parse a JVM-style size ('16G', '8192M', '8192') into MiB."""
+    value = value.strip().upper()
+    if value.endswith('G'):
+        return int(float(value[:-1]) * 1024)
+    if value.endswith('M'):
+        return int(float(value[:-1]))
+    return int(value)
+
+
+class LaunchProfile:
+    """JVM launch settings read from a [JVM:<name>] section of config.ini."""
+
+    def __init__(self, name: str, options: Dict[str, str]):
+        options = {key.lower(): value for key, value in options.items()}
+        self.name = name
+        self.java = options.get('java', 'java')
+        self.jar = options.get('jar', 'fabric-server.jar')
+        self.heap = options.get('heap', 'auto')
+        self.headroom_percent = float(options.get('heapheadroompercent', 25))
+        self.min_headroom_mb = int(options.get('heapheadroommb', 1536))
+        self.min_heap_mb = int(options.get('minheapmb', 1024))
+        # Stay below 32 GiB so the JVM keeps compressed object pointers
+        self.max_heap_mb = int(options.get('maxheapmb', 31744))
+        self.gc = options.get('gc', 'g1').lower()
+        self.pretouch = options.get('alwayspretouch', 'false').lower() in ('1', 'true', 'yes', 'on')
+        self.large_pages = options.get('largepages', 'off').lower()
+        self.gc_log = options.get('gclog', '')
+        self.extra_args = shlex.split(options.get('extraargs', ''))
+        if self.gc not in GC_PROFILES:
+            raise ValueError(f"Unknown GC profile '{self.gc}' in JVM profile '{name}' (use one of {GC_PROFILES})")
+        if self.large_pages not in ('off', 'explicit', 'transparent'):
+            raise ValueError(f"LargePages must be off, explicit or transparent in JVM profile '{name}'")
+
+    def heap_mb(self, meminfo: Optional[Dict[str, int]] = None) -> int:
+        """Resolve the heap size in MiB, sizing it from /proc/meminfo when set to auto."""
+        if self.heap.lower() != 'auto':
+            return parse_size_mb(self.heap)
+        meminfo = meminfo if meminfo is not None else read_meminfo()
+        total_mb = meminfo['MemTotal'] // (1024 * 1024)
+        return compute_heap_mb(total_mb, self.headroom_percent, self.min_headroom_mb,
+                               self.min_heap_mb, self.max_heap_mb)
+
+    def gc_flags(self, heap_mb: int) -> List[str]:
+        if self.gc == 'g1':
+            return G1_FLAGS + (G1_LARGE_HEAP_FLAGS if heap_mb >= 12 * 1024 else G1_SMALL_HEAP_FLAGS)
+        if self.gc == 'zgc':
+            return list(ZGC_FLAGS)
+        if self.gc == 'zgc-generational':
+            # JDK 21/22 only: generational ZGC is the only mode from JDK 23, where the flag is obsolete
+            return ZGC_FLAGS + ['-XX:+ZGenerational']
+        return []
+
+    def build_command(self, meminfo: Optional[Dict[str, int]] = None,
+                      timestamp: Optional[str] = None) -> List[str]:
+        """Build the java command line for this profile."""
+        heap_mb = self.heap_mb(meminfo)
+        command = [self.java, f'-Xms{heap_mb}M', f'-Xmx{heap_mb}M']
+        command += self.gc_flags(heap_mb)
+        if self.pretouch:
+            command.append('-XX:+AlwaysPreTouch')
+        if self.large_pages == 'explicit':
+            command.append('-XX:+UseLargePages')
+        elif self.large_pages == 'transparent':
+            command.append('-XX:+UseTransparentHugePages')
+        if self.gc_log:
+            command.append(f'-Xlog:gc*:file={self.gc_log_path(timestamp)}:time,uptime:filecount=5,filesize=20M')
+        command += self.extra_args
+        command += ['-jar', self.jar, 'nogui']
+        return command
+
+    def gc_log_path(self, timestamp: Optional[str] = None) -> str:
+        """GC log path with {profile} and {timestamp} placeholders filled in."""
+        if not self.gc_log:
+            return ''
+        timestamp = timestamp or datetime.now().strftime("%Y%m%d_%H%M%S")
+        return self.gc_log.format(profile=self.name, timestamp=timestamp)
+
+
+def record_launch(history_path: str, entry: dict):
+    """Append one launch record to the JSON-lines launch history."""
+    with open(history_path, 'a') as history_file:
+        history_file.write(json.dumps(entry, sort_keys=True) + '\n')
+
+
+def read_launch_history(history_path: str) -> List[dict]:
+    """Read all launch records, skipping lines that are not valid JSON."""
+    entries = []
+    try:
+        with open(history_path, 'r') as history_file:
+            for line in history_file:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    continue
+    except FileNotFoundError:
+        pass
+    return entries
+
+
+def summarize_launch_history(entries: List[dict]) -> str:
+    """Compare startup times per profile."""
+    by_profile: Dict[str, List[dict]] = {}
+    for entry in entries:
+        by_profile.setdefault(entry.get('profile', '?'), []).append(entry)
+    if not by_profile:
+        return "No launches recorded yet."
+
+    lines = [f"{'Profile':<16}{'Launches':>9}{'Started':>9}{'Avg start':>11}{'Best':>8}  Last heap / GC"]
+    for profile, launches in sorted(by_profile.items()):
+        startup_times = [e['startup_seconds'] for e in launches if e.get('startup_seconds') is not None]
+        average = f"{sum(startup_times) / len(startup_times):.1f}s" if startup_times else '-'
+        best = f"{min(startup_times):.1f}s" if startup_times else '-'
+        last = launches[-1]
+        lines.append(f"{profile:<16}{len(launches):>9}{len(startup_times):>9}{average:>11}{best:>8}  "
+                     f"{last.get('heap_mb')}M / {last.get('gc')}")
+    return '\n'.join(lines)
@@ -0,0 +1,279 @@
+# utils/lag_monitor.py
+import math
+import os
+import re
+import threading
+import time
+from collections import namedtuple
+from typing import Callable, Iterable, List, Optional
+
+from utils.metrics import REGISTRY
+from utils.proc_stats import RingBuffer
+from utils.rcon import rcon_client_for_instance
+
+CANT_KEEP_UP = re.compile(r"Can't keep up! Is the server overloaded\? Running (\d+)ms or (\d+) ticks behind")
+# `tick query` (1.20.3+): "Average time per tick: 12.3ms (Target: 50.0ms)"
+AVERAGE_MSPT = re.compile(r'Average time per tick:\s*([\d.]+)\s*ms')
+# Other commands (LagRconCommand) must label the value, e.g. "MSPT: 12.3"
+LABELLED_MSPT = re.compile(r'MSPT:\s*([\d.]+)')
+
+LagEvent = namedtuple('LagEvent', ['timestamp', 'behind_ms', 'ticks', 'jobs'])
+MsptSample = namedtuple('MsptSample', ['timestamp', 'mspt', 'jobs'])
+
+LAG_EVENTS = REGISTRY.counter('msm_lag_events_total', "Server \"Can't keep up\" warnings seen in latest.log.",
+                              ('instance',))
+LAG_BEHIND_MS = REGISTRY.counter('msm_lag_behind_ms_total', "Milliseconds behind reported by \"Can't keep up\" lines.",
+                                 ('instance',))
+SERVER_MSPT = REGISTRY.gauge('msm_server_mspt', 'Last MSPT reported by the server over RCON.', ('instance',))
+
+
+class LogTailer:
+    """Incrementally read new lines from a log file, following truncation and rotation."""
+
+    def __init__(self, path: str, from_end: bool = True):
+        self.path = path
+        self._inode = None
+        self._offset = 0
+        self._partial = b''
+        if from_end:
+            try:
+                stat = os.stat(path)
+                self._inode, self._offset = stat.st_ino, stat.st_size
+            except OSError:
+                pass
+
+    def read_lines(self) -> List[str]:
+        """Return the complete lines appended since the last call."""
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return []
+        if stat.st_ino != self._inode or stat.st_size < self._offset:
+            # latest.log was rotated to logs/<date>.log.gz or truncated
+            self._inode, self._offset, self._partial = stat.st_ino, 0, b''
+        if stat.st_size == self._offset:
+            return []
+        with open(self.path, 'rb') as log_file:
+            log_file.seek(self._offset)
+            data = log_file.read()
+        self._offset += len(data)
+        lines = (self._partial + data).split(b'\n')
+        self._partial = lines.pop()
+        return [line.decode('utf-8', errors='replace').rstrip('\r') for line in lines]
+
+
+def parse_mspt(output: str) -> Optional[float]:
+    """
+    Extract the average MSPT from the output of a tick query command; None when the output
+    has no labelled MSPT, rather than taking whatever number is followed by "ms".
+    """
+    match = AVERAGE_MSPT.search(output) or LABELLED_MSPT.search(output)
+    return float(match.group(1)) if match else None
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of values (fraction in 0..1)."""
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+class LagMonitor:
+    """
+    Track server tick health from "Can't keep up!" log lines and, when configured,
+    MSPT polled over RCON. Crossing a threshold logs a warning (and optionally
+    announces it in chat) annotated with the scheduled jobs running at the time;
+    alert_cooldown_seconds=None records lag without alerting, and export_metrics=False
+    keeps a second monitor of the same server out of the exported metrics.
+    """
+
+    def __init__(self, name: str, log_path: str, logger, rcon_client=None, rcon_command: str = 'tick query',
+                 interval_seconds: float = 5.0, warn_mspt: float = 50.0, warn_behind_ms: int = 2000,
+                 alert_cooldown_seconds: Optional[float] = 60.0, history_size: int = 720,
+                 running_jobs: Callable[[], Iterable[str]] = lambda: (),
+                 chat: Optional[Callable[[str], bool]] = None, export_metrics: bool = True):
+        self.name = name
+        self.tailer = LogTailer(log_path)
+        self.logger = logger
+        self.rcon_client = rcon_client
+        self.rcon_command = rcon_command
+        self.interval_seconds = interval_seconds
+        self.warn_mspt = warn_mspt
+        self.warn_behind_ms = warn_behind_ms
+        self.alert_cooldown_seconds = alert_cooldown_seconds
+        self.running_jobs = running_jobs
+        self.chat = chat
+        self.export_metrics = export_metrics
+        self.mspt_history = RingBuffer(history_size)
+        self.lag_events = RingBuffer(100)
+        self._last_alert = 0.0
+        self._rcon_failed = False
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _alert(self, message: str):
+        if self.alert_cooldown_seconds is None:
+            return
+        now = time.time()
+        if now - self._last_alert < self.alert_cooldown_seconds:
+            return
+        self._last_alert = now
+        self.logger.log(f"Lag warning: {message}")
+        if self.chat:
+            self.chat(f"[Manager] Lag detected: {message}")
+
+    def _jobs_suffix(self, jobs: List[str]) -> str:
+        return f" (running: {', '.join(jobs)})" if jobs else ''
+
+    def process_lines(self, lines: Iterable[str]):
+        """Record lag events from server log lines."""
+        for line in lines:
+            match = CANT_KEEP_UP.search(line)
+            if not match:
+                continue
+            behind_ms, ticks = int(match.group(1)), int(match.group(2))
+            jobs = sorted(self.running_jobs())
+            self.lag_events.append(LagEvent(time.time(), behind_ms, ticks, jobs))
+            if self.export_metrics:
+                LAG_EVENTS.inc(instance=self.name)
+                LAG_BEHIND_MS.inc(behind_ms, instance=self.name)
+            if behind_ms >= self.warn_behind_ms:
+                self._alert(f"server is {behind_ms}ms ({ticks} ticks) behind{self._jobs_suffix(jobs)}")
+
+    def poll_rcon(self) -> Optional[float]:
+        """Query MSPT over RCON and record it; returns None when unavailable."""
+        if self.rcon_client is None:
+            return None
+        try:
+            mspt = parse_mspt(self.rcon_client.command(self.rcon_command))
+            self._rcon_failed = False
+        except Exception as e:
+            if not self._rcon_failed:
+                self.logger.log(f"Lag monitor cannot query RCON: {e}")
+                self._rcon_failed = True
+            return None
+        if mspt is None:
+            return None
+        jobs = sorted(self.running_jobs())
+        self.mspt_history.append(MsptSample(time.time(), mspt, jobs))
+        if self.export_metrics:
+            SERVER_MSPT.set(mspt, instance=self.name)
+        if mspt >= self.warn_mspt:
+            self._alert(f"MSPT {mspt:.1f}ms over {self.warn_mspt:.0f}ms{self._jobs_suffix(jobs)}")
+        return mspt
+
+    def check_once(self):
+        self.process_lines(self.tailer.read_lines())
+        self.poll_rcon()
+
+    def recently_lagging(self, seconds: float) -> bool:
+        """True if a lag event or an MSPT sample over the threshold was seen in the last `seconds`."""
+        cutoff = time.time() - seconds
+        if any(event.timestamp >= cutoff for event in self.lag_events.items()):
+            return True
+        return any(sample.timestamp >= cutoff and sample.mspt >= self.warn_mspt
+                   for sample in self.mspt_history.items())
+
+    def mspt_percentiles(self, seconds: Optional[float] = None) -> Optional[dict]:
+        """Return p50/p95/p99/max MSPT over the last `seconds` (all history if None)."""
+        samples = self.mspt_history.items()
+        if seconds is not None:
+            cutoff = time.time() - seconds
+            samples = [sample for sample in samples if sample.timestamp >= cutoff]
+        values = [sample.mspt for sample in samples]
+        if not values:
+            return None
+        return {'p50': percentile(values, 0.50), 'p95': percentile(values, 0.95),
+                'p99': percentile(values, 0.99), 'max': max(values), 'samples': len(values)}
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self._stop_event.clear()
+
+        def run():
+            while not self._stop_event.is_set():
+                try:
+                    self.check_once()
+                except Exception as e:
+                    self.logger.log(f"Error in lag monitor: {e}")
+                self._stop_event.wait(self.interval_seconds)
+
+        self._thread = threading.Thread(target=run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        if self.rcon_client:
+            self.rcon_client.close()
+
+    def report(self) -> str:
+        """Build the text shown by the `lag` command."""
+        lines = []
+        for label, seconds in (('1 min', 60), ('5 min', 300), ('all', None)):
+            stats = self.mspt_percentiles(seconds)
+            if stats:
+                lines.append(f"MSPT {label:<6} p50 {stats['p50']:.1f}  p95 {stats['p95']:.1f}  "
+                             f"p99 {stats['p99']:.1f}  max {stats['max']:.1f}  ({stats['samples']} samples)")
+        if not lines:
+            lines.append("No MSPT samples" + ("" if self.rcon_client else " (RCON polling disabled)"))
+
+        events = self.lag_events.items()
+        lines.append(f"Lag events: {len(events)} recorded")
+        for event in events[-10:]:
+            when = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(event.timestamp))
+            lines.append(f"  [{when}] {event.behind_ms}ms / {event.ticks} ticks behind{self._jobs_suffix(event.jobs)}")
+        return '\n'.join(lines)
+
+
+class LagDetector:
+    """
+    Reports whether an instance lagged in the last window_seconds; long I/O jobs call it to
+    back off. Close it when the job is done, which releases its own monitor's RCON connection.
+    """
+
+    def __init__(self, monitor: LagMonitor, window_seconds: float = 10.0, owned: bool = True):
+        """
+        :param owned: The monitor was made for this detector and is polled on each call;
+                      False for an instance's running monitor, which polls itself
+        """
+        self.monitor = monitor
+        self.window_seconds = window_seconds
+        self.owned = owned
+
+    def __call__(self) -> bool:
+        if self.owned:
+            self.monitor.check_once()
+        return self.monitor.recently_lagging(self.window_seconds)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def close(self):
+        if self.owned and self.monitor.rcon_client is not None:
+            self.monitor.rcon_client.close()
+
+
+def lag_detector(config_manager, instance, logger, window_seconds: float = 10.0) -> LagDetector:
+    """
+    A detector with its own monitor of the instance, for when its lag monitor is not running.
+    It records lag but never alerts or exports metrics.
+    """
+    monitor = LagMonitor(instance.name, instance.log_path, logger,
+                         rcon_client=rcon_client_for_instance(config_manager, instance),
+                         rcon_command=config_manager.get_lag_rcon_command(),
+                         warn_mspt=config_manager.get_lag_warn_mspt(),
+                         warn_behind_ms=config_manager.get_lag_warn_behind_ms(),
+                         alert_cooldown_seconds=None, export_metrics=False)
+    return LagDetector(monitor, window_seconds)
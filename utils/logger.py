@@ -1,6 +1,22 @@
 # utils/logger.py
 import datetime
 import os
+import threading
+
+# Callbacks receiving every log entry, e.g. daemon clients following the log
+_listeners = []
+_listeners_lock = threading.Lock()
+
+
+def add_log_listener(callback):
+    with _listeners_lock:
+        _listeners.append(callback)
+
+
+def remove_log_listener(callback):
+    with _listeners_lock:
+        if callback in _listeners:
+            _listeners.remove(callback)
 
 
 class Logger:
@@ -28,3 +44,8 @@ class Logger:
                 log_file.write(log_entry + '\n')
         except IOError as e:
             print(f"Error writing to log file: {e}")
+
+        with _listeners_lock:
+            listeners = list(_listeners)
+        for listener in listeners:
+            listener(log_entry)
@@ -1,13 +1,17 @@
 import os
-import re
 import subprocess
 import sys
 import time
 
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+from utils.config_manager import ConfigManager
+from utils.process_registry import ProcessRegistry
+
 
 def send_server_message(message: str) -> bool:
     """
-    Send a message/command to all active screen sessions and log the last few lines of the server log.
+    Send a message/command to the screen sessions of all running servers and log the last few lines of the server log.
 
     Args:
         message (str): The message/command to send.
@@ -16,9 +20,9 @@ def send_server_message(message: str) -> bool:
         bool: True if the message was sent successfully to at least one session.
     """
     try:
-        # Get list of screen sessions
-        screen_list_output = subprocess.check_output(['screen', '-ls'], universal_newlines=True)
-        screen_sessions = re.findall(r'\t(\d+\.\S+)', screen_list_output)
+        # Get the screen sessions of the servers from their pidfiles
+        registry = ProcessRegistry(ConfigManager(os.path.join(BASE_DIR, 'config.ini')).get_run_dir())
+        screen_sessions = [record.session_id for record in registry.running() if record.session]
 
         if not screen_sessions:
             print("No active screen sessions found.")
@@ -0,0 +1,289 @@
+# utils/metrics.py
+import bisect
+import os
+import threading
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+# Bucket bounds in seconds, from sub-second commands up to half-hour backups
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+                   30.0, 60.0, 120.0, 300.0, 600.0, 1800.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels):
+        """Increase the counter for the given label values."""
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def get(self, **labels) -> float:
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        with self._lock:
+            return self._values.get(key, 0.0)
+
+    def render(self) -> str:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}')
+        return '\n'.join(lines)
+
+
+class Gauge(Counter):
+    def set(self, value: float, **labels):
+        """Set the gauge for the given label values."""
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def render(self) -> str:
+        return super().render().replace(f'# TYPE {self.name} counter', f'# TYPE {self.name} gauge', 1)
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts..., +Inf count, sum]
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        """Record a single observation."""
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def time(self, **labels):
+        """Context manager recording the wall time of the enclosed block."""
+        return _Timer(self, labels)
+
+    def count(self, **labels) -> int:
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            return sum(series[:-1]) if series else 0
+
+    def render(self) -> str:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            items = sorted((key, list(series)) for key, series in self._series.items())
+        for key, series in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), series[:-1]):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f'{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}')
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f'{self.name}_sum{labels} {_format_value(series[-1])}')
+            lines.append(f'{self.name}_count{labels} {cumulative}')
+        return '\n'.join(lines)
+
+
+class _Timer:
+    def __init__(self, histogram: Histogram, labels: dict):
+        self.histogram = histogram
+        self.labels = labels
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                  buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        """Render all metrics in the Prometheus text exposition format."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return '\n'.join(metric.render() for metric in metrics) + '\n'
+
+
+# Process-wide registry shared by the manager and the utils it calls
+REGISTRY = MetricsRegistry()
+
+COMMANDS_TOTAL = REGISTRY.counter(
+    'msm_command_total', 'Manager commands executed, by command and result.', ('command', 'result'))
+COMMAND_DURATION = REGISTRY.histogram(
+    'msm_command_duration_seconds', 'Wall time of manager commands.', ('command',))
+BACKUP_BYTES = REGISTRY.counter(
+    'msm_backup_bytes_total', 'Bytes written by backups and restores.', ('kind', 'instance'))
+BACKUP_DURATION = REGISTRY.histogram(
+    'msm_backup_duration_seconds', 'Wall time of backups and restores.', ('kind', 'instance', 'result'))
+BACKUP_THROTTLE_SECONDS = REGISTRY.counter(
+    'msm_backup_throttle_seconds_total', 'Time backups spent waiting on the bandwidth cap.', ('kind', 'instance'))
+BACKUPS_SKIPPED = REGISTRY.counter(
+    'msm_backup_skipped_total', 'Autobackups skipped because the world was unchanged.', ('instance',))
+REPLICATION_BYTES = REGISTRY.counter(
+    'msm_replication_bytes_total', 'Bytes copied to backup replicas.', ('instance', 'target'))
+REPLICATION_PENDING = REGISTRY.gauge(
+    'msm_replication_pending', 'Backups waiting to be replicated.', ('instance',))
+REPLICATION_LAG = REGISTRY.gauge(
+    'msm_replication_lag_seconds', 'Age of the oldest backup not replicated yet (0 when caught up).', ('instance',))
+SERVER_UP = REGISTRY.gauge(
+    'msm_server_up', 'Whether the watchdog sees the server JVM running.', ('instance',))
+SERVER_CRASHES = REGISTRY.counter(
+    'msm_server_crashes_total', 'Server exits without a clean shutdown, seen by the watchdog.', ('instance',))
+SERVER_RESTARTS = REGISTRY.counter(
+    'msm_server_restarts_total', 'Automatic restarts by the watchdog, by result.', ('instance', 'result'))
+SCHEDULER_LAG = REGISTRY.histogram(
+    'msm_scheduler_lag_seconds', 'Delay between planned and actual fire time of scheduled jobs.', ('job',),
+    buckets=(0.1, 0.25, 0.5, 1.0, 1.5, 2.0, 5.0, 10.0, 30.0, 60.0, 300.0))
+PHASE_DURATION = REGISTRY.histogram(
+    'msm_phase_duration_seconds', 'Wall time of the phases of backups and restores.', ('operation', 'phase'))
+MESSAGES_TOTAL = REGISTRY.counter(
+    'msm_messages_total', 'Messages/commands delivered to screen sessions, by result.', ('instance', 'result'))
+MESSAGE_DURATION = REGISTRY.histogram(
+    'msm_message_duration_seconds', 'Wall time of message delivery to screen sessions.', ('instance',))
+
+
+def directory_size(path: str) -> int:
+    """Return the total size in bytes of all files below a directory."""
+    total = 0
+    stack = [path]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        total += entry.stat(follow_symlinks=False).st_size
+        except OSError:
+            continue
+    return total
+
+
+def _metrics_handler(registry: 'MetricsRegistry'):
+    """Build the request handler class; http.server is only imported when the endpoint is enabled."""
+    from http.server import BaseHTTPRequestHandler
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?', 1)[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = registry.render().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            # Keep scrapes out of the console
+            pass
+
+    return MetricsHandler
+
+
+class MetricsExporter:
+    def __init__(self, registry: MetricsRegistry = REGISTRY, logger=None):
+        self.registry = registry
+        self.logger = logger
+        self.http_server = None
+        self.textfile_thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+
+    def start_http_server(self, port: int, address: str = '127.0.0.1'):
+        """Serve the registry on http://<address>:<port>/metrics from a daemon thread."""
+        from http.server import ThreadingHTTPServer
+
+        self.http_server = ThreadingHTTPServer((address, port), _metrics_handler(self.registry))
+        self.http_server.daemon_threads = True
+        thread = threading.Thread(target=self.http_server.serve_forever, daemon=True)
+        thread.start()
+        if self.logger:
+            self.logger.log(f"Metrics endpoint listening on http://{address}:{port}/metrics")
+
+    def write_textfile(self, path: str):
+        """Atomically write the registry to a node_exporter textfile collector file."""
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as metrics_file:
+            metrics_file.write(self.registry.render())
+        os.replace(tmp_path, path)
+
+    def start_textfile_writer(self, path: str, interval_seconds: int = 15):
+        """Rewrite the textfile every interval_seconds from a daemon thread."""
+
+        def run():
+            while not self._stop_event.is_set():
+                try:
+                    self.write_textfile(path)
+                except OSError as e:
+                    if self.logger:
+                        self.logger.log(f"Failed to write metrics textfile {path}: {e}")
+                self._stop_event.wait(interval_seconds)
+
+        self.textfile_thread = threading.Thread(target=run, daemon=True)
+        self.textfile_thread.start()
+        if self.logger:
+            self.logger.log(f"Writing metrics textfile to {path} every {interval_seconds} seconds")
+
+    def stop(self):
+        """Stop the HTTP server and the textfile writer."""
+        self._stop_event.set()
+        if self.http_server:
+            self.http_server.shutdown()
+            self.http_server.server_close()
+            self.http_server = None
+        if self.textfile_thread:
+            self.textfile_thread.join()
+            self.textfile_thread = None
@@ -0,0 +1,303 @@
+# utils/nbt.py
+import gzip
+import struct
+import zlib
+from typing import Any, Optional, Tuple
+
+TAG_END = 0
+TAG_BYTE = 1
+TAG_SHORT = 2
+TAG_INT = 3
+TAG_LONG = 4
+TAG_FLOAT = 5
+TAG_DOUBLE = 6
+TAG_BYTE_ARRAY = 7
+TAG_STRING = 8
+TAG_LIST = 9
+TAG_COMPOUND = 10
+TAG_INT_ARRAY = 11
+TAG_LONG_ARRAY = 12
+
+
+class NbtError(Exception):
+    """Raised when NBT data is malformed or a value cannot be encoded."""
+
+
+# Typed wrappers keep the tag width of numbers so data survives a decode/encode round trip.
+# Plain Python values are encoded as int -> Int, float -> Double, bool -> Byte, str -> String.
+class Byte(int):
+    tag_type = TAG_BYTE
+
+
+class Short(int):
+    tag_type = TAG_SHORT
+
+
+class Int(int):
+    tag_type = TAG_INT
+
+
+class Long(int):
+    tag_type = TAG_LONG
+
+
+class Float(float):
+    tag_type = TAG_FLOAT
+
+
+class Double(float):
+    tag_type = TAG_DOUBLE
+
+
+class ByteArray(bytes):
+    tag_type = TAG_BYTE_ARRAY
+
+
+class IntArray(list):
+    tag_type = TAG_INT_ARRAY
+
+
+class LongArray(list):
+    tag_type = TAG_LONG_ARRAY
+
+
+class Compound(dict):
+    tag_type = TAG_COMPOUND
+
+
+class List(list):
+    """NBT list; item_type is the tag type of its elements (TAG_END for an empty untyped list)."""
+    tag_type = TAG_LIST
+
+    def __init__(self, items=(), item_type: int = None):
+        super().__init__(items)
+        if item_type is None:
+            item_type = _tag_type_of(self[0]) if self else TAG_END
+        self.item_type = item_type
+
+
+_SCALARS = {
+    TAG_BYTE: (struct.Struct('>b'), Byte),
+    TAG_SHORT: (struct.Struct('>h'), Short),
+    TAG_INT: (struct.Struct('>i'), Int),
+    TAG_LONG: (struct.Struct('>q'), Long),
+    TAG_FLOAT: (struct.Struct('>f'), Float),
+    TAG_DOUBLE: (struct.Struct('>d'), Double),
+}
+_LENGTH = struct.Struct('>i')
+_STRING_LENGTH = struct.Struct('>H')
+
+
+def _tag_type_of(value: Any) -> int:
+    tag_type = getattr(value, 'tag_type', None)
+    if tag_type is not None:
+        return tag_type
+    if isinstance(value, bool):
+        return TAG_BYTE
+    if isinstance(value, int):
+        return TAG_INT
+    if isinstance(value, float):
+        return TAG_DOUBLE
+    if isinstance(value, str):
+        return TAG_STRING
+    if isinstance(value, (bytes, bytearray)):
+        return TAG_BYTE_ARRAY
+    if isinstance(value, dict):
+        return TAG_COMPOUND
+    if isinstance(value, (list, tuple)):
+        return TAG_LIST
+    raise NbtError(f"Cannot encode {type(value).__name__} as NBT")
+
+
+class _Reader:
+    def __init__(self, data: bytes):
+        self.data = memoryview(data)
+        self.offset = 0
+
+    def take(self, size: int) -> memoryview:
+        end = self.offset + size
+        if end > len(self.data):
+            raise NbtError("Unexpected end of NBT data")
+        chunk = self.data[self.offset:end]
+        self.offset = end
+        return chunk
+
+    def unpack(self, packer: struct.Struct):
+        return packer.unpack(self.take(packer.size))[0]
+
+    def string(self) -> str:
+        return bytes(self.take(self.unpack(_STRING_LENGTH))).decode('utf-8', errors='surrogateescape')
+
+    def payload(self, tag_type: int):
+        scalar = _SCALARS.get(tag_type)
+        if scalar is not None:
+            packer, wrapper = scalar
+            return wrapper(self.unpack(packer))
+        if tag_type == TAG_STRING:
+            return self.string()
+        if tag_type == TAG_COMPOUND:
+            compound = Compound()
+            while True:
+                child_type = self.unpack(_SCALARS[TAG_BYTE][0])
+                if child_type == TAG_END:
+                    return compound
+                name = self.string()
+                compound[name] = self.payload(child_type)
+        if tag_type == TAG_LIST:
+            item_type = self.unpack(_SCALARS[TAG_BYTE][0])
+            length = self.unpack(_LENGTH)
+            return List([self.payload(item_type) for _ in range(max(length, 0))], item_type)
+        if tag_type == TAG_BYTE_ARRAY:
+            return ByteArray(self.take(self.unpack(_LENGTH)))
+        if tag_type == TAG_INT_ARRAY:
+            length = self.unpack(_LENGTH)
+            return IntArray(struct.unpack(f'>{length}i', self.take(4 * length)))
+        if tag_type == TAG_LONG_ARRAY:
+            length = self.unpack(_LENGTH)
+            return LongArray(struct.unpack(f'>{length}q', self.take(8 * length)))
+        raise NbtError(f"Unknown tag type {tag_type}")
+
+    def skip(self, tag_type: int):
+        """Advance past a payload without building Python objects for it."""
+        scalar = _SCALARS.get(tag_type)
+        if scalar is not None:
+            self.take(scalar[0].size)
+        elif tag_type == TAG_STRING:
+            self.take(self.unpack(_STRING_LENGTH))
+        elif tag_type == TAG_COMPOUND:
+            while True:
+                child_type = self.unpack(_SCALARS[TAG_BYTE][0])
+                if child_type == TAG_END:
+                    return
+                self.take(self.unpack(_STRING_LENGTH))
+                self.skip(child_type)
+        elif tag_type == TAG_LIST:
+            item_type = self.unpack(_SCALARS[TAG_BYTE][0])
+            length = max(self.unpack(_LENGTH), 0)
+            if item_type in _SCALARS:
+                self.take(_SCALARS[item_type][0].size * length)
+            else:
+                for _ in range(length):
+                    self.skip(item_type)
+        elif tag_type in _ARRAY_ITEM_SIZES:
+            self.take(_ARRAY_ITEM_SIZES[tag_type] * self.unpack(_LENGTH))
+        else:
+            raise NbtError(f"Unknown tag type {tag_type}")
+
+
+_ARRAY_ITEM_SIZES = {TAG_BYTE_ARRAY: 1, TAG_INT_ARRAY: 4, TAG_LONG_ARRAY: 8}
+
+
+def _encode_string(value: str, out: list):
+    encoded = value.encode('utf-8', errors='surrogateescape')
+    out.append(_STRING_LENGTH.pack(len(encoded)))
+    out.append(encoded)
+
+
+def _encode_payload(value: Any, tag_type: int, out: list):
+    scalar = _SCALARS.get(tag_type)
+    if scalar is not None:
+        out.append(scalar[0].pack(value))
+    elif tag_type == TAG_STRING:
+        _encode_string(value, out)
+    elif tag_type == TAG_COMPOUND:
+        for name, child in value.items():
+            child_type = _tag_type_of(child)
+            out.append(bytes((child_type,)))
+            _encode_string(name, out)
+            _encode_payload(child, child_type, out)
+        out.append(b'\x00')
+    elif tag_type == TAG_LIST:
+        item_type = getattr(value, 'item_type', None)
+        if item_type is None:
+            item_type = _tag_type_of(value[0]) if value else TAG_END
+        out.append(bytes((item_type,)))
+        out.append(_LENGTH.pack(len(value)))
+        for item in value:
+            _encode_payload(item, item_type, out)
+    elif tag_type == TAG_BYTE_ARRAY:
+        out.append(_LENGTH.pack(len(value)))
+        out.append(bytes(value))
+    elif tag_type == TAG_INT_ARRAY:
+        out.append(_LENGTH.pack(len(value)))
+        out.append(struct.pack(f'>{len(value)}i', *value))
+    elif tag_type == TAG_LONG_ARRAY:
+        out.append(_LENGTH.pack(len(value)))
+        out.append(struct.pack(f'>{len(value)}q', *value))
+    else:
+        raise NbtError(f"Unknown tag type {tag_type}")
+
+
+def decode(data: bytes) -> Tuple[str, Any]:
+    """
+    Decode uncompressed NBT data.
+
+    :return: (root name, root value); compounds are returned as Compound dicts
+    """
+    reader = _Reader(data)
+    tag_type = reader.unpack(_SCALARS[TAG_BYTE][0])
+    if tag_type == TAG_END:
+        return '', None
+    name = reader.string()
+    return name, reader.payload(tag_type)
+
+
+def find_value(data: bytes, path: Tuple[str, ...]) -> Optional[Any]:
+    """
+    Read a single value from uncompressed NBT data, e.g. find_value(data, ('Level', 'InhabitedTime')).
+    Siblings are skipped without being decoded, which is much faster than decode() for
+    large compounds such as chunks.
+
+    :return: The value, or None if the path does not exist
+    """
+    reader = _Reader(data)
+    tag_type = reader.unpack(_SCALARS[TAG_BYTE][0])
+    if tag_type != TAG_COMPOUND:
+        return None
+    reader.skip(TAG_STRING)
+    for depth, wanted in enumerate(path):
+        while True:
+            child_type = reader.unpack(_SCALARS[TAG_BYTE][0])
+            if child_type == TAG_END:
+                return None
+            name = reader.string()
+            if name != wanted:
+                reader.skip(child_type)
+                continue
+            if depth == len(path) - 1:
+                return reader.payload(child_type)
+            if child_type != TAG_COMPOUND:
+                return None
+            break
+    return None
+
+
+def encode(value: Any, name: str = '') -> bytes:
+    """Encode a value (normally a dict) as an uncompressed named root tag."""
+    tag_type = _tag_type_of(value)
+    out = [bytes((tag_type,))]
+    _encode_string(name, out)
+    _encode_payload(value, tag_type, out)
+    return b''.join(out)
+
+
+def decompress(data: bytes) -> bytes:
+    """Undo gzip or zlib compression if present (level.dat and playerdata use gzip)."""
+    if data[:2] == b'\x1f\x8b':
+        return gzip.decompress(data)
+    if data[:1] == b'\x78':
+        return zlib.decompress(data)
+    return data
+
+
+def read_nbt_file(path: str) -> Tuple[str, Any]:
+    """Read a (possibly compressed) NBT file such as level.dat or playerdata/<uuid>.dat."""
+    with open(path, 'rb') as nbt_file:
+        return decode(decompress(nbt_file.read()))
+
+
+def write_nbt_file(path: str, value: Any, name: str = '', compressed: bool = True):
+    """Write an NBT file, gzip-compressed like the server does by default."""
+    data = encode(value, name)
+    with open(path, 'wb') as nbt_file:
+        nbt_file.write(gzip.compress(data) if compressed else data)
@@ -0,0 +1,190 @@
+# utils/prewarm.py
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from utils import anvil
+from utils.jvm_profile import read_meminfo
+
+# Size of the reads that pull a region file into the page cache
+READ_SIZE = 1024 * 1024
+# Never warm more than this share of MemAvailable, whatever the budget, so the JVM's own
+# pages and other hot data are not pushed out
+MAX_AVAILABLE_FRACTION = 0.5
+RANKINGS = ('heat', 'mtime')
+
+
+def region_stats(world_path: str) -> Dict[str, Tuple[int, int]]:
+    """relative path -> (size, mtime in nanoseconds) of the region files of every dimension."""
+    stats = {}
+    for _, path, _, _ in anvil.find_region_files(world_path):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        stats[os.path.relpath(path, world_path)] = (stat.st_size, stat.st_mtime_ns)
+    return stats
+
+
+def load_heat(heat_path: str) -> dict:
+    """
+    Load a persisted heat map: {'updated': unix time, 'regions': {relative path: [score, mtime_ns]}}.
+    A missing or unreadable file gives an empty map.
+    """
+    try:
+        with open(heat_path) as heat_file:
+            heat = json.load(heat_file)
+    except (OSError, ValueError):
+        heat = None
+    if not isinstance(heat, dict) or not isinstance(heat.get('regions'), dict):
+        return {'updated': None, 'regions': {}}
+    return heat
+
+
+def update_heat(heat_path: str, files: Dict[str, Tuple[int, int]], half_life_hours: float = 24.0) -> dict:
+    """
+    Add a point to every region file whose mtime changed since the last update (the server
+    saved chunks of it, so players were there) and decay all scores by the time elapsed.
+    Region files that no longer exist are dropped.
+
+    :param files: relative path -> (size, mtime_ns), e.g. region_stats() or a world index
+    """
+    heat = load_heat(heat_path)
+    now = time.time()
+    decay = 1.0
+    if heat['updated'] is not None and half_life_hours > 0:
+        decay = 0.5 ** (max(0.0, now - heat['updated']) / (half_life_hours * 3600))
+    old_regions = heat['regions']
+    regions = {}
+    for rel, (_, mtime_ns) in files.items():
+        if anvil.parse_region_name(os.path.basename(rel)) is None:
+            continue
+        score, old_mtime = old_regions.get(rel, (0.0, None))
+        regions[rel] = [score * decay + (1.0 if mtime_ns != old_mtime else 0.0), mtime_ns]
+    heat = {'updated': now, 'regions': regions}
+
+    tmp_path = f"{heat_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as heat_file:
+        json.dump(heat, heat_file, separators=(',', ':'))
+    os.replace(tmp_path, heat_path)
+    return heat
+
+
+def rank_regions(files: Dict[str, Tuple[int, int]], ranking: str,
+                 heat: Optional[dict] = None) -> List[str]:
+    """Relative paths, most likely to be needed first: by heat score, or by mtime alone."""
+    if ranking not in RANKINGS:
+        raise ValueError(f"Unknown prewarm ranking '{ranking}' (use one of {', '.join(RANKINGS)})")
+    scores = heat['regions'] if heat and ranking == 'heat' else {}
+
+    def key(rel):
+        return scores.get(rel, (0.0,))[0], files[rel][1]
+
+    return sorted(files, key=key, reverse=True)
+
+
+def select_within_budget(ranked: List[str], files: Dict[str, Tuple[int, int]],
+                         budget_bytes: int) -> List[str]:
+    """Take files in rank order, skipping those that no longer fit in the budget."""
+    selected = []
+    remaining = budget_bytes
+    for rel in ranked:
+        size = files[rel][0]
+        if 0 < size <= remaining:
+            selected.append(rel)
+            remaining -= size
+    return selected
+
+
+def effective_budget(budget_bytes: int) -> int:
+    """The configured budget, capped at MAX_AVAILABLE_FRACTION of MemAvailable."""
+    try:
+        available = read_meminfo().get('MemAvailable')
+    except OSError:
+        available = None
+    if available is None:
+        return budget_bytes
+    return min(budget_bytes, int(available * MAX_AVAILABLE_FRACTION))
+
+
+def warm_file(path: str) -> int:
+    """
+    Pull a file into the page cache: ask the kernel to read it ahead in full, then read it
+    through a reused buffer so every page is resident when this returns.
+
+    :return: Bytes read
+    """
+    buffer = bytearray(READ_SIZE)
+    total = 0
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        if hasattr(os, 'posix_fadvise'):
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+        with open(fd, 'rb', buffering=0, closefd=False) as region_file:
+            while True:
+                count = region_file.readinto(buffer)
+                if not count:
+                    break
+                total += count
+    finally:
+        os.close(fd)
+    return total
+
+
+class PrewarmResult:
+    """Outcome of one prewarm run."""
+
+    def __init__(self, budget_bytes: int):
+        self.budget_bytes = budget_bytes
+        self.candidates = 0
+        self.files = 0
+        self.bytes_warmed = 0
+        self.errors = 0
+        self.seconds = 0.0
+
+    def summary(self) -> str:
+        mib = 1024 * 1024
+        return (f"{self.files} of {self.candidates} region files, {self.bytes_warmed / mib:.1f} MiB "
+                f"(budget {self.budget_bytes / mib:.0f} MiB) in {self.seconds:.2f}s"
+                + (f", {self.errors} unreadable" if self.errors else ""))
+
+
+def prewarm_world(world_path: str, budget_bytes: int, ranking: str = 'heat', heat_path: Optional[str] = None,
+                  workers: int = 4, half_life_hours: float = 24.0) -> PrewarmResult:
+    """
+    Read the region files of a world most likely to be loaded first into the page cache,
+    most recently modified or most visited (heat map) first, up to budget_bytes.
+
+    :param heat_path: Heat map updated and used for ranking; None ranks by mtime
+    :param workers: Files read in parallel, so several reads are queued on the device
+    """
+    start = time.perf_counter()
+    files = region_stats(world_path)
+    heat = None
+    if heat_path:
+        try:
+            heat = update_heat(heat_path, files, half_life_hours)
+        except OSError:
+            heat = load_heat(heat_path)
+    result = PrewarmResult(effective_budget(budget_bytes))
+    result.candidates = len(files)
+    selected = select_within_budget(rank_regions(files, ranking, heat), files, result.budget_bytes)
+
+    def warm(rel):
+        try:
+            return warm_file(os.path.join(world_path, rel))
+        except OSError:
+            return None
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        for warmed in pool.map(warm, selected):
+            if warmed is None:
+                result.errors += 1
+            else:
+                result.files += 1
+                result.bytes_warmed += warmed
+    result.seconds = time.perf_counter() - start
+    return result
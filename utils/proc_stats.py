@@ -0,0 +1,278 @@
+# utils/proc_stats.py
+import os
+import threading
+import time
+from collections import namedtuple
+from typing import Callable, List, Optional
+
+CLOCK_TICKS = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+SPARK_CHARS = '▁▂▃▄▅▆▇█'
+
+ProcessSample = namedtuple('ProcessSample', [
+    'timestamp',     # time.time() of the sample
+    'pid',
+    'cpu_seconds',   # user + system CPU time
+    'cpu_percent',   # CPU usage since the previous sample (100 = one core)
+    'rss_bytes',
+    'threads',
+    'open_fds',
+    'read_bytes',    # cumulative storage reads, from /proc/<pid>/io
+    'write_bytes',
+    'read_rate',     # bytes/s since the previous sample
+    'write_rate',
+])
+
+
+class RingBuffer:
+    """Fixed-size buffer keeping the most recent items; memory use never grows."""
+
+    def __init__(self, capacity: int):
+        if capacity <= 0:
+            raise ValueError("RingBuffer capacity must be positive")
+        self.capacity = capacity
+        self._items: List = [None] * capacity
+        self._next = 0
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def append(self, item):
+        with self._lock:
+            self._items[self._next] = item
+            self._next = (self._next + 1) % self.capacity
+            self._size = min(self._size + 1, self.capacity)
+
+    def items(self) -> list:
+        """Return the buffered items, oldest first."""
+        with self._lock:
+            if self._size < self.capacity:
+                return self._items[:self._size]
+            return self._items[self._next:] + self._items[:self._next]
+
+    def latest(self):
+        with self._lock:
+            if not self._size:
+                return None
+            return self._items[(self._next - 1) % self.capacity]
+
+    def __len__(self):
+        return self._size
+
+
+def _read_stat(pid: int) -> Optional[List[str]]:
+    """Return the fields of /proc/<pid>/stat after the command name, or None if the process is gone."""
+    try:
+        with open(f'/proc/{pid}/stat', 'r') as stat_file:
+            data = stat_file.read()
+    except OSError:
+        return None
+    # The command name may contain spaces and parentheses; it ends at the last ')'
+    return data[data.rfind(')') + 2:].split()
+
+
+def process_start_time(pid: int) -> Optional[int]:
+    """Start time of a live process in clock ticks since boot; None if it is gone or a zombie."""
+    fields = _read_stat(pid)
+    # Fields 3 (state) and 22 (starttime) in proc(5) minus 3
+    if fields is None or fields[0] == 'Z':
+        return None
+    return int(fields[19])
+
+
+def is_server_process(pid: int, server_root: str, jar_name: Optional[str] = None) -> bool:
+    """Check whether pid is a java process running from server_root (or running jar_name)."""
+    try:
+        with open(f'/proc/{pid}/cmdline', 'rb') as cmdline_file:
+            argv = cmdline_file.read().split(b'\0')
+    except OSError:
+        return False
+    if not argv or not os.path.basename(argv[0]).startswith(b'java'):
+        return False
+    try:
+        return os.path.realpath(os.readlink(f'/proc/{pid}/cwd')) == os.path.realpath(server_root)
+    except OSError:
+        # The cwd link is unreadable for processes of other users; fall back to the jar name
+        return bool(jar_name) and jar_name.encode() in argv
+
+
+def find_server_pid(server_root: str, jar_name: Optional[str] = None) -> Optional[int]:
+    """Find the pid of the server JVM by scanning /proc."""
+    try:
+        entries = os.listdir('/proc')
+    except OSError:
+        return None
+    for entry in entries:
+        if entry.isdigit() and is_server_process(int(entry), server_root, jar_name):
+            return int(entry)
+    return None
+
+
+def read_process_sample(pid: int, previous: Optional[ProcessSample] = None) -> Optional[ProcessSample]:
+    """
+    Read CPU time, RSS, thread count, open FDs and I/O bytes of a process from /proc.
+
+    :param pid: Process to sample
+    :param previous: Previous sample of the same process, used to compute rates
+    :return: The sample, or None if the process no longer exists
+    """
+    fields = _read_stat(pid)
+    if fields is None:
+        return None
+    now = time.time()
+    # Field numbers in proc(5) minus 3: utime=14, stime=15, num_threads=20, rss=24
+    cpu_seconds = (int(fields[11]) + int(fields[12])) / CLOCK_TICKS
+    threads = int(fields[17])
+    rss_bytes = int(fields[21]) * PAGE_SIZE
+
+    try:
+        open_fds = len(os.listdir(f'/proc/{pid}/fd'))
+    except OSError:
+        open_fds = -1
+
+    read_bytes = write_bytes = 0
+    try:
+        with open(f'/proc/{pid}/io', 'r') as io_file:
+            for line in io_file:
+                key, _, value = line.partition(':')
+                if key == 'read_bytes':
+                    read_bytes = int(value)
+                elif key == 'write_bytes':
+                    write_bytes = int(value)
+    except OSError:
+        pass
+
+    cpu_percent = read_rate = write_rate = 0.0
+    if previous is not None and previous.pid == pid:
+        elapsed = now - previous.timestamp
+        if elapsed > 0:
+            cpu_percent = 100.0 * (cpu_seconds - previous.cpu_seconds) / elapsed
+            read_rate = max(read_bytes - previous.read_bytes, 0) / elapsed
+            write_rate = max(write_bytes - previous.write_bytes, 0) / elapsed
+
+    return ProcessSample(now, pid, cpu_seconds, cpu_percent, rss_bytes, threads, open_fds,
+                         read_bytes, write_bytes, read_rate, write_rate)
+
+
+def sparkline(values: List[float], width: int = 40) -> str:
+    """Render values as a unicode sparkline of at most width characters."""
+    if not values:
+        return ''
+    if len(values) > width:
+        # Average consecutive values into width buckets
+        step = len(values) / width
+        values = [sum(values[int(i * step):int((i + 1) * step)]) / max(int((i + 1) * step) - int(i * step), 1)
+                  for i in range(width)]
+    low, high = min(values), max(values)
+    span = high - low
+    if span == 0:
+        return SPARK_CHARS[0] * len(values)
+    return ''.join(SPARK_CHARS[int((value - low) / span * (len(SPARK_CHARS) - 1))] for value in values)
+
+
+def format_bytes(value: float) -> str:
+    """Format a byte count with a binary unit suffix."""
+    for unit in ('B', 'KiB', 'MiB', 'GiB'):
+        if abs(value) < 1024:
+            return f"{value:.1f} {unit}"
+        value /= 1024
+    return f"{value:.1f} TiB"
+
+
+class ProcessSampler:
+    """Background thread sampling the server JVM into a ring buffer."""
+
+    def __init__(self, find_pid: Callable[[], Optional[int]], interval_seconds: float = 5.0,
+                 history_size: int = 720, logger=None):
+        self.find_pid = find_pid
+        self.interval_seconds = interval_seconds
+        self.history = RingBuffer(history_size)
+        self.logger = logger
+        self.pid: Optional[int] = None
+        self._previous: Optional[ProcessSample] = None
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def sample_once(self) -> Optional[ProcessSample]:
+        """Take one sample, locating the JVM first if it is not known or has exited."""
+        if self.pid is None:
+            self.pid = self.find_pid()
+            if self.pid is None:
+                return None
+            if self.logger:
+                self.logger.log(f"Sampling server JVM with pid {self.pid}")
+        sample = read_process_sample(self.pid, self._previous)
+        if sample is None:
+            # The JVM exited; search for a new one on the next tick
+            self.pid = None
+            self._previous = None
+            return None
+        self._previous = sample
+        self.history.append(sample)
+        return sample
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+
+        def run():
+            while not self._stop_event.is_set():
+                try:
+                    self.sample_once()
+                except Exception as e:
+                    if self.logger:
+                        self.logger.log(f"Error sampling server process: {e}")
+                self._stop_event.wait(self.interval_seconds)
+
+        self._thread = threading.Thread(target=run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def window(self, seconds: float) -> List[ProcessSample]:
+        """Return the samples of the last `seconds` seconds, oldest first."""
+        cutoff = time.time() - seconds
+        return [sample for sample in self.history.items() if sample.timestamp >= cutoff]
+
+    def report(self, windows=(60, 300, 900)) -> str:
+        """Build the text shown by the `stats` command."""
+        current = self.history.latest()
+        if current is None:
+            return "No samples of the server JVM yet (is the server running?)"
+
+        lines = [
+            f"Server JVM pid {current.pid} at {time.strftime('%H:%M:%S', time.localtime(current.timestamp))}",
+            f"  CPU        : {current.cpu_percent:6.1f} %  ({current.cpu_seconds:.0f} s total)",
+            f"  RSS        : {format_bytes(current.rss_bytes)}",
+            f"  Threads    : {current.threads}",
+            f"  Open FDs   : {current.open_fds}",
+            f"  Disk read  : {format_bytes(current.read_rate)}/s  ({format_bytes(current.read_bytes)} total)",
+            f"  Disk write : {format_bytes(current.write_rate)}/s  ({format_bytes(current.write_bytes)} total)",
+        ]
+
+        metrics = [
+            ('CPU %', lambda s: s.cpu_percent, lambda v: f"{v:.1f}"),
+            ('RSS', lambda s: s.rss_bytes, format_bytes),
+            ('Threads', lambda s: s.threads, lambda v: f"{v:.0f}"),
+            ('Open FDs', lambda s: s.open_fds, lambda v: f"{v:.0f}"),
+            ('Read/s', lambda s: s.read_rate, format_bytes),
+            ('Write/s', lambda s: s.write_rate, format_bytes),
+        ]
+        for seconds in windows:
+            samples = self.window(seconds)
+            if not samples:
+                continue
+            lines.append(f"Last {seconds // 60} min ({len(samples)} samples)   min / avg / max")
+            for name, getter, fmt in metrics:
+                values = [getter(s) for s in samples]
+                lines.append(f"  {name:<10} {fmt(min(values))} / {fmt(sum(values) / len(values))} / {fmt(max(values))}")
+
+        history = self.history.items()
+        lines.append(f"CPU  {sparkline([s.cpu_percent for s in history])}")
+        lines.append(f"RSS  {sparkline([s.rss_bytes for s in history])}")
+        lines.append(f"I/O  {sparkline([s.read_rate + s.write_rate for s in history])}")
+        return '\n'.join(lines)
@@ -0,0 +1,179 @@
+# utils/process_registry.py
+import json
+import os
+import time
+from typing import List, Optional
+
+from utils.proc_stats import process_start_time
+
+# Registry key of the Playit tunnel; servers use server_key()
+TUNNEL_KEY = 'tunnel'
+# Options after which screen expects the session name
+SESSION_NAME_OPTIONS = ('-S', '-dmS', '-DmS')
+
+
+def server_key(instance_name: str) -> str:
+    return f'mc-{instance_name}'
+
+
+class ProcessRecord:
+    """
+    A process launched by the manager, as stored in its pidfile. The start time (clock
+    ticks since boot, from /proc/<pid>/stat) tells the process apart from a later one
+    that got the same pid.
+    """
+
+    def __init__(self, key: str, pid: int, start_time: int, session: Optional[str] = None,
+                 child_pid: Optional[int] = None, child_start_time: Optional[int] = None,
+                 launched_at: Optional[float] = None):
+        """
+        :param session: Screen session name, if the process is a screen session
+        :param child_pid: The process the session runs, e.g. the server's JVM
+        """
+        self.key = key
+        self.pid = pid
+        self.start_time = start_time
+        self.session = session
+        self.child_pid = child_pid
+        self.child_start_time = child_start_time
+        self.launched_at = launched_at if launched_at is not None else time.time()
+
+    @property
+    def session_id(self) -> Optional[str]:
+        """"<pid>.<name>", which names exactly this session in screen -S/-r."""
+        return f"{self.pid}.{self.session}" if self.session else None
+
+    def is_alive(self) -> bool:
+        return process_start_time(self.pid) == self.start_time
+
+    def live_child_pid(self) -> Optional[int]:
+        if self.child_pid is not None and process_start_time(self.child_pid) == self.child_start_time:
+            return self.child_pid
+        return None
+
+    def to_dict(self) -> dict:
+        return {'pid': self.pid, 'start_time': self.start_time, 'session': self.session,
+                'child_pid': self.child_pid, 'child_start_time': self.child_start_time,
+                'launched_at': self.launched_at}
+
+
+def child_pids(pid: int) -> List[int]:
+    """Direct children of a process, from /proc/<pid>/task/<pid>/children."""
+    try:
+        with open(f'/proc/{pid}/task/{pid}/children') as children_file:
+            return [int(child) for child in children_file.read().split()]
+    except (OSError, ValueError):
+        return []
+
+
+def _cmdline(pid: int) -> List[str]:
+    try:
+        with open(f'/proc/{pid}/cmdline', 'rb') as cmdline_file:
+            return [arg.decode(errors='replace') for arg in cmdline_file.read().split(b'\0') if arg]
+    except OSError:
+        return []
+
+
+def find_process(program: str) -> Optional[int]:
+    """
+    Find a process running `program` by scanning /proc, without forking. Scripts run
+    through an interpreter (python3 /usr/bin/playit) match as well.
+    """
+    for entry in os.listdir('/proc'):
+        if entry.isdigit() and entry != str(os.getpid()):
+            argv = _cmdline(int(entry))
+            if any(os.path.basename(arg) == program for arg in argv[:2]):
+                return int(entry)
+    return None
+
+
+def find_screen_process(session_name: str) -> Optional[int]:
+    """Find the screen process of a session started with screen -dmS <name> by scanning /proc."""
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        argv = _cmdline(int(entry))
+        if not argv or os.path.basename(argv[0]).lower() != 'screen':
+            continue
+        for option, value in zip(argv[1:], argv[2:]):
+            if option in SESSION_NAME_OPTIONS and value == session_name:
+                return int(entry)
+    return None
+
+
+class ProcessRegistry:
+    """
+    Pidfiles of the server sessions and the tunnel, one JSON file per process in run_dir.
+
+    Lookups read the pidfile and /proc/<pid>/stat, so "is it running, which pid" costs
+    two small reads instead of forking `screen -ls`. A pidfile whose process has exited,
+    or whose pid now belongs to another process, is removed on lookup.
+    """
+
+    def __init__(self, run_dir: str):
+        self.run_dir = run_dir
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.run_dir, f'{key}.pid')
+
+    def register(self, key: str, pid: int, session: Optional[str] = None) -> Optional[ProcessRecord]:
+        """Record a process that was just launched; None if it has already exited."""
+        start_time = process_start_time(pid)
+        if start_time is None:
+            return None
+        record = ProcessRecord(key, pid, start_time, session)
+        self.save(record)
+        return record
+
+    def save(self, record: ProcessRecord):
+        os.makedirs(self.run_dir, exist_ok=True)
+        path = self._path(record.key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as pid_file:
+            json.dump(record.to_dict(), pid_file)
+        os.replace(tmp_path, path)
+
+    def get(self, key: str) -> Optional[ProcessRecord]:
+        """The live process registered under key, or None."""
+        try:
+            with open(self._path(key)) as pid_file:
+                data = json.load(pid_file)
+            record = ProcessRecord(key, **data)
+        except (OSError, ValueError, TypeError):
+            return None
+        if record.is_alive():
+            return record
+        self.remove(key)
+        return None
+
+    def remove(self, key: str):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def find_session(self, key: str, session_name: str) -> Optional[ProcessRecord]:
+        """
+        The screen session registered under key. A session with that exact name that was
+        started before pidfiles were kept (or by hand) is found in /proc and registered.
+        """
+        record = self.get(key)
+        if record is not None:
+            return record
+        pid = find_screen_process(session_name)
+        if pid is None:
+            return None
+        try:
+            return self.register(key, pid, session_name)
+        except OSError:
+            start_time = process_start_time(pid)
+            return ProcessRecord(key, pid, start_time, session_name) if start_time is not None else None
+
+    def running(self) -> List[ProcessRecord]:
+        """All live registered processes."""
+        try:
+            names = os.listdir(self.run_dir)
+        except OSError:
+            return []
+        records = (self.get(name[:-4]) for name in sorted(names) if name.endswith('.pid'))
+        return [record for record in records if record is not None]
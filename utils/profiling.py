@@ -0,0 +1,198 @@
+# utils/profiling.py
+import cProfile
+import datetime
+import io
+import os
+import pstats
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from typing import Any, Callable, List, Optional, Tuple
+
+from utils.spans import active_session
+
+# Frames recorded per allocation; more frames group allocation sites by their callers
+TRACEMALLOC_FRAMES = 10
+# Rows in each table of a report
+REPORT_ROWS = 40
+# Before 3.12 a profiler only sees the thread that enabled it; later versions see every thread
+# (and refuse a second profiler while one is enabled)
+PER_THREAD_PROFILERS = sys.version_info < (3, 12)
+
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+
+def _start_tracing():
+    global _tracing_users
+    with _tracing_lock:
+        if _tracing_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+        _tracing_users += 1
+
+
+def _stop_tracing() -> Tuple[tracemalloc.Snapshot, int]:
+    """Snapshot of the traced allocations and the peak traced memory; tracing stops with the last user."""
+    global _tracing_users
+    with _tracing_lock:
+        snapshot = tracemalloc.take_snapshot()
+        peak = tracemalloc.get_traced_memory()[1]
+        _tracing_users -= 1
+        if _tracing_users == 0:
+            tracemalloc.stop()
+    return snapshot, peak
+
+
+def _load_stats(profiles) -> Optional[pstats.Stats]:
+    """Merge profiles (Profile objects or .prof paths); None if none recorded anything."""
+    stats = None
+    for profile in profiles:
+        try:
+            if stats is None:
+                stats = pstats.Stats(profile, stream=io.StringIO())
+            else:
+                stats.add(profile)
+        except (TypeError, OSError):
+            # A thread that never ran Python code, or a script that never wrote its profile
+            continue
+    return stats
+
+
+def _format_stats(stats: Optional[pstats.Stats], sort: str) -> str:
+    if stats is None:
+        return "  (no data)\n"
+    stream = io.StringIO()
+    stats.stream = stream
+    stats.sort_stats(sort).print_stats(REPORT_ROWS)
+    return stream.getvalue()
+
+
+def _format_allocations(snapshot: tracemalloc.Snapshot) -> str:
+    snapshot = snapshot.filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    ))
+    lines = []
+    for stat in snapshot.statistics('lineno')[:REPORT_ROWS]:
+        frame = stat.traceback[0]
+        lines.append(f"  {stat.size / 1024:10.1f} KiB {stat.count:8d} blocks  {frame.filename}:{frame.lineno}")
+    return '\n'.join(lines) + '\n' if lines else "  (no allocations)\n"
+
+
+class ProfileSession:
+    """
+    Runs a function under cProfile and tracemalloc and writes a report with the slowest
+    functions and the top allocation sites.
+
+    Work the function hands to a thread through utils.spans.in_session_thread() (the
+    throttled copy, the per-instance workers) is profiled too: before Python 3.12 each such
+    call gets a profiler of its own for as long as it runs, merged into the report. Scripts started through run_script()
+    while the session is active are run by scripts/profile_script.py, which profiles
+    them in their own process and leaves the results in the session's work directory.
+    """
+
+    def __init__(self, label: str):
+        self.label = label
+        self.profiles: List[cProfile.Profile] = []
+        self.children: List[Tuple[str, str]] = []
+        self.wall_seconds = 0.0
+        self.peak_bytes = 0
+        self.snapshot: Optional[tracemalloc.Snapshot] = None
+        self._work_dir: Optional[str] = None
+        self._running = False
+        self._lock = threading.Lock()
+
+    def child_prefix(self, script_name: str) -> str:
+        """Output path prefix for a profiled script; its files are added to the report."""
+        with self._lock:
+            if self._work_dir is None:
+                self._work_dir = tempfile.mkdtemp(prefix='msm-profile-')
+                if os.geteuid() == 0:
+                    # Scripts run as a non-privileged user
+                    os.chmod(self._work_dir, 0o777)
+            prefix = os.path.join(self._work_dir, f"{len(self.children)}_{script_name}")
+            self.children.append((script_name, prefix))
+        return prefix
+
+    def thread_target(self, func: Callable[..., Any]) -> Callable[..., Any]:
+        """func wrapped to be profiled in the thread that runs it, while the session runs."""
+        if not PER_THREAD_PROFILERS:
+            # The session's own profiler already sees every thread
+            return func
+
+        def profiled(*args, **kwargs):
+            if not self._running:
+                return func(*args, **kwargs)
+            profile = cProfile.Profile()
+            with self._lock:
+                self.profiles.append(profile)
+            profile.enable()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                profile.disable()
+
+        return profiled
+
+    def run(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        profile = cProfile.Profile()
+        self.profiles.insert(0, profile)
+        _start_tracing()
+        self._running = True
+        token = active_session.set(self)
+        start = time.perf_counter()
+        profile.enable()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profile.disable()
+            self.wall_seconds = time.perf_counter() - start
+            active_session.reset(token)
+            self._running = False
+            self.snapshot, self.peak_bytes = _stop_tracing()
+
+    def dump(self, prefix: str):
+        """Write the merged profile and allocation snapshot for the parent's report (see profile_script.py)."""
+        stats = _load_stats(self.profiles)
+        if stats is not None:
+            stats.dump_stats(f'{prefix}.prof')
+        if self.snapshot is not None:
+            self.snapshot.dump(f'{prefix}.tracemalloc')
+
+    def write_report(self, report_dir: str) -> str:
+        """Write the report to a timestamped file in report_dir and return its path."""
+        os.makedirs(report_dir, exist_ok=True)
+        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        name = re.sub(r'[^\w.-]+', '_', self.label).strip('_')[:40] or 'command'
+        path = os.path.join(report_dir, f"profile_{timestamp}_{name}.txt")
+
+        sections = [
+            f"Profile of '{self.label}' at {datetime.datetime.now().isoformat(timespec='seconds')}\n"
+            f"Wall time {self.wall_seconds:.3f}s, peak traced memory {self.peak_bytes / 1024 / 1024:.1f} MiB, "
+            f"{len(self.profiles)} profiled thread(s), {len(self.children)} profiled script(s)\n",
+        ]
+        stats = _load_stats(self.profiles)
+        sections.append("== Manager: cumulative time ==\n" + _format_stats(stats, 'cumulative'))
+        sections.append("== Manager: own time ==\n" + _format_stats(stats, 'tottime'))
+        if self.snapshot is not None:
+            sections.append("== Manager: top allocation sites ==\n" + _format_allocations(self.snapshot))
+        for script_name, prefix in self.children:
+            child_stats = _load_stats([f'{prefix}.prof'])
+            sections.append(f"== Script {script_name}: cumulative time ==\n" + _format_stats(child_stats, 'cumulative'))
+            sections.append(f"== Script {script_name}: own time ==\n" + _format_stats(child_stats, 'tottime'))
+            try:
+                child_snapshot = tracemalloc.Snapshot.load(f'{prefix}.tracemalloc')
+                sections.append(f"== Script {script_name}: top allocation sites ==\n"
+                                + _format_allocations(child_snapshot))
+            except (OSError, EOFError):
+                pass
+
+        with open(path, 'w') as report_file:
+            report_file.write('\n'.join(sections))
+        if self._work_dir is not None:
+            shutil.rmtree(self._work_dir, ignore_errors=True)
+        return path
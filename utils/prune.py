@@ -0,0 +1,200 @@
+# utils/prune.py
+import os
+import re
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from utils import anvil, nbt
+
+# Folders whose region files hold per-chunk data that belongs to the terrain chunk (1.17+)
+COMPANION_FOLDERS = ('entities', 'poi')
+# Where InhabitedTime lives: top level since 1.18, inside 'Level' before
+INHABITED_TIME_PATHS = (('InhabitedTime',), ('Level', 'InhabitedTime'))
+# "[dimension:]x1,z1,x2,z2" in block coordinates
+PROTECT_PATTERN = re.compile(r'^(?:(\w+):)?\s*(-?\d+)\s*,\s*(-?\d+)\s*,\s*(-?\d+)\s*,\s*(-?\d+)$')
+
+# Chunk-coordinate box: (min x, min z, max x, max z), inclusive
+Box = Tuple[int, int, int, int]
+
+
+def parse_protected_boxes(entries: List[str]) -> Dict[str, List[Box]]:
+    """
+    Parse PruneProtect entries such as 'the_nether:-200,-200,200,200' (block coordinates,
+    overworld if no dimension is given) to chunk-coordinate boxes per dimension.
+    """
+    boxes: Dict[str, List[Box]] = {dimension: [] for dimension in anvil.DIMENSION_FOLDERS}
+    for entry in entries:
+        match = PROTECT_PATTERN.match(entry.strip())
+        if not match:
+            raise ValueError(f"Invalid protected area '{entry}' (use [dimension:]x1,z1,x2,z2)")
+        dimension = (match.group(1) or 'overworld').lower()
+        if dimension not in anvil.DIMENSION_FOLDERS:
+            raise ValueError(f"Unknown dimension '{dimension}' (use one of {', '.join(anvil.DIMENSION_FOLDERS)})")
+        x1, z1, x2, z2 = (int(value) for value in match.group(2, 3, 4, 5))
+        boxes[dimension].append((min(x1, x2) >> 4, min(z1, z2) >> 4, max(x1, x2) >> 4, max(z1, z2) >> 4))
+    return boxes
+
+
+def spawn_box(world_path: str, radius: int) -> Optional[Box]:
+    """Chunk-coordinate box of `radius` blocks around the world spawn in level.dat."""
+    if radius <= 0:
+        return None
+    try:
+        with open(os.path.join(world_path, 'level.dat'), 'rb') as level_file:
+            data = nbt.decompress(level_file.read())
+        spawn_x = nbt.find_value(data, ('Data', 'SpawnX')) or 0
+        spawn_z = nbt.find_value(data, ('Data', 'SpawnZ')) or 0
+    except (OSError, nbt.NbtError, zlib.error, EOFError):
+        spawn_x = spawn_z = 0
+    return ((spawn_x - radius) >> 4, (spawn_z - radius) >> 4, (spawn_x + radius) >> 4, (spawn_z + radius) >> 4)
+
+
+def inhabited_time(data: bytes) -> int:
+    """InhabitedTime of a chunk in ticks, read without decoding the rest of the chunk."""
+    for path in INHABITED_TIME_PATHS:
+        value = nbt.find_value(data, path)
+        if value is not None:
+            return int(value)
+    # Chunks that never finished generating have none
+    return 0
+
+
+class RegionResult:
+    """Outcome of pruning one region file (and its companion entities/poi regions)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.chunks = 0
+        self.pruned = 0
+        self.errors = 0
+        self.bytes_before = 0
+        self.bytes_after = 0
+
+    @property
+    def reclaimed(self) -> int:
+        return self.bytes_before - self.bytes_after
+
+
+def _is_protected(chunk_x: int, chunk_z: int, boxes: List[Box]) -> bool:
+    return any(x1 <= chunk_x <= x2 and z1 <= chunk_z <= z2 for x1, z1, x2, z2 in boxes)
+
+
+def _rewrite(region: anvil.RegionFile, drop: set, apply: bool) -> Tuple[int, int]:
+    """
+    Remove chunks from a region file, deleting it when none remain.
+
+    :return: (bytes before, bytes after), counting external .mcc files
+    """
+    kept = {}
+    before = len(region.data)
+    after_external = 0
+    for index in region.chunk_indexes():
+        external = region.is_external(index)
+        if external:
+            external_path = region.external_path(index)
+            external_size = os.path.getsize(external_path) if os.path.exists(external_path) else 0
+            before += external_size
+        if index in drop:
+            if apply and external and external_size:
+                os.remove(external_path)
+            continue
+        if external:
+            after_external += external_size
+            kept[index] = (region.raw_compression(index), b'', region.timestamps[index])
+        else:
+            compression, payload = region.read_raw(index)
+            kept[index] = (compression, payload, region.timestamps[index])
+    after = (anvil.region_size(kept) + after_external) if kept else 0
+    if apply and drop:
+        if kept:
+            anvil.write_region(region.path, kept, verify=True)
+        else:
+            os.remove(region.path)
+    return before, after
+
+
+def prune_region(path: str, region_x: int, region_z: int, min_ticks: int, boxes: List[Box],
+                 apply: bool) -> RegionResult:
+    """
+    Drop the chunks of a region file whose InhabitedTime is below min_ticks and that are
+    outside every protected box, together with the same chunks in the entities and poi
+    regions. Unreadable chunks are kept. Runs in a worker process.
+
+    :param boxes: Protected chunk-coordinate boxes of the region's dimension
+    :param apply: Rewrite the files; otherwise only compute what would be reclaimed
+    """
+    result = RegionResult(path)
+    region = anvil.RegionFile(path)
+    drop = set()
+    for index in region.chunk_indexes():
+        result.chunks += 1
+        chunk_x, chunk_z = region_x * 32 + index % 32, region_z * 32 + index // 32
+        if _is_protected(chunk_x, chunk_z, boxes):
+            continue
+        try:
+            ticks = inhabited_time(region.read_chunk_data(index))
+        except (anvil.AnvilError, nbt.NbtError, OSError, zlib.error, EOFError):
+            result.errors += 1
+            continue
+        if ticks < min_ticks:
+            drop.add(index)
+    result.pruned = len(drop)
+    if not drop:
+        result.bytes_before = result.bytes_after = len(region.data)
+        return result
+
+    dimension_root = os.path.dirname(os.path.dirname(path))
+    regions = [region]
+    for folder in COMPANION_FOLDERS:
+        companion = os.path.join(dimension_root, folder, os.path.basename(path))
+        if os.path.exists(companion):
+            regions.append(anvil.RegionFile(companion))
+    for target in regions:
+        before, after = _rewrite(target, drop, apply)
+        result.bytes_before += before
+        result.bytes_after += after
+    return result
+
+
+def prune_world(world_path: str, min_ticks: int, boxes: Dict[str, List[Box]], apply: bool = False,
+                workers: Optional[int] = None) -> Dict[str, List[RegionResult]]:
+    """
+    Prune every region file of a world in parallel worker processes (chunk decompression
+    and NBT scanning are CPU bound). The server must not be running.
+
+    :param boxes: Protected chunk-coordinate boxes per dimension, see parse_protected_boxes()
+    :return: dimension -> results of its region files
+    """
+    regions = anvil.find_region_files(world_path, ('region',))
+    results: Dict[str, List[RegionResult]] = {dimension: [] for dimension in anvil.DIMENSION_FOLDERS}
+    if not regions:
+        return results
+    with ProcessPoolExecutor(max_workers=workers or None) as pool:
+        futures = [(dimension, pool.submit(prune_region, path, region_x, region_z, min_ticks,
+                                           boxes.get(dimension, []), apply))
+                   for dimension, path, region_x, region_z in regions]
+        for dimension, future in futures:
+            results[dimension].append(future.result())
+    return results
+
+
+def format_report(results: Dict[str, List[RegionResult]], apply: bool) -> str:
+    mib = 1024 * 1024
+    lines = []
+    total = 0
+    for dimension, region_results in results.items():
+        if not region_results:
+            continue
+        chunks = sum(result.chunks for result in region_results)
+        pruned = sum(result.pruned for result in region_results)
+        reclaimed = sum(result.reclaimed for result in region_results)
+        removed = sum(1 for result in region_results if result.pruned and result.pruned == result.chunks)
+        errors = sum(result.errors for result in region_results)
+        total += reclaimed
+        lines.append(f"  {dimension}: {pruned}/{chunks} chunks in {len(region_results)} region files, "
+                     f"{reclaimed / mib:.1f} MiB" + (f", {removed} region files emptied" if removed else "")
+                     + (f", {errors} unreadable chunks kept" if errors else ""))
+    verb = "Reclaimed" if apply else "Would reclaim"
+    lines.append(f"{verb} {total / mib:.1f} MiB" + ("" if apply else " (dry run; 'prune apply' to rewrite)"))
+    return '\n'.join(lines)
@@ -0,0 +1,113 @@
+# utils/rcon.py
+import socket
+import struct
+import threading
+from typing import Optional
+
+from utils.server_properties import read_server_properties
+
+SERVERDATA_RESPONSE_VALUE = 0
+SERVERDATA_EXECCOMMAND = 2
+SERVERDATA_AUTH = 3
+
+
+class RconError(Exception):
+    """Raised when the RCON connection or authentication fails."""
+
+
+class RconClient:
+    """
+    Minimal Source RCON client as implemented by the Minecraft server.
+    The connection is opened lazily and reused; calls are serialised by a lock.
+    """
+
+    def __init__(self, host: str, port: int, password: str, timeout: float = 5.0):
+        self.host = host
+        self.port = port
+        self.password = password
+        self.timeout = timeout
+        self._sock: Optional[socket.socket] = None
+        self._request_id = 0
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def _send_packet(self, packet_type: int, body: str) -> int:
+        self._request_id = (self._request_id + 1) % 0x7fffffff
+        payload = struct.pack('<ii', self._request_id, packet_type) + body.encode('utf-8') + b'\x00\x00'
+        self._sock.sendall(struct.pack('<i', len(payload)) + payload)
+        return self._request_id
+
+    def _recv_exact(self, size: int) -> bytes:
+        data = b''
+        while len(data) < size:
+            chunk = self._sock.recv(size - len(data))
+            if not chunk:
+                raise RconError("RCON connection closed by server")
+            data += chunk
+        return data
+
+    def _recv_packet(self):
+        (length,) = struct.unpack('<i', self._recv_exact(4))
+        payload = self._recv_exact(length)
+        request_id, packet_type = struct.unpack('<ii', payload[:8])
+        return request_id, packet_type, payload[8:-2].decode('utf-8', errors='replace')
+
+    def connect(self):
+        """Open the connection and authenticate."""
+        self.close()
+        try:
+            self._sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+            auth_id = self._send_packet(SERVERDATA_AUTH, self.password)
+            request_id, _, _ = self._recv_packet()
+        except OSError as e:
+            self.close()
+            raise RconError(f"Cannot connect to RCON at {self.host}:{self.port}: {e}") from e
+        if request_id == -1 or request_id != auth_id:
+            self.close()
+            raise RconError("RCON authentication failed")
+
+    def command(self, command: str) -> str:
+        """Run a console command (without leading '/') and return its output."""
+        with self._lock:
+            for attempt in range(2):
+                if self._sock is None:
+                    self.connect()
+                try:
+                    self._send_packet(SERVERDATA_EXECCOMMAND, command.lstrip('/'))
+                    _, _, body = self._recv_packet()
+                    return body
+                except (OSError, RconError):
+                    # Reconnect once if the server dropped an idle connection
+                    self.close()
+                    if attempt:
+                        raise
+        return ''
+
+    def close(self):
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+            self._sock = None
+
+
+def rcon_client_for_instance(config_manager, instance, timeout: float = 5.0) -> Optional[RconClient]:
+    """
+    Create an RCON client for an instance, or None if RCON is disabled.
+    The port and password fall back to the instance's server.properties.
+    """
+    if not config_manager.is_rcon_enabled():
+        return None
+    properties = read_server_properties(instance.server_root)
+    port = instance.rcon_port or int(properties.get('rcon.port', 25575))
+    password = instance.rcon_password
+    if password is None:
+        password = properties.get('rcon.password', '')
+    return RconClient(config_manager.get_rcon_host(), port, password, timeout)
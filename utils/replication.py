@@ -0,0 +1,351 @@
+# utils/replication.py
+import hashlib
+import json
+import os
+import queue
+import shutil
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from utils.metrics import REPLICATION_BYTES, REPLICATION_LAG, REPLICATION_PENDING
+from utils.throttle import MIB, TokenBucket, set_io_priority
+
+# Written into every replicated backup; lists the copied files and whether the copy finished
+MANIFEST_NAME = '.replica-manifest.json'
+# Suffix of a file being copied; an interrupted copy is continued from its size
+PART_SUFFIX = '.part'
+# Seconds between manifest checkpoints while a backup is being copied
+CHECKPOINT_INTERVAL = 5.0
+# A backup with no completion marker is replicated once none of its directories changed for this long
+SETTLE_SECONDS = 300.0
+
+
+def hash_file(path: str, chunk_size: int = MIB) -> str:
+    digest = hashlib.blake2b()
+    with open(path, 'rb') as file:
+        while chunk := file.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def copy_file_resumable(src: str, dst: str, chunk_size: int,
+                        bucket: Optional[TokenBucket] = None) -> Tuple[int, str]:
+    """
+    Copy src to dst in large sequential chunks through dst + '.part', renaming it into
+    place when complete. A '.part' left by an interrupted copy is compared with the
+    source and continued from where it stopped; if it differs, it is rewritten.
+
+    :return: (bytes written, blake2b hex digest of src)
+    """
+    part = dst + PART_SUFFIX
+    size = os.path.getsize(src)
+    resume_from = os.path.getsize(part) if os.path.exists(part) else 0
+    if resume_from > size:
+        resume_from = 0
+    digest = hashlib.blake2b()
+    written = 0
+    with open(src, 'rb') as source, open(part, 'r+b' if resume_from else 'wb') as target:
+        verified = 0
+        while verified < resume_from:
+            expected = source.read(min(chunk_size, resume_from - verified))
+            if target.read(len(expected)) != expected:
+                # The partial copy is not a prefix of the source; start over
+                source.seek(0)
+                digest = hashlib.blake2b()
+                verified = 0
+                break
+            digest.update(expected)
+            verified += len(expected)
+        target.seek(verified)
+        target.truncate()
+        while chunk := source.read(chunk_size):
+            if bucket is not None:
+                bucket.consume(len(chunk))
+            target.write(chunk)
+            digest.update(chunk)
+            written += len(chunk)
+        target.flush()
+        os.fsync(target.fileno())
+    shutil.copystat(src, part)
+    os.replace(part, dst)
+    return written, digest.hexdigest()
+
+
+def load_manifest(path: str) -> dict:
+    try:
+        with open(path) as manifest_file:
+            manifest = json.load(manifest_file)
+        if isinstance(manifest, dict) and isinstance(manifest.get('files'), dict):
+            return manifest
+    except (OSError, ValueError):
+        pass
+    return {'complete': False, 'files': {}}
+
+
+def save_manifest(path: str, manifest: dict):
+    temp_path = path + '.tmp'
+    with open(temp_path, 'w') as manifest_file:
+        json.dump(manifest, manifest_file)
+        manifest_file.flush()
+        os.fsync(manifest_file.fileno())
+    os.replace(temp_path, path)
+
+
+def list_backups(backup_dir: str) -> List[str]:
+    if not os.path.isdir(backup_dir):
+        return []
+    return sorted(name for name in os.listdir(backup_dir) if os.path.isdir(os.path.join(backup_dir, name)))
+
+
+def newest_directory_mtime(path: str) -> float:
+    """Latest mtime of path and the directories below it; copying a file into a directory updates it."""
+    return max(os.stat(root).st_mtime for root, _, _ in os.walk(path))
+
+
+def is_replica_complete(replica_path: str) -> bool:
+    return load_manifest(os.path.join(replica_path, MANIFEST_NAME)).get('complete', False)
+
+
+def replicate_backup(source: str, replica: str, chunk_size: int,
+                     bucket: Optional[TokenBucket] = None) -> Tuple[int, int]:
+    """
+    Copy a backup directory to its replica. Files already in the replica with the same
+    size and hash are skipped; the manifest is checkpointed while copying, so after a
+    crash only the unfinished files are copied again.
+
+    :return: (bytes written, files skipped)
+    """
+    manifest_path = os.path.join(replica, MANIFEST_NAME)
+    os.makedirs(replica, exist_ok=True)
+    manifest = load_manifest(manifest_path)
+    if manifest.get('complete'):
+        return 0, 0
+    files: Dict[str, dict] = manifest['files']
+    written = skipped = 0
+    last_checkpoint = time.monotonic()
+
+    for root, directories, names in os.walk(source):
+        directories.sort()
+        relative_root = os.path.relpath(root, source)
+        os.makedirs(os.path.join(replica, relative_root), exist_ok=True)
+        for name in sorted(names):
+            src = os.path.join(root, name)
+            rel = os.path.normpath(os.path.join(relative_root, name))
+            dst = os.path.join(replica, rel)
+            size = os.path.getsize(src)
+            if os.path.exists(dst) and os.path.getsize(dst) == size:
+                entry = files.get(rel)
+                replica_hash = entry['hash'] if entry and entry.get('size') == size else hash_file(dst, chunk_size)
+                source_hash = hash_file(src, chunk_size)
+                if source_hash == replica_hash:
+                    files[rel] = {'size': size, 'hash': source_hash}
+                    skipped += 1
+                    continue
+            file_written, source_hash = copy_file_resumable(src, dst, chunk_size, bucket)
+            written += file_written
+            files[rel] = {'size': size, 'hash': source_hash}
+            if time.monotonic() - last_checkpoint >= CHECKPOINT_INTERVAL:
+                save_manifest(manifest_path, manifest)
+                last_checkpoint = time.monotonic()
+
+    manifest['complete'] = True
+    manifest['replicated_at'] = time.time()
+    save_manifest(manifest_path, manifest)
+    return written, skipped
+
+
+class ReplicationJob:
+    def __init__(self, instance: str, kind: str, source: str, target: str):
+        self.instance = instance
+        self.kind = kind
+        self.source = source
+        self.target = target
+        self.name = os.path.basename(source)
+        # Replication lag is measured from the time the backup was written
+        self.created = os.stat(source).st_mtime
+
+    @property
+    def key(self) -> tuple:
+        return self.target, self.instance, self.kind, self.name
+
+    @property
+    def replica(self) -> str:
+        return os.path.join(self.target, self.instance, self.kind, self.name)
+
+
+class Replicator:
+    """
+    Copies finished backups to secondary directories (ReplicaDirs) on a background thread.
+
+    Replicas are laid out as <target>/<instance>/<backups|milestone_backups>/<backup>.
+    Regular backups are mirrored, so a replica older than the oldest backup left in the
+    source (rotated out by MaxWorldBackups) is removed from the target as well; milestone
+    replicas are kept, and so is everything while the source lists no backups. A target whose
+    directory does not exist (e.g. an unmounted disk) is skipped and retried later.
+
+    Only finished backups are replicated: those the caller just wrote, those with a backup
+    manifest (written after the copy), and those whose directories have not changed for
+    SETTLE_SECONDS. Anything else may still be written by scripts/backup.py in another
+    process and is left for the next catch-up.
+    """
+
+    def __init__(self, config_manager, logger):
+        self.config_manager = config_manager
+        self.logger = logger
+        self.chunk_size = config_manager.get_replication_chunk_mb() * MIB
+        max_mbps = config_manager.get_replication_max_mbps()
+        self.bucket = TokenBucket(max_mbps * MIB) if max_mbps > 0 else None
+        self.queue: 'queue.Queue[ReplicationJob]' = queue.Queue()
+        self.pending: Dict[tuple, ReplicationJob] = {}
+        self._instances = set()
+        self.errors: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def _sources(self, name: str) -> List[Tuple[str, str]]:
+        instance = self.config_manager.get_instance(name)
+        return [('backups', instance.backup_dir), ('milestone_backups', instance.milestone_backup_dir)]
+
+    def _is_finished(self, name: str, kind: str, backup_path: str) -> bool:
+        from utils.backup_manifest import manifest_path
+
+        base_dir = os.path.dirname(os.path.abspath(self.config_manager.config_path))
+        if os.path.exists(manifest_path(base_dir, name, kind, os.path.basename(backup_path))):
+            return True
+        try:
+            return time.time() - newest_directory_mtime(backup_path) >= SETTLE_SECONDS
+        except OSError:
+            return False
+
+    def catch_up(self, names: List[str], finished: Iterable[str] = ()):
+        """
+        Queue every finished backup of the instances that is not fully replicated to all targets.
+
+        :param finished: Paths of backups the caller knows to be complete, e.g. the one it just wrote
+        """
+        finished = set(finished)
+        for name in names:
+            targets = self.config_manager.get_instance(name).replica_dirs
+            for target in targets:
+                if not os.path.isdir(target):
+                    self.errors[target] = "target directory does not exist"
+                    self.logger.log(f"Replica target {target} is not available; will retry after the next backup")
+                    continue
+                self.errors.pop(target, None)
+                for kind, backup_dir in self._sources(name):
+                    backups = list_backups(backup_dir)
+                    for backup in backups:
+                        job = ReplicationJob(name, kind, os.path.join(backup_dir, backup), target)
+                        if is_replica_complete(job.replica):
+                            continue
+                        if job.source not in finished and not self._is_finished(name, kind, job.source):
+                            self.logger.log(f"Not replicating {job.source} yet: it may still be being written")
+                            continue
+                        self._enqueue(job)
+                    if kind == 'backups' and backups:
+                        # A missing or empty source (e.g. a lost primary disk) never empties the replicas
+                        self._prune(target, name, kind, backups[0])
+        self._update_metrics()
+        self._ensure_worker()
+
+    def _enqueue(self, job: ReplicationJob):
+        if is_replica_complete(job.replica):
+            return
+        with self._lock:
+            if job.key in self.pending:
+                return
+            self.pending[job.key] = job
+        self.queue.put(job)
+
+    def _prune(self, target: str, name: str, kind: str, oldest: str):
+        """Remove the replicas of backups older than the oldest source backup, i.e. rotated out by retention."""
+        replica_dir = os.path.join(target, name, kind)
+        if not os.path.isdir(replica_dir):
+            return
+        with self._lock:
+            pending = set(self.pending)
+        for backup in os.listdir(replica_dir):
+            if backup < oldest and (target, name, kind, backup) not in pending:
+                shutil.rmtree(os.path.join(replica_dir, backup), ignore_errors=True)
+                self.logger.log(f"Removed replica {os.path.join(replica_dir, backup)}")
+
+    def _ensure_worker(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='replication', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        # Replication competes with the server for I/O just like backups do
+        set_io_priority(self.config_manager.get_backup_io_class(), self.config_manager.get_backup_io_level())
+        while True:
+            job = self.queue.get()
+            try:
+                self._replicate(job)
+            finally:
+                with self._lock:
+                    self.pending.pop(job.key, None)
+                self._update_metrics()
+                self.queue.task_done()
+
+    def _replicate(self, job: ReplicationJob):
+        if not os.path.isdir(job.source):
+            # Rotated out before it was replicated
+            return
+        start = time.perf_counter()
+        try:
+            written, skipped = replicate_backup(job.source, job.replica, self.chunk_size, self.bucket)
+        except OSError as e:
+            self.errors[job.target] = str(e)
+            self.logger.log(f"Replication of {job.source} to {job.target} failed: {e}")
+            return
+        self.errors.pop(job.target, None)
+        elapsed = time.perf_counter() - start
+        REPLICATION_BYTES.inc(written, instance=job.instance, target=job.target)
+        self.logger.log(f"Replicated {job.instance}/{job.kind}/{job.name} to {job.target}: "
+                        f"{written / MIB:.1f} MiB in {elapsed:.1f}s"
+                        + (f", {skipped} unchanged files skipped" if skipped else ""))
+
+    def lag(self, name: str) -> float:
+        """Age in seconds of the oldest backup of an instance that is not replicated yet."""
+        with self._lock:
+            created = [job.created for job in self.pending.values() if job.instance == name]
+        return max(0.0, time.time() - min(created)) if created else 0.0
+
+    def _update_metrics(self):
+        with self._lock:
+            self._instances.update(job.instance for job in self.pending.values())
+            counts = {name: sum(1 for job in self.pending.values() if job.instance == name)
+                      for name in self._instances}
+        for name, count in counts.items():
+            REPLICATION_PENDING.set(count, instance=name)
+            REPLICATION_LAG.set(self.lag(name), instance=name)
+
+    def drain(self):
+        """Block until every queued backup has been replicated."""
+        self.queue.join()
+
+    def report(self, name: str) -> str:
+        """Queued backups and lag, plus how many backups each target holds a complete replica of."""
+        targets = self.config_manager.get_instance(name).replica_dirs
+        if not targets:
+            return "Replication is not configured (ReplicaDirs)."
+        self._update_metrics()
+        with self._lock:
+            queued = sum(1 for job in self.pending.values() if job.instance == name)
+        lines = [f"Queued: {queued} backup(s), lag {self.lag(name):.0f}s"]
+        for target in targets:
+            if not os.path.isdir(target):
+                lines.append(f"  {target}: not available")
+                continue
+            for kind, backup_dir in self._sources(name):
+                backups = list_backups(backup_dir)
+                if not backups:
+                    continue
+                done = [backup for backup in backups
+                        if is_replica_complete(os.path.join(target, name, kind, backup))]
+                lines.append(f"  {target} {kind}: {len(done)}/{len(backups)} replicated"
+                             + (f", newest {done[-1]}" if done else ""))
+            if target in self.errors:
+                lines.append(f"    last error: {self.errors[target]}")
+        return '\n'.join(lines)
@@ -1,10 +1,12 @@
 import os
 import subprocess
 import sys
-from typing import Optional
+from typing import Optional, Sequence
 import pwd
 import grp
 
+from utils.spans import active_session
+
 
 def get_non_privileged_user() -> str:
     """
@@ -19,14 +21,16 @@ def get_non_privileged_user() -> str:
     raise ValueError("No non-privileged user found on the system")
 
 
-def run_script(scripts_dir: str, script_name: str, logger, log_message: Optional[str] = None) -> bool:
+def run_script(scripts_dir: str, script_name: str, logger, log_message: Optional[str] = None,
+               args: Sequence[str] = ()) -> bool:
     """
-    Run a script from the scripts directory as a non-privileged user.
+    Run a script from the scripts directory, as a non-privileged user when started as root.
 
     :param scripts_dir: Directory where scripts are located.
     :param script_name: Name of the script to run.
     :param logger: Logger instance for logging actions.
     :param log_message: Optional log message to write.
+    :param args: Command line arguments passed to the script.
     :return: True if script ran successfully, False otherwise.
     """
     try:
@@ -36,24 +40,34 @@ def run_script(scripts_dir: str, script_name: str, logger, log_message: Optional
         if log_message:
             logger.log(log_message)
 
-        # Find a non-privileged user account
-        non_privileged_user = get_non_privileged_user()
-        non_privileged_uid = pwd.getpwnam(non_privileged_user).pw_uid
-        non_privileged_gid = grp.getgrnam(non_privileged_user).gr_gid
+        # Drop to a non-privileged user account; without root, setuid would fail and is not needed
+        drop_privileges = None
+        if os.geteuid() == 0:
+            non_privileged_user = get_non_privileged_user()
+            non_privileged_uid = pwd.getpwnam(non_privileged_user).pw_uid
+            non_privileged_gid = grp.getgrnam(non_privileged_user).gr_gid
+            drop_privileges = lambda: os.setgid(non_privileged_gid) or os.setuid(non_privileged_uid)
+
+        command = [sys.executable, script_path, *args]
+        session = active_session.get()
+        if session is not None:
+            # Profile the script's functions in its own process, still as the non-privileged user
+            command = [sys.executable, os.path.join(scripts_dir, 'profile_script.py'),
+                       session.child_prefix(script_name), script_path, *args]
 
         # Run the script using the non-privileged user's environment
-        result = subprocess.run([sys.executable, script_path],
+        result = subprocess.run(command,
                                 capture_output=True,
                                 text=True,
                                 check=True,
-                                preexec_fn=lambda: os.setgid(non_privileged_gid) or os.setuid(non_privileged_uid))
+                                preexec_fn=drop_privileges)
 
         # Print script output
         if result.stdout:
             print(result.stdout)
 
         return True
-    except subprocess.CalledProcessError as e:
+    except (subprocess.SubprocessError, ValueError, OSError) as e:
         print(f"Error running {script_name}: {e}")
         logger.log(f"Error running {script_name}: {e}")
         return False
\ No newline at end of file
@@ -0,0 +1,7 @@
+# utils/screen.py
+import subprocess
+
+
+def send_to_screen(session: str, text: str, timeout: float = 3):
+    """Type a line into a screen session's console."""
+    subprocess.run(['screen', '-S', session, '-X', 'stuff', f'\n{text}\n'], check=True, timeout=timeout)
@@ -1,65 +1,80 @@
 # utils/send_message.py
-import os
-import re
 import subprocess
 import time
+from typing import Optional
 
 from utils.config_manager import ConfigManager
 from utils.logger import Logger
+from utils.metrics import MESSAGE_DURATION, MESSAGES_TOTAL
+from utils.process_registry import ProcessRegistry, server_key
+from utils.screen import send_to_screen
 
 
-def send_server_message(config_manager: ConfigManager, message: str, logger: Logger = None) -> bool:
+def send_server_message(config_manager: ConfigManager, message: str, logger: Logger = None,
+                        instance_name: Optional[str] = None, echo_log: bool = True) -> bool:
     """
-    Send a message/command to all active screen sessions and log the last few lines of the server log.
+    Send a message/command to an instance's screen session and record delivery metrics.
 
     Args:
-        config_manager (ConfigManager): ConfigManager instance to access server root.
+        config_manager (ConfigManager): ConfigManager instance to access the instance settings.
         message (str): The message/command to send.
         logger (Logger, optional): Logger instance for logging errors.
+        instance_name (str, optional): Instance to send to, defaults to the default instance.
+        echo_log (bool, optional): Wait briefly and print the last lines of the server log.
 
     Returns:
-        bool: True if message was sent successfully to at least one session.
+        bool: True if message was sent successfully.
     """
+    start = time.perf_counter()
     try:
-        # Get list of screen sessions
-        screen_list_output = subprocess.check_output(['screen', '-ls'], universal_newlines=True)
-        screen_sessions = re.findall(r'\t(\d+\.\S+)', screen_list_output)
+        instance = config_manager.get_instance(instance_name)
+    except Exception as e:
+        if logger:
+            logger.log(f"Error in send_server_message: {e}")
+        MESSAGES_TOTAL.inc(instance=instance_name or '', result='failed')
+        return False
+    success = _send_server_message(config_manager, message, logger, instance, echo_log)
+    MESSAGE_DURATION.observe(time.perf_counter() - start, instance=instance.name)
+    MESSAGES_TOTAL.inc(instance=instance.name, result='delivered' if success else 'failed')
+    return success
+
+
+def _send_server_message(config_manager: ConfigManager, message: str, logger: Logger,
+                         instance, echo_log: bool) -> bool:
+    try:
+        record = ProcessRegistry(config_manager.get_run_dir()).find_session(server_key(instance.name),
+                                                                             instance.screen_name)
+        session = record.session_id if record else None
+
+        if session is None:
+            if logger:
+                logger.log(f"No active screen session {instance.screen_name} for instance '{instance.name}'")
+            return False
+
+        try:
+            # If message doesn't start with '/', assume it's a chat message
+            cmd = message if message.startswith('/') else f'/say {message}'
 
-        if not screen_sessions:
+            # Send command to screen session
+            send_to_screen(session, cmd)
+            if logger:
+                logger.log(f"Message sent to session {session}: {message}")
+
+        except subprocess.CalledProcessError as cmd_err:
+            if logger:
+                logger.log(f"Failed to send message to {session}: {cmd_err}")
+            return False
+        except subprocess.TimeoutExpired:
             if logger:
-                logger.log("No active screen sessions found")
+                logger.log(f"Timeout sending message to {session}")
             return False
 
-        success = False
-        for session in screen_sessions:
-            try:
-                # If message doesn't start with '/', assume it's a chat message
-                cmd = message if message.startswith('/') else f'/say {message}'
-
-                # Send command to screen session
-                subprocess.run([
-                    'screen',
-                    '-S',
-                    session,
-                    '-X',
-                    'stuff',
-                    f'\n{cmd}\n'
-                ], check=True, timeout=3)
-
-                success = True
-                if logger:
-                    logger.log(f"Message sent to session {session}: {message}")
-
-            except subprocess.CalledProcessError as cmd_err:
-                if logger:
-                    logger.log(f"Failed to send message to {session}: {cmd_err}")
-            except subprocess.TimeoutExpired:
-                if logger:
-                    logger.log(f"Timeout sending message to {session}")
+        if not echo_log:
+            return True
 
         time.sleep(0.5)
         # Log the last few lines of the server log
-        log_path = os.path.join(config_manager.get_server_root(), 'logs', 'latest.log')
+        log_path = instance.log_path
         try:
             with open(log_path, 'r') as log_file:
                 last_lines = log_file.readlines()[-2:]  # Get the last few lines
@@ -75,7 +90,7 @@ def send_server_message(config_manager: ConfigManager, message: str, logger: Log
             if logger:
                 logger.log(f"Log file not found: {log_path}")
 
-        return success
+        return True
 
     except Exception as e:
         if logger:
@@ -0,0 +1,25 @@
+# utils/server_properties.py
+import os
+from typing import Dict
+
+
+def read_server_properties(server_root: str) -> Dict[str, str]:
+    """
+    Read server.properties from the server root.
+
+    :param server_root: Minecraft server directory
+    :return: Mapping of property names to raw string values (empty if the file is missing)
+    """
+    properties = {}
+    path = os.path.join(server_root, 'server.properties')
+    try:
+        with open(path, 'r', encoding='utf-8') as properties_file:
+            for line in properties_file:
+                line = line.strip()
+                if not line or line.startswith('#') or '=' not in line:
+                    continue
+                key, _, value = line.partition('=')
+                properties[key.strip()] = value.strip()
+    except FileNotFoundError:
+        pass
+    return properties
@@ -0,0 +1,49 @@
+# utils/spans.py
+import contextvars
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, List, Optional, Tuple
+
+from utils.metrics import PHASE_DURATION
+
+# Profiling session (utils.profiling.ProfileSession) of the command running in this context;
+# run_script profiles scripts under it. Kept apart from utils.profiling so that checking it
+# does not import cProfile, pstats and tracemalloc.
+active_session: contextvars.ContextVar[Optional['ProfileSession']] = contextvars.ContextVar(
+    'active_session', default=None)
+
+
+def in_session_thread(func: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    func as the target of a worker thread: wrapped so the profiling session of the calling
+    context, if any, profiles it there. Threads do not inherit the caller's context, so
+    this must be called before the thread starts.
+    """
+    session = active_session.get()
+    return func if session is None else session.thread_target(func)
+
+
+class Spans:
+    """
+    Wall time of the phases of one operation, e.g. the scan, copy and rotation of a backup.
+    Cheap enough to stay on all the time: a phase costs two perf_counter() calls.
+    """
+
+    def __init__(self, operation: str):
+        self.operation = operation
+        self.phases: List[Tuple[str, float]] = []
+        self.start = time.perf_counter()
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            self.phases.append((name, seconds))
+            PHASE_DURATION.observe(seconds, operation=self.operation, phase=name)
+
+    def summary(self) -> str:
+        total = time.perf_counter() - self.start
+        return ', '.join(f"{name} {seconds:.2f}s" for name, seconds in self.phases) + f" (total {total:.2f}s)"
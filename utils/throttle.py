@@ -0,0 +1,232 @@
+# utils/throttle.py
+import ctypes
+import os
+import platform
+import shutil
+import subprocess
+import threading
+import time
+from typing import Callable, Optional
+
+from utils.spans import in_session_thread
+
+# ioprio_set(2) syscall numbers per architecture
+IOPRIO_SET_SYSCALLS = {'x86_64': 251, 'aarch64': 30, 'i386': 289, 'i686': 289, 'armv7l': 314}
+IOPRIO_WHO_PROCESS = 1
+IOPRIO_CLASS_SHIFT = 13
+IO_CLASSES = {'none': 0, 'realtime': 1, 'best-effort': 2, 'idle': 3}
+
+COPY_CHUNK_SIZE = 1024 * 1024
+MIB = 1024 * 1024
+
+
+class ThrottleSettings:
+    """I/O class, niceness and bandwidth limits for backup, milestone and retention I/O."""
+
+    def __init__(self, io_class: str = 'best-effort', io_level: int = 7, niceness: int = 10,
+                 max_mbps: float = 0.0, adaptive: bool = False, min_mbps: float = 5.0,
+                 delete_files_per_second: float = 0.0):
+        if io_class not in IO_CLASSES:
+            raise ValueError(f"Unknown I/O class '{io_class}' (use one of {', '.join(IO_CLASSES)})")
+        self.io_class = io_class
+        self.io_level = io_level
+        self.niceness = niceness
+        self.max_mbps = max_mbps
+        self.adaptive = adaptive
+        self.min_mbps = min_mbps
+        self.delete_files_per_second = delete_files_per_second
+
+
+def load_throttle_settings(config_manager) -> ThrottleSettings:
+    """Build the backup throttle settings from config.ini."""
+    return ThrottleSettings(
+        io_class=config_manager.get_backup_io_class(),
+        io_level=config_manager.get_backup_io_level(),
+        niceness=config_manager.get_backup_nice(),
+        max_mbps=config_manager.get_backup_max_mbps(),
+        adaptive=config_manager.is_backup_adaptive(),
+        min_mbps=config_manager.get_backup_min_mbps(),
+        delete_files_per_second=config_manager.get_backup_delete_rate(),
+    )
+
+
+def set_io_priority(io_class: str, io_level: int, tid: int = 0) -> bool:
+    """
+    Set the I/O scheduling class of a thread (0 = calling thread).
+    Uses the ioprio_set syscall, falling back to the ionice binary.
+    """
+    if io_class == 'none':
+        return True
+    value = (IO_CLASSES[io_class] << IOPRIO_CLASS_SHIFT) | max(0, min(io_level, 7))
+    syscall_number = IOPRIO_SET_SYSCALLS.get(platform.machine())
+    if syscall_number is not None:
+        try:
+            libc = ctypes.CDLL(None, use_errno=True)
+            if libc.syscall(syscall_number, IOPRIO_WHO_PROCESS, tid, value) == 0:
+                return True
+        except (OSError, AttributeError):
+            pass
+    try:
+        target = str(tid or threading.get_native_id())
+        subprocess.run(['ionice', '-c', str(IO_CLASSES[io_class]), '-n', str(io_level), '-p', target],
+                       check=True, capture_output=True)
+        return True
+    except (OSError, subprocess.CalledProcessError):
+        return False
+
+
+def run_with_priority(settings: ThrottleSettings, func: Callable, *args, logger=None):
+    """
+    Run func(*args) in a dedicated thread with the configured I/O class and niceness.
+    Linux applies both per thread, so the calling thread keeps its priority.
+    """
+    outcome = {}
+
+    def target():
+        if not set_io_priority(settings.io_class, settings.io_level) and logger:
+            logger.log(f"Could not set I/O class {settings.io_class}/{settings.io_level}")
+        if settings.niceness:
+            try:
+                os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), settings.niceness)
+            except OSError as e:
+                if logger:
+                    logger.log(f"Could not set niceness {settings.niceness}: {e}")
+        try:
+            outcome['result'] = func(*args)
+        except BaseException as e:
+            outcome['error'] = e
+
+    thread = threading.Thread(target=in_session_thread(target), name='low-priority-io')
+    thread.start()
+    thread.join()
+    if 'error' in outcome:
+        raise outcome['error']
+    return outcome.get('result')
+
+
+class TokenBucket:
+    """Token bucket limiting throughput to `rate` bytes per second (0 = unlimited)."""
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.burst = burst if burst is not None else max(rate, COPY_CHUNK_SIZE)
+        self.tokens = self.burst
+        self.last = time.monotonic()
+        self.waited = 0.0
+        self._lock = threading.Lock()
+
+    def set_rate(self, rate: float):
+        with self._lock:
+            self.rate = rate
+            self.burst = max(rate, COPY_CHUNK_SIZE)
+            self.tokens = min(self.tokens, self.burst)
+
+    def consume(self, amount: float) -> float:
+        """Take `amount` tokens, sleeping until they are available. Returns the time slept."""
+        with self._lock:
+            if self.rate <= 0:
+                return 0.0
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.last) * self.rate)
+            self.last = now
+            self.tokens -= amount
+            delay = -self.tokens / self.rate if self.tokens < 0 else 0.0
+            self.waited += delay
+        if delay:
+            time.sleep(delay)
+        return delay
+
+
+class ThrottledCopier:
+    """
+    copytree() copy function that limits bandwidth with a token bucket.
+
+    In adaptive mode, `is_lagging` is checked about once a second; while the
+    server reports tick lag the rate is halved (down to min_mbps), and it
+    recovers by 25% per check up to max_mbps once the lag is gone.
+    """
+
+    def __init__(self, settings: ThrottleSettings, is_lagging: Optional[Callable[[], bool]] = None):
+        self.settings = settings
+        self.is_lagging = is_lagging if settings.adaptive else None
+        self.max_rate = settings.max_mbps * MIB
+        self.bucket = TokenBucket(self.max_rate)
+        self.bytes_copied = 0
+        self.files_copied = 0
+        self.backoffs = 0
+        self.started = time.monotonic()
+        self._last_check = self.started
+
+    def _adapt(self):
+        now = time.monotonic()
+        if self.is_lagging is None or now - self._last_check < 1.0:
+            return
+        self._last_check = now
+        min_rate = self.settings.min_mbps * MIB
+        if self.is_lagging():
+            current = self.bucket.rate
+            if current <= 0:
+                # Unlimited so far: start from half the throughput achieved until now
+                current = self.bytes_copied / max(now - self.started, 1e-3)
+            self.bucket.set_rate(max(min_rate, current / 2))
+            self.backoffs += 1
+        elif self.bucket.rate > 0:
+            recovered = self.bucket.rate * 1.25
+            if self.max_rate and recovered >= self.max_rate:
+                recovered = self.max_rate
+            elif not self.max_rate and self.bucket.rate >= 64 * min_rate:
+                recovered = 0  # back to unlimited
+            self.bucket.set_rate(recovered)
+
+    def copy(self, src: str, dst: str, *, follow_symlinks: bool = True) -> str:
+        if os.path.isdir(dst):
+            dst = os.path.join(dst, os.path.basename(src))
+        with open(src, 'rb') as source, open(dst, 'wb') as target:
+            while True:
+                chunk = source.read(COPY_CHUNK_SIZE)
+                if not chunk:
+                    break
+                self._adapt()
+                self.bucket.consume(len(chunk))
+                target.write(chunk)
+                self.bytes_copied += len(chunk)
+        shutil.copystat(src, dst, follow_symlinks=follow_symlinks)
+        self.files_copied += 1
+        return dst
+
+    def copytree(self, src: str, dst: str) -> str:
+        return shutil.copytree(src, dst, copy_function=self.copy)
+
+    @property
+    def throttled_seconds(self) -> float:
+        return self.bucket.waited
+
+    def summary(self) -> str:
+        """Describe throughput and how much the throttle added to the duration."""
+        elapsed = time.monotonic() - self.started
+        rate = self.bytes_copied / MIB / elapsed if elapsed > 0 else 0.0
+        text = (f"{self.bytes_copied / MIB:.1f} MiB in {self.files_copied} files, {elapsed:.1f}s "
+                f"({rate:.1f} MiB/s), throttling added {self.throttled_seconds:.1f}s "
+                f"(~{elapsed - self.throttled_seconds:.1f}s unthrottled)")
+        if self.backoffs:
+            text += f", backed off {self.backoffs} times for server lag"
+        return text
+
+
+def throttled_rmtree(path: str, files_per_second: float = 0.0):
+    """Delete a directory tree, pacing unlinks to files_per_second (0 = unlimited)."""
+    if files_per_second <= 0:
+        shutil.rmtree(path)
+        return
+    bucket = TokenBucket(files_per_second, burst=max(files_per_second, 1))
+    for root, dirs, files in os.walk(path, topdown=False):
+        for name in files:
+            bucket.consume(1)
+            os.unlink(os.path.join(root, name))
+        for name in dirs:
+            full_path = os.path.join(root, name)
+            if os.path.islink(full_path):
+                os.unlink(full_path)
+            else:
+                os.rmdir(full_path)
+    os.rmdir(path)
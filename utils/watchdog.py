@@ -0,0 +1,246 @@
+# utils/watchdog.py
+import datetime
+import os
+import re
+import select
+import threading
+import time
+from typing import Callable, List, Optional
+
+from utils.metrics import SERVER_CRASHES, SERVER_RESTARTS, SERVER_UP
+from utils.proc_stats import process_start_time
+
+# Logged by the server when it shuts down on purpose (stop command, /stop in game)
+CLEAN_STOP_PATTERN = re.compile(r'Stopping (the )?server')
+# Logged when the server shuts down because of a crash (it then logs "Stopping server" too)
+CRASH_PATTERN = re.compile(r'This crash report has been saved to|Encountered an unexpected exception')
+# How long an announced stop (expect_stop) covers the next exit; stop_mc.py gives up after 60s
+EXPECT_STOP_SECONDS = 120.0
+
+
+def tail_lines(path: str, count: int, max_bytes: int = 256 * 1024) -> List[str]:
+    """Return the last `count` lines of a text file, reading at most max_bytes from its end."""
+    try:
+        with open(path, 'rb') as log_file:
+            log_file.seek(0, os.SEEK_END)
+            size = log_file.tell()
+            log_file.seek(max(0, size - max_bytes))
+            data = log_file.read()
+    except OSError:
+        return []
+    return data.decode('utf-8', errors='replace').splitlines()[-count:]
+
+
+def format_uptime(seconds: float) -> str:
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h {minutes}m {seconds}s" if hours else f"{minutes}m {seconds}s"
+
+
+class Watchdog:
+    """
+    Restarts a server instance whose JVM exits without a clean shutdown.
+
+    While the server runs, the thread waits on a pidfd, which becomes readable the
+    moment the process exits (no polling, no `screen -ls`). Where pidfds are not
+    available, /proc/<pid>/stat is checked every interval, comparing the start time so
+    a reused pid is not mistaken for the server. While the server is down, /proc is
+    scanned every interval to pick up a server started by any means.
+
+    An exit counts as a crash unless expect_stop() was called (the manager's stop
+    commands do) or the log shows the server stopping on its own. Each crash writes a
+    report with the tail of latest.log, then the server is restarted after an
+    exponential backoff. After max_restarts crashes within window_seconds, the
+    watchdog gives up until reset() or the server is started again by hand.
+    """
+
+    def __init__(self, name: str, find_pid: Callable[[], Optional[int]], restart: Callable[[], bool],
+                 log_path: str, server_root: str, crash_dir: str, logger, interval_seconds: float = 2.0,
+                 backoff_seconds: float = 10.0, max_backoff_seconds: float = 600.0, max_restarts: int = 5,
+                 window_seconds: float = 3600.0, log_lines: int = 200):
+        """
+        :param find_pid: Returns the pid of the instance's JVM, or None
+        :param restart: Starts the instance through the normal start path; returns success
+        :param crash_dir: Directory crash reports are written to
+        """
+        self.name = name
+        self.find_pid = find_pid
+        self.restart = restart
+        self.log_path = log_path
+        self.server_root = server_root
+        self.crash_dir = crash_dir
+        self.logger = logger
+        self.interval_seconds = interval_seconds
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.max_restarts = max_restarts
+        self.window_seconds = window_seconds
+        self.log_lines = log_lines
+
+        self.pid: Optional[int] = None
+        self.started_at: Optional[float] = None
+        self.crash_times: List[float] = []
+        self.last_report: Optional[str] = None
+        self.next_restart: Optional[float] = None
+        self.gave_up = False
+        self._stop_expected_at: Optional[float] = None
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def expect_stop(self):
+        """Announce an intentional stop so the next exit (or a pending restart) is not treated as a crash."""
+        self._stop_expected_at = time.monotonic()
+
+    def _stop_expected(self) -> bool:
+        expected = self._stop_expected_at is not None and time.monotonic() - self._stop_expected_at < EXPECT_STOP_SECONDS
+        self._stop_expected_at = None
+        return expected
+
+    def reset(self):
+        """Forget past crashes and resume restarting after a crash loop."""
+        self.crash_times.clear()
+        self.gave_up = False
+
+    def _wait_for_exit(self, pid: int, start_time: int) -> bool:
+        """Block until the process exits or the watchdog is stopped; True if it exited."""
+        try:
+            pidfd = os.pidfd_open(pid)
+        except (AttributeError, OSError):
+            pidfd = None
+        try:
+            while not self._stop_event.is_set():
+                if pidfd is not None:
+                    # Readable once the process has exited; the timeout keeps stop() responsive
+                    if select.select([pidfd], [], [], self.interval_seconds)[0]:
+                        return True
+                else:
+                    self._stop_event.wait(self.interval_seconds)
+                    if process_start_time(pid) != start_time:
+                        return True
+            return False
+        finally:
+            if pidfd is not None:
+                os.close(pidfd)
+
+    def _stopped_cleanly(self) -> bool:
+        lines = tail_lines(self.log_path, 50)
+        if any(CRASH_PATTERN.search(line) for line in lines):
+            return False
+        return any(CLEAN_STOP_PATTERN.search(line) for line in lines)
+
+    def _write_crash_report(self, pid: Optional[int], uptime: Optional[float], reason: str) -> Optional[str]:
+        now = datetime.datetime.now()
+        lines = [f"Crash of instance '{self.name}' detected at {now.isoformat(timespec='seconds')}",
+                 f"Reason: {reason}"]
+        if pid is not None:
+            lines.append(f"PID: {pid}" + (f", uptime {format_uptime(uptime)}" if uptime is not None else ""))
+            # HotSpot writes hs_err_pid<pid>.log into the working directory on a fatal error
+            hs_err = os.path.join(self.server_root, f'hs_err_pid{pid}.log')
+            if os.path.exists(hs_err):
+                lines.append(f"JVM fatal error log: {hs_err}")
+        server_reports = os.path.join(self.server_root, 'crash-reports')
+        if self.started_at is not None and os.path.isdir(server_reports):
+            # Reports the server wrote since it was last seen starting
+            for report in sorted(os.listdir(server_reports)):
+                path = os.path.join(server_reports, report)
+                if os.path.getmtime(path) >= self.started_at - 1:
+                    lines.append(f"Server crash report: {path}")
+        lines.append("")
+        lines.append(f"--- Last {self.log_lines} lines of {self.log_path} ---")
+        lines.extend(tail_lines(self.log_path, self.log_lines))
+
+        try:
+            os.makedirs(self.crash_dir, exist_ok=True)
+            path = os.path.join(self.crash_dir, f"{self.name}_{now.strftime('%Y%m%d_%H%M%S')}.txt")
+            with open(path, 'w') as report_file:
+                report_file.write('\n'.join(lines) + '\n')
+            return path
+        except OSError as e:
+            self.logger.log(f"Could not write crash report for '{self.name}': {e}")
+            return None
+
+    def _handle_crash(self, pid: Optional[int], uptime: Optional[float], reason: str):
+        now = time.monotonic()
+        SERVER_CRASHES.inc(instance=self.name)
+        self.crash_times = [t for t in self.crash_times if now - t < self.window_seconds] + [now]
+        self.last_report = self._write_crash_report(pid, uptime, reason)
+        self.logger.log(f"Watchdog: server '{self.name}' {reason}"
+                        + (f"; crash report {self.last_report}" if self.last_report else ""))
+        if len(self.crash_times) > self.max_restarts:
+            self.gave_up = True
+            self.logger.log(f"Watchdog: '{self.name}' crashed {len(self.crash_times)} times within "
+                            f"{self.window_seconds:.0f}s; not restarting until it is started again or reset")
+            return
+
+        delay = min(self.backoff_seconds * 2 ** (len(self.crash_times) - 1), self.max_backoff_seconds)
+        self.logger.log(f"Watchdog: restarting '{self.name}' in {delay:g}s "
+                        f"(crash {len(self.crash_times)} of at most {self.max_restarts})")
+        self.next_restart = time.time() + delay
+        self._stop_expected_at = None
+        if self._stop_event.wait(delay):
+            return
+        self.next_restart = None
+        if self._stop_expected():
+            # Stopped by hand (qmc, qa) while waiting; leave it down
+            self.logger.log(f"Watchdog: restart of '{self.name}' cancelled by a stop command")
+            return
+        success = bool(self.restart())
+        SERVER_RESTARTS.inc(instance=self.name, result='ok' if success else 'failed')
+        if not success:
+            self._handle_crash(None, None, "failed to restart")
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            pid = self.find_pid()
+            start_time = process_start_time(pid) if pid is not None else None
+            if start_time is None:
+                SERVER_UP.set(0, instance=self.name)
+                self._stop_event.wait(self.interval_seconds)
+                continue
+
+            if self.gave_up:
+                # Started again by hand after a crash loop
+                self.reset()
+            self.pid = pid
+            self.started_at = time.time()
+            SERVER_UP.set(1, instance=self.name)
+            if not self._wait_for_exit(pid, start_time):
+                return
+            uptime = time.time() - self.started_at
+            self.pid = None
+            SERVER_UP.set(0, instance=self.name)
+
+            if self._stop_expected() or self._stopped_cleanly():
+                self.logger.log(f"Watchdog: server '{self.name}' stopped")
+                continue
+            self._handle_crash(pid, uptime, "exited without a clean shutdown")
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name=f'watchdog-{self.name}', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def report(self) -> str:
+        if self.pid is not None:
+            state = f"running (pid {self.pid}, up {format_uptime(time.time() - self.started_at)})"
+        elif self.gave_up:
+            state = "crash loop detected, not restarting ('wd reset' to resume)"
+        elif self.next_restart is not None:
+            state = f"crashed, restarting in {max(0, self.next_restart - time.time()):.0f}s"
+        else:
+            state = "not running"
+        now = time.monotonic()
+        recent = sum(1 for t in self.crash_times if now - t < self.window_seconds)
+        lines = [f"State: {state}",
+                 f"Crashes in the last {self.window_seconds / 60:.0f} min: {recent} (limit {self.max_restarts})"]
+        if self.last_report:
+            lines.append(f"Last crash report: {self.last_report}")
+        return '\n'.join(lines)
@@ -0,0 +1,129 @@
+# utils/world_index.py
+import fnmatch
+import json
+import os
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Files the server rewrites on every autosave or start even when nothing was played
+DEFAULT_IGNORE_PATTERNS = ('session.lock', 'level.dat', 'level.dat_old')
+
+# relative path -> (size, mtime in nanoseconds)
+WorldIndex = Dict[str, Tuple[int, int]]
+
+# Paths the server touches whenever it saves: level.dat is rewritten on every save, region/
+# and playerdata/ get new entries when chunks or players are first written. While none of
+# their mtimes moved since the last check the server has not saved, so the world is as it was.
+CHANGE_SIGNALS = ('level.dat', 'region', 'playerdata')
+
+
+def _compile_ignore(ignore: Iterable[str]) -> Tuple[Optional[re.Pattern], Optional[re.Pattern]]:
+    """
+    One regex for all the patterns, and one for the directories whose whole content they
+    match ('data/*' matches everything below data, so data is not walked at all).
+    """
+    ignore = tuple(ignore)
+    prefixes = tuple(item[:-2] for item in ignore if item.endswith('/*') and len(item) > 2)
+    pattern = re.compile('|'.join(map(fnmatch.translate, ignore))) if ignore else None
+    directory = re.compile('|'.join(map(fnmatch.translate, prefixes))) if prefixes else None
+    return pattern, directory
+
+
+def scan_world(world_path: str, ignore: Iterable[str] = DEFAULT_IGNORE_PATTERNS) -> WorldIndex:
+    """
+    Build a (size, mtime) index of all files below a world directory.
+    Uses the stat data os.scandir already has, so no file is opened.
+
+    :param world_path: Path of the world directory
+    :param ignore: fnmatch patterns of relative paths (or file names) to leave out; a
+                   matching directory is skipped with everything below it
+    """
+    pattern, directory = _compile_ignore(ignore)
+    index: WorldIndex = {}
+    stack = ['']
+    while stack:
+        relative_dir = stack.pop()
+        with os.scandir(os.path.join(world_path, relative_dir)) as entries:
+            for entry in entries:
+                relative_path = os.path.join(relative_dir, entry.name)
+                if pattern is not None and (pattern.match(relative_path) or pattern.match(entry.name)):
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    if directory is None or not directory.match(relative_path):
+                        stack.append(relative_path)
+                elif entry.is_file(follow_symlinks=False):
+                    stat = entry.stat(follow_symlinks=False)
+                    index[relative_path] = (stat.st_size, stat.st_mtime_ns)
+    return index
+
+
+def read_signals(world_path: str) -> Dict[str, Optional[int]]:
+    """mtime_ns of each of CHANGE_SIGNALS (None if missing): three stat calls, however large the world."""
+    signals = {}
+    for relative_path in CHANGE_SIGNALS:
+        try:
+            signals[relative_path] = os.stat(os.path.join(world_path, relative_path)).st_mtime_ns
+        except OSError:
+            signals[relative_path] = None
+    return signals
+
+
+def update_index(files: WorldIndex, current: WorldIndex) -> int:
+    """Bring files in line with a fresh scan, touching only the entries that differ; returns their number."""
+    updated = 0
+    for path, entry in current.items():
+        if files.get(path) != entry:
+            files[path] = entry
+            updated += 1
+    for path in [path for path in files if path not in current]:
+        del files[path]
+        updated += 1
+    return updated
+
+
+def find_changes(previous: WorldIndex, current: WorldIndex, limit: int = 5) -> List[str]:
+    """List up to `limit` added, removed or modified paths (empty when the indexes match)."""
+    changes = []
+    for path, entry in current.items():
+        old_entry = previous.get(path)
+        if old_entry is None:
+            changes.append(f"+{path}")
+        elif tuple(old_entry) != entry:
+            changes.append(f"~{path}")
+        if len(changes) >= limit:
+            return changes
+    for path in previous:
+        if path not in current:
+            changes.append(f"-{path}")
+            if len(changes) >= limit:
+                break
+    return changes
+
+
+def load_world_index(index_path: str) -> Optional[dict]:
+    """
+    Load a persisted index.
+
+    :return: {'backup': name of the backup it describes, 'files': WorldIndex,
+              'signals': read_signals() when the index was last checked, or None}, or None
+    """
+    try:
+        with open(index_path) as index_file:
+            data = json.load(index_file)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(data, dict) or not isinstance(data.get('files'), dict):
+        return None
+    data['files'] = {path: tuple(entry) for path, entry in data['files'].items()}
+    if not isinstance(data.get('signals'), dict):
+        data['signals'] = None
+    return data
+
+
+def save_world_index(index_path: str, backup_name: str, files: WorldIndex,
+                     signals: Optional[Dict[str, Optional[int]]] = None):
+    """Atomically persist the index of the world as it was copied into backup_name."""
+    tmp_path = f"{index_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as index_file:
+        json.dump({'backup': backup_name, 'files': files, 'signals': signals}, index_file, separators=(',', ':'))
+    os.replace(tmp_path, index_path)
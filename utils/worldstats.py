@@ -0,0 +1,163 @@
+# utils/worldstats.py
+import datetime
+import heapq
+import mmap
+import os
+import sys
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from utils import anvil
+
+# Entries in the "most recently saved regions" and "largest chunks" lists
+TOP_ENTRIES = 10
+# Region files handed to a worker process at once; headers are tiny, so batches are large
+FILES_PER_TASK = 256
+
+
+class RegionStats:
+    """What the header of one region file tells about it."""
+
+    def __init__(self, dimension: str, folder: str, path: str, region_x: int, region_z: int):
+        self.dimension = dimension
+        self.folder = folder
+        self.path = path
+        self.region_x = region_x
+        self.region_z = region_z
+        self.file_bytes = 0
+        self.chunks = 0
+        self.stored_bytes = 0
+        self.last_saved = 0
+        # (bytes, chunk index) of the largest chunks of the file
+        self.largest: List[Tuple[int, int]] = []
+        self.error: Optional[str] = None
+
+
+def scan_region(entry: Tuple[str, str, int, int]) -> RegionStats:
+    """
+    Read the location and timestamp tables of a region file through a memory map, so only
+    the two header pages are read from disk, never the chunk data. Chunk sizes are whole
+    sectors as recorded in the header. Runs in a worker process.
+
+    :param entry: (dimension, path, region x, region z) as from anvil.find_region_files()
+    """
+    dimension, path, region_x, region_z = entry
+    stats = RegionStats(dimension, os.path.basename(os.path.dirname(path)), path, region_x, region_z)
+    try:
+        with open(path, 'rb') as region_file:
+            stats.file_bytes = os.fstat(region_file.fileno()).st_size
+            if stats.file_bytes == 0:
+                # Created by the server before its first chunk was saved
+                return stats
+            if stats.file_bytes < anvil.HEADER_SIZE:
+                raise anvil.AnvilError(f"Region header is {stats.file_bytes} bytes, expected {anvil.HEADER_SIZE}")
+            with mmap.mmap(region_file.fileno(), 0, access=mmap.ACCESS_READ) as region_map:
+                header = region_map[:anvil.HEADER_SIZE]
+    except (OSError, ValueError, anvil.AnvilError) as e:
+        stats.error = str(e)
+        return stats
+
+    # Tens of thousands of headers: work on whole tables instead of per-chunk tuples.
+    # The low byte of each big-endian location entry is the chunk's sector count (0 = no chunk).
+    sectors = header[3:anvil.SECTOR_SIZE:4]
+    stats.chunks = anvil.CHUNKS_PER_REGION - sectors.count(0)
+    stats.stored_bytes = sum(sectors) * anvil.SECTOR_SIZE
+    timestamps = array('i', header[anvil.SECTOR_SIZE:anvil.HEADER_SIZE])
+    if sys.byteorder == 'little':
+        timestamps.byteswap()
+    stats.last_saved = max(timestamps)
+    count = max(sectors)
+    while count and len(stats.largest) < TOP_ENTRIES:
+        index = sectors.find(count)
+        while index != -1 and len(stats.largest) < TOP_ENTRIES:
+            stats.largest.append((count * anvil.SECTOR_SIZE, index))
+            index = sectors.find(count, index + 1)
+        count -= 1
+    return stats
+
+
+def _scan_batch(entries: List[Tuple[str, str, int, int]]) -> List[RegionStats]:
+    return [scan_region(entry) for entry in entries]
+
+
+def scan_world(world_path: str, workers: Optional[int] = None) -> List[RegionStats]:
+    """Scan the headers of the terrain, entity and POI region files of every dimension in parallel."""
+    entries = anvil.find_region_files(world_path)
+    if not entries:
+        return []
+    batches = [entries[start:start + FILES_PER_TASK] for start in range(0, len(entries), FILES_PER_TASK)]
+    if len(batches) == 1:
+        # Not worth starting worker processes
+        return _scan_batch(entries)
+    with ProcessPoolExecutor(max_workers=workers or None) as pool:
+        return [stats for batch in pool.map(_scan_batch, batches) for stats in batch]
+
+
+def _format_time(timestamp: int) -> Optional[str]:
+    return datetime.datetime.fromtimestamp(timestamp).isoformat(timespec='seconds') if timestamp else None
+
+
+def summarize(results: List[RegionStats]) -> dict:
+    """
+    Aggregate per-file stats: totals per dimension and folder, the terrain regions saved
+    most recently and the largest chunks. Sizes are in bytes; the result is JSON-serialisable.
+    """
+    dimensions: Dict[str, Dict[str, dict]] = {}
+    totals = {'files': 0, 'chunks': 0, 'file_bytes': 0, 'stored_bytes': 0}
+    chunks = []
+    errors = []
+    for stats in results:
+        if stats.error:
+            errors.append({'path': stats.path, 'error': stats.error})
+            continue
+        folder = dimensions.setdefault(stats.dimension, {}).setdefault(
+            stats.folder, {'files': 0, 'chunks': 0, 'file_bytes': 0, 'stored_bytes': 0})
+        for counts in (folder, totals):
+            counts['files'] += 1
+            counts['chunks'] += stats.chunks
+            counts['file_bytes'] += stats.file_bytes
+            counts['stored_bytes'] += stats.stored_bytes
+        chunks.extend((size, index, stats) for size, index in stats.largest)
+
+    recent = heapq.nlargest(TOP_ENTRIES, (stats for stats in results if not stats.error and stats.folder == 'region'),
+                            key=lambda stats: stats.last_saved)
+    largest = heapq.nlargest(TOP_ENTRIES, chunks, key=lambda chunk: chunk[0])
+    return {
+        'dimensions': dimensions,
+        'totals': totals,
+        'recent_regions': [{'dimension': stats.dimension, 'region': os.path.basename(stats.path),
+                            'chunks': stats.chunks, 'last_saved': _format_time(stats.last_saved)}
+                           for stats in recent if stats.last_saved],
+        'largest_chunks': [{'dimension': stats.dimension, 'folder': stats.folder,
+                            'x': stats.region_x * 32 + index % 32, 'z': stats.region_z * 32 + index // 32,
+                            'bytes': size, 'region': os.path.basename(stats.path)}
+                           for size, index, stats in largest],
+        'errors': errors,
+    }
+
+
+def format_table(summary: dict) -> str:
+    mib = 1024 * 1024
+    header = f"  {'dimension':<12}{'folder':<10}{'files':>8}{'chunks':>10}{'file MiB':>11}{'stored MiB':>12}{'unused':>8}"
+    lines = [header]
+    rows = [(dimension, folder, counts) for dimension, folders in summary['dimensions'].items()
+            for folder, counts in folders.items()]
+    rows.append(('total', '', summary['totals']))
+    for dimension, folder, counts in rows:
+        unused = 1 - counts['stored_bytes'] / counts['file_bytes'] if counts['file_bytes'] else 0.0
+        lines.append(f"  {dimension:<12}{folder:<10}{counts['files']:>8}{counts['chunks']:>10}"
+                     f"{counts['file_bytes'] / mib:>11.1f}{counts['stored_bytes'] / mib:>12.1f}{unused:>8.1%}")
+    if summary['recent_regions']:
+        lines.append("Most recently saved regions:")
+        for region in summary['recent_regions']:
+            lines.append(f"  {region['last_saved']}  {region['dimension']:<12}{region['region']:<20}"
+                         f"{region['chunks']:>5} chunks")
+    if summary['largest_chunks']:
+        lines.append("Largest chunks:")
+        for chunk in summary['largest_chunks']:
+            lines.append(f"  {chunk['bytes'] / 1024:>7.0f} KiB  {chunk['dimension']:<12}{chunk['folder']:<10}"
+                         f"chunk {chunk['x']},{chunk['z']} ({chunk['region']})")
+    for error in summary['errors']:
+        lines.append(f"  Unreadable {error['path']}: {error['error']}")
+    return '\n'.join(lines)